@@ -0,0 +1,160 @@
+"""Batch mode benchmark: questions/s against the generation concurrency limit.
+
+Run from `src/`:
+
+    uv run python -m bench.batch --questions 64 --concurrency 1,4,16
+
+Same offline setup as `bench.e2e` (local Qdrant, `HashingEmbeddings`,
+`FakeStreamingChatModel`); each concurrency level answers the same questions
+into a fresh output file.
+"""
+
+import argparse
+import json
+import logging
+import tempfile
+import warnings
+from pathlib import Path
+from typing import Any
+
+from bench.common import (
+    default_output_path,
+    parse_int_list,
+    percentiles,
+    print_comparison,
+    save_results,
+)
+from bench.fakes import (
+    FakeStreamingChatModel,
+    HashingEmbeddings,
+    corpus_questions,
+    memory_qdrant_client,
+    write_corpus,
+)
+from lib.batch import BatchQuestion, run_batch
+from lib.ingestion_pdf import PDFIngestion
+from lib.ingestion_pipeline import IngestionPipeline
+from lib.vector_db import VectorDB
+
+
+def bench_batch(
+    *,
+    documents: int,
+    pages: int,
+    questions: int,
+    concurrency_levels: list[int],
+    k: int,
+    llm: FakeStreamingChatModel,
+) -> list[dict[str, Any]]:
+    with tempfile.TemporaryDirectory(prefix="rag-bench-") as tmp:
+        paths = write_corpus(Path(tmp), documents=documents, pages_per_document=pages)
+        vector_db = VectorDB(
+            collection_name="bench",
+            embeddings=HashingEmbeddings(),
+            client=memory_qdrant_client(),
+        )
+        ingestion = PDFIngestion()
+        IngestionPipeline(
+            vector_store=vector_db.vector_store, catalog=vector_db.catalog
+        ).run(doc for path in paths for doc in ingestion.iter_load(path))
+
+        batch = [
+            BatchQuestion(id=str(i), question=question)
+            for i, (question, _, _) in enumerate(
+                corpus_questions(paths, count=questions, pages_per_document=pages)
+            )
+        ]
+        results = []
+        for concurrency in concurrency_levels:
+            output = Path(tmp) / f"answers-{concurrency}.jsonl"
+            stats = run_batch(
+                vector_db=vector_db,
+                llm=llm,
+                questions=batch,
+                output_path=output,
+                k=k,
+                concurrency=concurrency,
+            )
+            with open(output, encoding="utf-8") as f:
+                latencies = [json.loads(line)["elapsed_ms"] for line in f]
+            results.append(
+                {
+                    "concurrency": concurrency,
+                    "answered": stats.answered,
+                    "elapsed_s": round(stats.elapsed_s, 3),
+                    "questions_per_s": round(stats.questions_per_s, 2),
+                    "answer_ms": percentiles(latencies),
+                }
+            )
+        return results
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="bench.batch", description=__doc__)
+    parser.add_argument("--documents", type=int, default=4, help="Number of PDFs.")
+    parser.add_argument("--pages", type=int, default=20, help="Pages per PDF.")
+    parser.add_argument("--questions", type=int, default=64, help="Batch size.")
+    parser.add_argument(
+        "--concurrency",
+        default="1,4,16",
+        help="Comma-separated generation concurrency limits.",
+    )
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument(
+        "--tokens-per-s", type=float, default=200.0, help="Fake model token rate."
+    )
+    parser.add_argument(
+        "--answer-tokens", type=int, default=32, help="Tokens per fake answer."
+    )
+    parser.add_argument(
+        "--first-token-latency-ms",
+        type=float,
+        default=50.0,
+        help="Fake model latency before each response.",
+    )
+    parser.add_argument("--output", type=Path, help="Where to write the JSON results.")
+    parser.add_argument(
+        "--baseline", type=Path, help="Earlier results JSON to compare against."
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    warnings.filterwarnings("ignore", message="Payload indexes have no effect")
+
+    config = {
+        "documents": args.documents,
+        "pages": args.pages,
+        "questions": args.questions,
+        "concurrency": parse_int_list(args.concurrency),
+        "top_k": args.top_k,
+        "tokens_per_s": args.tokens_per_s,
+        "answer_tokens": args.answer_tokens,
+        "first_token_latency_ms": args.first_token_latency_ms,
+    }
+    results = bench_batch(
+        documents=args.documents,
+        pages=args.pages,
+        questions=args.questions,
+        concurrency_levels=config["concurrency"],
+        k=args.top_k,
+        llm=FakeStreamingChatModel(
+            tokens_per_s=args.tokens_per_s,
+            answer_tokens=args.answer_tokens,
+            first_token_latency_s=args.first_token_latency_ms / 1000,
+        ),
+    )
+
+    print(f"\n  {'concurrency':>11} {'questions/s':>12} {'answer p50/95/99 ms':>22}")
+    for r in results:
+        answer = "/".join(f"{r['answer_ms'][p]:.0f}" for p in ("p50", "p95", "p99"))
+        print(f"  {r['concurrency']:>11} {r['questions_per_s']:>12.2f} {answer:>22}")
+
+    output = args.output or default_output_path("batch")
+    save_results(output, name="batch", config=config, results=results)
+    if args.baseline:
+        print_comparison(args.baseline, output)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,296 @@
+"""Chunk-quality benchmark: chunk count, index size and retrieval hit rate.
+
+Run from `src/`:
+
+    uv run python -m bench.chunking --documents 8 --chunk-tokens 128,256,384
+
+Writes `--documents` synthetic manuals (`synthetic_manual_pages`: sections of
+1-5 paragraphs that run across page breaks, lines wrapped like a typeset PDF)
+and draws a fixed question set from them: each question is a sentence of the
+corpus, with the source and pages it is on. The corpus is written once per
+`--line-chars` width (default 90 and a narrow 40-character column, whose short
+mid-sentence lines look like headings). Every strategy chunks the same files
+through the real ingestion engine:
+
+- `recursive`: `RecursiveCharacterTextSplitter(900, 150)` per page (the default
+  before `StructuredChunker`)
+- `recursive_no_overlap`: the same with `chunk_overlap=0`
+- `structured`: `StructuredChunker(max_tokens=N)` for each `--chunk-tokens` N
+
+Chunks and questions are embedded with `HashingEmbeddings` and ranked by
+cosine similarity (exact search, no Qdrant). Reports per strategy:
+
+- `chunks`, mean tokens per chunk and `overlap` (stored characters over
+  document characters, minus one)
+- `index_mb`: vectors (`--vector-dim` float32, as with OpenAI embeddings) plus
+  chunk text
+- `cut`: questions whose sentence is split across chunks
+- `hit`: the sentence is whole in one of the top `--top-k` chunks
+- `page_hit`: a top-k chunk of the right source covers the sentence's page
+- `ctx_tok`: mean prompt tokens of the top-k chunks, and `hit/1k tok`
+"""
+
+import argparse
+import random
+import re
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from bench.common import (
+    default_output_path,
+    parse_int_list,
+    print_comparison,
+    save_results,
+)
+from bench.fakes import (
+    HashingEmbeddings,
+    synthetic_manual_pages,
+    write_text_pdf,
+    write_text_plain,
+)
+from lib.chunking import StructuredChunker, approximate_tokens
+from lib.ingestion import PagedIngestion
+from lib.ingestion_pdf import PDFIngestion
+from lib.ingestion_text import TextIngestion
+
+_SENTENCE = re.compile(r"[A-Z][^.!?]*[.!?]")
+_HEADING = re.compile(r"^Section \d+: part ")
+
+Question = tuple[str, str, int, int]
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.split())
+
+
+def write_manuals(
+    directory: Path, *, documents: int, fmt: str, line_chars: int = 90
+) -> tuple[list[Path], list[list[str]]]:
+    """Write the corpus; returns the paths and each document's pages."""
+    paths, corpus = [], []
+    for doc_index in range(documents):
+        pages = synthetic_manual_pages(doc_index, line_chars=line_chars)
+        path = directory / f"manual-{doc_index:03d}.{'pdf' if fmt == 'pdf' else 'txt'}"
+        (write_text_pdf if fmt == "pdf" else write_text_plain)(path, pages)
+        paths.append(path)
+        corpus.append(pages)
+    return paths, corpus
+
+
+def manual_questions(
+    paths: list[Path], corpus: list[list[str]], *, count: int, seed: int = 11
+) -> list[Question]:
+    """`(sentence, source, first_page, last_page)` drawn from the corpus text."""
+    rng = random.Random(seed)
+    candidates: list[Question] = []
+    for path, pages in zip(paths, corpus):
+        text, page_at = "", []
+        for page, page_text in enumerate(pages, start=1):
+            body = "\n".join(
+                line for line in page_text.split("\n") if not _HEADING.match(line)
+            )
+            normalized = _normalize(body) + " "
+            text += normalized
+            page_at += [page] * len(normalized)
+        for match in _SENTENCE.finditer(text):
+            sentence = match.group()
+            if len(sentence.split()) >= 6:
+                candidates.append(
+                    (
+                        sentence,
+                        str(path),
+                        page_at[match.start()],
+                        page_at[match.end() - 1],
+                    )
+                )
+    return rng.sample(candidates, min(count, len(candidates)))
+
+
+def _engine(fmt: str, **kwargs: Any) -> PagedIngestion:
+    return PDFIngestion(**kwargs) if fmt == "pdf" else TextIngestion(**kwargs)
+
+
+def bench_strategy(
+    name: str,
+    engine: PagedIngestion,
+    *,
+    paths: list[Path],
+    corpus: list[list[str]],
+    questions: list[Question],
+    top_k: int,
+    vector_dim: int,
+    embeddings: HashingEmbeddings,
+    question_vectors: np.ndarray,
+    **config: Any,
+) -> dict[str, Any]:
+    started = time.perf_counter()
+    docs = list(engine.iter_load_many(paths))
+    chunk_s = time.perf_counter() - started
+
+    texts = [_normalize(doc.page_content) for doc in docs]
+    tokens = [approximate_tokens(doc.page_content) for doc in docs]
+    vectors = np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+    scores = question_vectors @ vectors.T
+    top = np.argsort(-scores, axis=1)[:, :top_k]
+
+    by_source: dict[str, list[int]] = {}
+    for i, doc in enumerate(docs):
+        by_source.setdefault(doc.metadata["source"], []).append(i)
+
+    cut = hits = page_hits = 0
+    context_tokens = 0
+    for (sentence, source, first, last), ranked in zip(questions, top):
+        if not any(sentence in texts[i] for i in by_source.get(source, [])):
+            cut += 1
+        found = [int(i) for i in ranked]
+        context_tokens += sum(tokens[i] for i in found)
+        if any(sentence in texts[i] for i in found):
+            hits += 1
+        for i in found:
+            meta = docs[i].metadata
+            if (
+                meta["source"] == source
+                and meta["page"] <= last
+                and meta.get("page_end", meta["page"]) >= first
+            ):
+                page_hits += 1
+                break
+
+    document_chars = sum(len(_normalize("\n".join(pages))) for pages in corpus)
+    stored_chars = sum(len(text) for text in texts)
+    n = max(len(questions), 1)
+    mean_context = context_tokens / n
+    return {
+        "strategy": name,
+        **config,
+        "chunks": len(docs),
+        "mean_tokens": round(sum(tokens) / max(len(docs), 1), 1),
+        "overlap": round(stored_chars / document_chars - 1, 3),
+        "index_mb": round(
+            (len(docs) * vector_dim * 4 + sum(len(t.encode()) for t in texts)) / 1e6,
+            2,
+        ),
+        "chunk_s": round(chunk_s, 3),
+        "cut_rate": round(cut / n, 3),
+        "hit_rate": round(hits / n, 3),
+        "page_hit_rate": round(page_hits / n, 3),
+        "context_tokens": round(mean_context, 1),
+        "hits_per_1k_tokens": round(hits / n / mean_context * 1000, 3),
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="bench.chunking", description=__doc__)
+    parser.add_argument("--documents", type=int, default=8, help="Manuals to write.")
+    parser.add_argument(
+        "--format", choices=("pdf", "text"), default="pdf", help="Corpus file format."
+    )
+    parser.add_argument("--questions", type=int, default=300, help="Question count.")
+    parser.add_argument("--top-k", type=int, default=3, help="Chunks retrieved.")
+    parser.add_argument(
+        "--chunk-tokens",
+        default="128,256,384",
+        help="Comma-separated StructuredChunker max_tokens values.",
+    )
+    parser.add_argument(
+        "--line-chars",
+        default="90,40",
+        help="Comma-separated line widths of the corpus (40: narrow column).",
+    )
+    parser.add_argument(
+        "--vector-dim",
+        type=int,
+        default=1536,
+        help="Vector size used for the index size estimate.",
+    )
+    parser.add_argument("--output", type=Path, help="Where to write the JSON results.")
+    parser.add_argument(
+        "--baseline", type=Path, help="Earlier results JSON to compare against."
+    )
+    args = parser.parse_args(argv)
+
+    config = {
+        "documents": args.documents,
+        "format": args.format,
+        "questions": args.questions,
+        "top_k": args.top_k,
+        "chunk_tokens": parse_int_list(args.chunk_tokens),
+        "line_chars": parse_int_list(args.line_chars),
+        "vector_dim": args.vector_dim,
+    }
+    strategies: list[tuple[str, dict[str, Any], dict[str, Any]]] = [
+        ("recursive", {"chunk_size": 900, "chunk_overlap": 150}, {}),
+        ("recursive_no_overlap", {"chunk_size": 900, "chunk_overlap": 0}, {}),
+    ]
+    for max_tokens in config["chunk_tokens"]:
+        strategies.append(
+            (
+                "structured",
+                {"chunker": StructuredChunker(max_tokens=max_tokens)},
+                {"max_tokens": max_tokens},
+            )
+        )
+
+    embeddings = HashingEmbeddings(size=512)
+    results = []
+    with tempfile.TemporaryDirectory(prefix="rag-bench-") as tmp:
+        for line_chars in config["line_chars"]:
+            directory = Path(tmp) / f"lines-{line_chars}"
+            directory.mkdir()
+            paths, corpus = write_manuals(
+                directory,
+                documents=args.documents,
+                fmt=args.format,
+                line_chars=line_chars,
+            )
+            questions = manual_questions(paths, corpus, count=args.questions)
+            question_vectors = np.asarray(
+                embeddings.embed_documents([q[0] for q in questions]),
+                dtype=np.float32,
+            )
+            for name, engine_kwargs, extra in strategies:
+                results.append(
+                    bench_strategy(
+                        name,
+                        _engine(args.format, **engine_kwargs),
+                        paths=paths,
+                        corpus=corpus,
+                        questions=questions,
+                        top_k=args.top_k,
+                        vector_dim=args.vector_dim,
+                        embeddings=embeddings,
+                        question_vectors=question_vectors,
+                        line_chars=line_chars,
+                        **extra,
+                    )
+                )
+
+    print(
+        f"\n  {'strategy':<22} {'lines':>5} {'chunks':>6} {'tok':>5} {'overlap':>7} "
+        f"{'index MB':>8} {'cut':>6} {'hit':>6} {'page_hit':>8} {'ctx_tok':>7} "
+        f"{'hit/1k tok':>10}"
+    )
+    for r in results:
+        name = r["strategy"]
+        if "max_tokens" in r:
+            name += f" ({r['max_tokens']})"
+        print(
+            f"  {name:<22} {r['line_chars']:>5} {r['chunks']:>6} {r['mean_tokens']:>5.0f} "
+            f"{r['overlap']:>7.1%} {r['index_mb']:>8.2f} {r['cut_rate']:>6.1%} "
+            f"{r['hit_rate']:>6.1%} {r['page_hit_rate']:>8.1%} "
+            f"{r['context_tokens']:>7.0f} {r['hits_per_1k_tokens']:>10.2f}"
+        )
+
+    output = args.output or default_output_path("chunking")
+    save_results(output, name="chunking", config=config, results=results)
+    if args.baseline:
+        print_comparison(args.baseline, output)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,107 @@
+"""Shared helpers for the benchmark scripts: percentiles, RSS, JSON results."""
+
+import json
+import math
+import resource
+import subprocess
+import sys
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+RESULTS_DIR = Path("bench_results")
+
+
+def parse_int_list(value: str) -> list[int]:
+    """`"2,8,32"` -> `[2, 8, 32]`."""
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def percentiles(
+    samples: list[float], points: tuple[int, ...] = (50, 95, 99)
+) -> dict[str, float]:
+    """Nearest-rank percentiles, rounded to 0.01."""
+    if not samples:
+        return {f"p{p}": 0.0 for p in points}
+    ordered = sorted(samples)
+    result = {}
+    for p in points:
+        rank = max(math.ceil(p / 100 * len(ordered)), 1)
+        result[f"p{p}"] = round(ordered[rank - 1], 2)
+    return result
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes.
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(peak / divisor, 1)
+
+
+def git_commit() -> str | None:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def default_output_path(name: str) -> Path:
+    return RESULTS_DIR / f"{name}-{git_commit() or 'nogit'}.json"
+
+
+def save_results(
+    path: Path, *, name: str, config: dict[str, Any], results: list[Any]
+) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    payload = {
+        "benchmark": name,
+        "commit": git_commit(),
+        "timestamp": datetime.now(UTC).isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "config": config,
+        "results": results,
+    }
+    path.write_text(json.dumps(payload, indent=2) + "\n", encoding="utf-8")
+    print(f"\nWrote {path}")
+
+
+def _flatten(value: Any, prefix: str = "") -> dict[str, float]:
+    """Numeric leaves keyed by path; list items keyed by their identifying fields."""
+    flat: dict[str, float] = {}
+    if isinstance(value, dict):
+        for key, item in value.items():
+            flat.update(_flatten(item, f"{prefix}{key}."))
+    elif isinstance(value, list):
+        for index, item in enumerate(value):
+            label = str(index)
+            if isinstance(item, dict):
+                ident = [
+                    f"{k}={v}"
+                    for k, v in item.items()
+                    if isinstance(v, (str, int)) and not isinstance(v, bool)
+                ][:3]
+                label = ",".join(ident) or label
+            flat.update(_flatten(item, f"{prefix}[{label}]."))
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        flat[prefix.rstrip(".")] = float(value)
+    return flat
+
+
+def print_comparison(baseline: Path, current: Path) -> None:
+    """Print metrics present in both result files with their relative change."""
+    before = _flatten(json.loads(baseline.read_text(encoding="utf-8"))["results"])
+    after = _flatten(json.loads(current.read_text(encoding="utf-8"))["results"])
+    print(f"\nComparison against {baseline}:")
+    for key in sorted(before.keys() & after.keys()):
+        old, new = before[key], after[key]
+        if old == new:
+            continue
+        change = f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+        print(f"  {key}: {old:g} -> {new:g} ({change})")
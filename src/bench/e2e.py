@@ -0,0 +1,315 @@
+"""End-to-end benchmark: ingestion throughput and query latency, fully offline.
+
+Run from `src/`:
+
+    uv run python -m bench.e2e --documents 2,8 --pages 40 --top-k 3,5,10
+
+Qdrant runs in local `:memory:` mode, embeddings are `HashingEmbeddings` and the
+chat model is `FakeStreamingChatModel`, so results only reflect this code base.
+"""
+
+import argparse
+import contextlib
+import io
+import logging
+import tempfile
+import time
+import warnings
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from langchain_qdrant import RetrievalMode
+
+from bench.common import (
+    default_output_path,
+    parse_int_list,
+    peak_rss_mb,
+    percentiles,
+    print_comparison,
+    save_results,
+)
+from bench.fakes import (
+    FakeStreamingChatModel,
+    HashingEmbeddings,
+    LexicalCrossEncoder,
+    corpus_questions,
+    memory_qdrant_client,
+    write_corpus,
+)
+from lib.context_builder import ContextBuilder
+from lib.ingestion_parallel import ParallelPDFIngestion
+from lib.ingestion_pdf import PDFIngestion
+from lib.ingestion_pipeline import IngestionPipeline
+from lib.metrics import METRICS
+from lib.rag_agent import RagAgentSession
+from lib.rag_two_step import ScoredDocument, stream_rag_answer
+from lib.reranker import CrossEncoderReranker
+from lib.vector_db import VectorDB
+
+
+class _FirstWriteRecorder(io.TextIOBase):
+    """Stdout replacement remembering when the first answer text was written."""
+
+    def __init__(self) -> None:
+        self.first_write: float | None = None
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, s: str) -> int:
+        if self.first_write is None and s.strip():
+            self.first_write = time.perf_counter()
+        return len(s)
+
+
+def _timed_answer(
+    answer: Callable[[], tuple[str, list[ScoredDocument]]],
+) -> tuple[float, float, list[ScoredDocument]]:
+    """Run `answer` with stdout captured; returns (ttft_ms, total_ms, sources)."""
+    recorder = _FirstWriteRecorder()
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(recorder):
+        _, sources = answer()
+    finished = time.perf_counter()
+    first = recorder.first_write or finished
+    return (first - started) * 1000, (finished - started) * 1000, sources
+
+
+def bench_corpus(
+    *,
+    documents: int,
+    pages: int,
+    top_ks: list[int],
+    queries: int,
+    workers: int,
+    retrieval: str,
+    question_kind: str,
+    context_tokens: int | None,
+    agent_prefetch: bool,
+    rerank_candidates: int | None,
+    llm: FakeStreamingChatModel,
+) -> dict[str, Any]:
+    with tempfile.TemporaryDirectory(prefix="rag-bench-") as tmp:
+        paths = write_corpus(Path(tmp), documents=documents, pages_per_document=pages)
+        vector_db = VectorDB(
+            collection_name="bench",
+            embeddings=HashingEmbeddings(),
+            client=memory_qdrant_client(),
+            retrieval_mode=RetrievalMode(retrieval),
+            reranker=(
+                CrossEncoderReranker(
+                    candidates=rerank_candidates, model=LexicalCrossEncoder()
+                )
+                if rerank_candidates
+                else None
+            ),
+        )
+
+        pipeline = IngestionPipeline(
+            vector_store=vector_db.vector_store, catalog=vector_db.catalog
+        )
+        if workers > 0:
+            chunks = ParallelPDFIngestion(max_workers=workers).iter_load_many(paths)
+        else:
+            ingestion = PDFIngestion()
+            chunks = (doc for path in paths for doc in ingestion.iter_load(path))
+        stats = pipeline.run(chunks)
+
+        result: dict[str, Any] = {
+            "documents": documents,
+            "pages": documents * pages,
+            "ingest": {
+                "chunks": stats.chunks,
+                "elapsed_s": round(stats.elapsed_s, 3),
+                "chunks_per_s": round(stats.chunks_per_s, 1),
+                "pages_per_s": round(documents * pages / stats.elapsed_s, 1),
+            },
+            "queries": [],
+        }
+
+        questions = corpus_questions(
+            paths, count=queries, pages_per_document=pages, kind=question_kind
+        )
+        context_builder = ContextBuilder(max_tokens=context_tokens)
+        for k in top_ks:
+            retriever = vector_db.as_retriever(k=k)
+            session = RagAgentSession(
+                llm=llm,
+                vector_store=vector_db.vector_store,
+                k=k,
+                context_builder=context_builder,
+                prefetch=agent_prefetch,
+            )
+            modes = {
+                "two_step": lambda q: stream_rag_answer(
+                    llm=llm,
+                    retriever=retriever,
+                    prompt=q,
+                    show_header=False,
+                    context_builder=context_builder,
+                ),
+                "agent": lambda q: session.stream(prompt=q, show_header=False),
+            }
+            for mode, answer in modes.items():
+                ttft, total, hits = [], [], 0
+                input_key = f'rag_llm_input_tokens_total{{mode="{mode}"}}'
+                input_before = METRICS.snapshot().get(input_key, 0.0)
+                for question, source, page in questions:
+                    first_ms, total_ms, sources = _timed_answer(
+                        lambda: answer(question)
+                    )
+                    ttft.append(first_ms)
+                    total.append(total_ms)
+                    hits += any(
+                        doc.metadata.get("source") == source
+                        and doc.metadata.get("page") == page
+                        for doc, _ in sources
+                    )
+                input_tokens = METRICS.snapshot().get(input_key, 0.0) - input_before
+                result["queries"].append(
+                    {
+                        "mode": mode,
+                        "top_k": k,
+                        "hit_rate": round(hits / len(questions), 3),
+                        "input_tokens": round(input_tokens / len(questions)),
+                        "ttft_ms": percentiles(ttft),
+                        "total_ms": percentiles(total),
+                    }
+                )
+
+        result["peak_rss_mb"] = peak_rss_mb()
+        return result
+
+
+def _print_result(result: dict[str, Any]) -> None:
+    ingest = result["ingest"]
+    print(
+        f"\ncorpus documents={result['documents']} pages={result['pages']} "
+        f"chunks={ingest['chunks']} ingest={ingest['chunks_per_s']} chunks/s "
+        f"({ingest['pages_per_s']} pages/s) peak_rss={result['peak_rss_mb']} MB"
+    )
+    print(
+        f"  {'mode':<9} {'k':>3} {'hit':>6} {'in tok':>7} "
+        f"{'ttft p50/95/99 ms':>20} {'total':>20}"
+    )
+    for q in result["queries"]:
+        ttft = "/".join(f"{q['ttft_ms'][p]:.0f}" for p in ("p50", "p95", "p99"))
+        total = "/".join(f"{q['total_ms'][p]:.0f}" for p in ("p50", "p95", "p99"))
+        print(
+            f"  {q['mode']:<9} {q['top_k']:>3} {q['hit_rate']:>6.2f} "
+            f"{q['input_tokens']:>7} {ttft:>20} {total:>20}"
+        )
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="bench.e2e", description=__doc__)
+    parser.add_argument(
+        "--documents",
+        default="2,8",
+        help="Comma-separated corpus sizes (number of PDFs).",
+    )
+    parser.add_argument("--pages", type=int, default=40, help="Pages per PDF.")
+    parser.add_argument("--top-k", default="3,5,10", help="Comma-separated k values.")
+    parser.add_argument("--queries", type=int, default=20, help="Queries per k/mode.")
+    parser.add_argument("--retrieval", choices=["dense", "hybrid"], default="dense")
+    parser.add_argument(
+        "--question-kind",
+        choices=["sentence", "part_number"],
+        default="sentence",
+        help="Questions reuse page sentences, or ask for exact part numbers.",
+    )
+    parser.add_argument(
+        "--context-tokens",
+        type=int,
+        default=None,
+        help="Prompt context token budget (default: no limit).",
+    )
+    parser.add_argument(
+        "--no-agent-prefetch",
+        dest="agent_prefetch",
+        action="store_false",
+        help="Agent mode without the speculative prompt search.",
+    )
+    parser.add_argument(
+        "--rerank-candidates",
+        type=int,
+        default=None,
+        help="Rerank this many candidates with a lexical stand-in cross-encoder.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="PDF extraction processes (0 = extract in-process).",
+    )
+    parser.add_argument(
+        "--tokens-per-s", type=float, default=200.0, help="Fake model token rate."
+    )
+    parser.add_argument(
+        "--answer-tokens", type=int, default=32, help="Tokens per fake answer."
+    )
+    parser.add_argument(
+        "--first-token-latency-ms",
+        type=float,
+        default=50.0,
+        help="Fake model latency before each response.",
+    )
+    parser.add_argument("--output", type=Path, help="Where to write the JSON results.")
+    parser.add_argument(
+        "--baseline", type=Path, help="Earlier results JSON to compare against."
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    # Local mode ignores payload indexes and says so on every collection.
+    warnings.filterwarnings("ignore", message="Payload indexes have no effect")
+
+    llm = FakeStreamingChatModel(
+        tokens_per_s=args.tokens_per_s,
+        answer_tokens=args.answer_tokens,
+        first_token_latency_s=args.first_token_latency_ms / 1000,
+    )
+    config = {
+        "documents": parse_int_list(args.documents),
+        "pages": args.pages,
+        "top_k": parse_int_list(args.top_k),
+        "queries": args.queries,
+        "workers": args.workers,
+        "retrieval": args.retrieval,
+        "question_kind": args.question_kind,
+        "context_tokens": args.context_tokens,
+        "agent_prefetch": args.agent_prefetch,
+        "rerank_candidates": args.rerank_candidates,
+        "tokens_per_s": args.tokens_per_s,
+        "answer_tokens": args.answer_tokens,
+        "first_token_latency_ms": args.first_token_latency_ms,
+    }
+
+    results = []
+    for documents in config["documents"]:
+        result = bench_corpus(
+            documents=documents,
+            pages=args.pages,
+            top_ks=config["top_k"],
+            queries=args.queries,
+            workers=args.workers,
+            retrieval=args.retrieval,
+            question_kind=args.question_kind,
+            context_tokens=args.context_tokens,
+            agent_prefetch=args.agent_prefetch,
+            rerank_candidates=args.rerank_candidates,
+            llm=llm,
+        )
+        _print_result(result)
+        results.append(result)
+
+    output = args.output or default_output_path("e2e")
+    save_results(output, name="e2e", config=config, results=results)
+    if args.baseline:
+        print_comparison(args.baseline, output)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
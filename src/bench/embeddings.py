@@ -0,0 +1,212 @@
+"""Local embedding benchmark: texts/s of `LocalEmbeddings` batching strategies.
+
+Run from `src/`:
+
+    uv run python -m bench.embeddings --texts 2000 --workers 1,2,4
+    uv run python -m bench.embeddings --model BAAI/bge-small-en-v1.5  # real model
+
+By default the model is `PaddedEmbeddingModel` (cost grows with batch size x
+longest text, like a transformer padding its batch), so the numbers isolate
+batching and threading. With `--model`, the fastembed model runs on the CPU
+(needs `uv sync --extra local`; downloaded once, then fully offline).
+
+Texts are synthetic chunks of mixed length (one word to a full page). Each
+strategy embeds the same texts:
+
+- `one_by_one`: one model call per text (API-client style)
+- `fixed`: batches of `--batch-size` in input order on one thread
+- `dynamic`: `LocalEmbeddings` (length-sorted batches capped by
+  `--batch-tokens`) on each `--workers` thread count
+"""
+
+import argparse
+import random
+import time
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from bench.common import (
+    default_output_path,
+    parse_int_list,
+    print_comparison,
+    save_results,
+)
+from bench.fakes import PaddedEmbeddingModel, synthetic_page_text
+from lib.local_embeddings import (
+    EmbeddingModel,
+    LocalEmbeddings,
+    estimate_tokens,
+    load_fastembed_model,
+)
+
+
+def mixed_texts(count: int, *, seed: int = 0) -> list[str]:
+    """Chunk-like texts whose lengths span short questions to full pages."""
+    rng = random.Random(seed)
+    texts = []
+    for i in range(count):
+        words = min(400, max(1, int(rng.lognormvariate(4.0, 1.0))))
+        texts.append(synthetic_page_text(i, 0, words=words))
+    return texts
+
+
+def _result(
+    strategy: str, texts: list[str], elapsed_s: float, **extra: Any
+) -> dict[str, Any]:
+    return {
+        "strategy": strategy,
+        "texts_per_s": round(len(texts) / elapsed_s, 1),
+        "elapsed_s": round(elapsed_s, 3),
+        **extra,
+    }
+
+
+def _padding(model: EmbeddingModel, texts: list[str]) -> dict[str, Any]:
+    padded = getattr(model, "padded_tokens", None)
+    if not padded:
+        return {}
+    real = sum(estimate_tokens(text) for text in texts)
+    return {"padding_efficiency": round(real / padded, 3)}
+
+
+def bench_embeddings(
+    *,
+    texts: list[str],
+    make_model: Any,
+    batch_size: int,
+    batch_tokens: int,
+    workers: list[int],
+) -> list[dict[str, Any]]:
+    results = []
+
+    model = make_model()
+    started = time.perf_counter()
+    for text in texts:
+        np.asarray(list(model.embed([text], batch_size=1)), dtype=np.float32)
+    results.append(
+        _result(
+            "one_by_one",
+            texts,
+            time.perf_counter() - started,
+            **_padding(model, texts),
+        )
+    )
+
+    model = make_model()
+    started = time.perf_counter()
+    for start in range(0, len(texts), batch_size):
+        batch = texts[start : start + batch_size]
+        np.asarray(list(model.embed(batch, batch_size=len(batch))), dtype=np.float32)
+    results.append(
+        _result(
+            "fixed",
+            texts,
+            time.perf_counter() - started,
+            batch_size=batch_size,
+            **_padding(model, texts),
+        )
+    )
+
+    for count in workers:
+        model = make_model()
+        embeddings = LocalEmbeddings(
+            model=model,
+            max_batch_tokens=batch_tokens,
+            max_batch_size=batch_size,
+            max_workers=count,
+        )
+        try:
+            started = time.perf_counter()
+            embeddings.embed_array(texts)
+            elapsed_s = time.perf_counter() - started
+        finally:
+            embeddings.close()
+        results.append(
+            _result(
+                "dynamic",
+                texts,
+                elapsed_s,
+                workers=count,
+                batch_tokens=batch_tokens,
+                **_padding(model, texts),
+            )
+        )
+    return results
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="bench.embeddings", description=__doc__)
+    parser.add_argument("--texts", type=int, default=2000, help="Texts to embed.")
+    parser.add_argument(
+        "--model",
+        help="fastembed model name (default: the offline PaddedEmbeddingModel).",
+    )
+    parser.add_argument(
+        "--us-per-token",
+        type=float,
+        default=2.0,
+        help="Fake model cost per padded token (microseconds).",
+    )
+    parser.add_argument("--batch-size", type=int, default=64, help="Max batch size.")
+    parser.add_argument(
+        "--batch-tokens",
+        type=int,
+        default=8192,
+        help="Padded-token budget per dynamic batch.",
+    )
+    parser.add_argument(
+        "--workers", default="1,2,4", help="Comma-separated thread counts."
+    )
+    parser.add_argument("--output", type=Path, help="Where to write the JSON results.")
+    parser.add_argument(
+        "--baseline", type=Path, help="Earlier results JSON to compare against."
+    )
+    args = parser.parse_args(argv)
+
+    if args.model:
+        real = load_fastembed_model(args.model, threads=1)
+
+        def make_model() -> EmbeddingModel:
+            return real
+
+    else:
+
+        def make_model() -> EmbeddingModel:
+            return PaddedEmbeddingModel(us_per_token=args.us_per_token)
+
+    config = {
+        "texts": args.texts,
+        "model": args.model or "fake",
+        "us_per_token": args.us_per_token,
+        "batch_size": args.batch_size,
+        "batch_tokens": args.batch_tokens,
+        "workers": parse_int_list(args.workers),
+    }
+    results = bench_embeddings(
+        texts=mixed_texts(args.texts),
+        make_model=make_model,
+        batch_size=args.batch_size,
+        batch_tokens=args.batch_tokens,
+        workers=config["workers"],
+    )
+
+    print(f"\n  {'strategy':<12} {'workers':>7} {'texts/s':>10} {'padding eff.':>12}")
+    for r in results:
+        efficiency = r.get("padding_efficiency")
+        print(
+            f"  {r['strategy']:<12} {r.get('workers', 1):>7} "
+            f"{r['texts_per_s']:>10.1f} "
+            f"{'-' if efficiency is None else f'{efficiency:.2f}':>12}"
+        )
+
+    output = args.output or default_output_path("embeddings")
+    save_results(output, name="embeddings", config=config, results=results)
+    if args.baseline:
+        print_comparison(args.baseline, output)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,527 @@
+"""Offline stand-ins for the embeddings API, the chat model and real documents."""
+
+import asyncio
+import hashlib
+import html
+import math
+import random
+import re
+import threading
+import time
+import uuid
+import zipfile
+from collections.abc import AsyncIterator, Iterable, Iterator
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import (
+    AIMessage,
+    AIMessageChunk,
+    BaseMessage,
+    HumanMessage,
+    ToolMessage,
+)
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from qdrant_client import QdrantClient
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+class HashingEmbeddings(Embeddings):
+    """Deterministic bag-of-words embeddings (signed feature hashing).
+
+    Texts sharing words get similar vectors, so retrieval quality is meaningful
+    without any network calls.
+    """
+
+    def __init__(self, *, size: int = 256) -> None:
+        self.size = size
+
+    def _embed(self, text: str) -> list[float]:
+        vector = [0.0] * self.size
+        for token in _TOKEN_RE.findall(text.lower()):
+            digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+            value = int.from_bytes(digest, "little")
+            sign = 1.0 if value & 1 else -1.0
+            vector[(value >> 1) % self.size] += sign
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self._embed(text)
+
+
+class LexicalCrossEncoder:
+    """Cross-encoder stand-in: logit from query-word bigram overlap.
+
+    Exact phrase matches outrank bag-of-words similarity, which is roughly
+    what a real cross-encoder adds over dense retrieval. `latency_s` is spent
+    per batch to mimic model inference.
+    """
+
+    def __init__(self, *, latency_s: float = 0.0) -> None:
+        self.latency_s = latency_s
+
+    def rerank(
+        self, query: str, documents: Iterable[str], batch_size: int = 64
+    ) -> list[float]:
+        time.sleep(self.latency_s)
+        words = _TOKEN_RE.findall(query.lower())
+        bigrams = set(zip(words, words[1:])) or {(w,) for w in words}
+        scores = []
+        for document in documents:
+            doc_words = _TOKEN_RE.findall(document.lower())
+            doc_bigrams = set(zip(doc_words, doc_words[1:])) | {(w,) for w in doc_words}
+            overlap = len(bigrams & doc_bigrams) / max(len(bigrams), 1)
+            scores.append(8.0 * overlap - 4.0)
+        return scores
+
+
+class PaddedEmbeddingModel:
+    """Local embedding model stand-in (`lib.local_embeddings.EmbeddingModel`).
+
+    Vectors are `HashingEmbeddings`; each `embed` call sleeps for
+    `us_per_token x batch size x longest text`, like a transformer that pads
+    the batch, and the sleep releases the GIL as ONNX Runtime does. `calls`
+    and `padded_tokens` count the work done.
+    """
+
+    def __init__(
+        self, *, size: int = 256, us_per_token: float = 2.0, overhead_ms: float = 1.0
+    ) -> None:
+        self.hashing = HashingEmbeddings(size=size)
+        self.us_per_token = us_per_token
+        self.overhead_ms = overhead_ms
+        self.calls = 0
+        self.padded_tokens = 0
+        self._lock = threading.Lock()
+
+    def embed(self, documents: Iterable[str], batch_size: int = 64) -> np.ndarray:
+        texts = list(documents)
+        padded = len(texts) * max(len(text) // 4 + 2 for text in texts)
+        with self._lock:
+            self.calls += 1
+            self.padded_tokens += padded
+        time.sleep(self.overhead_ms / 1000 + padded * self.us_per_token / 1e6)
+        return np.asarray(self.hashing.embed_documents(texts), dtype=np.float32)
+
+
+class DiscardingVectorStore:
+    """`IngestionPipeline` target that counts points and drops them.
+
+    Nothing is stored, so no source has existing points and memory and time
+    measured around the pipeline are its own, not the vector store's.
+    `first_upsert` is the `perf_counter()` time of the first upsert.
+    """
+
+    collection_name = "discard"
+    vector_name = ""
+    sparse_embeddings = None
+    content_payload_key = "page_content"
+    metadata_payload_key = "metadata"
+
+    def __init__(self, *, embeddings: Embeddings) -> None:
+        self.embeddings = embeddings
+        self.client = self
+        self.points = 0
+        self.first_upsert: float | None = None
+        self._lock = threading.Lock()
+
+    def scroll(self, **kwargs: Any) -> tuple[list[Any], None]:
+        return [], None
+
+    def upsert(self, *, collection_name: str, points: list[Any]) -> None:
+        with self._lock:
+            self.points += len(points)
+            if self.first_upsert is None:
+                self.first_upsert = time.perf_counter()
+
+    def delete(self, **kwargs: Any) -> None:
+        return None
+
+
+class _Serialized:
+    """Proxy running every method call of `target` under one lock."""
+
+    def __init__(self, target: Any) -> None:
+        self._target = target
+        self._lock = threading.RLock()
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._target, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args: Any, **kwargs: Any) -> Any:
+            with self._lock:
+                return attr(*args, **kwargs)
+
+        return call
+
+
+def memory_qdrant_client() -> QdrantClient:
+    """In-memory Qdrant client that can be shared by the ingestion threads.
+
+    Local mode keeps points in plain NumPy arrays, which concurrent upserts and
+    scrolls corrupt, so calls are serialized. Qdrant server needs no such lock.
+    """
+    client = QdrantClient(":memory:")
+    client._client = _Serialized(client._client)
+    return client
+
+
+class FakeStreamingChatModel(BaseChatModel):
+    """Chat model that streams a fixed-length answer at a configurable rate.
+
+    When tools are bound (agent mode) and the conversation has no tool result
+    yet, it first emits a `retrieve_context` call for the latest user message.
+    The last chunk reports usage, with prompt tokens estimated as chars / 4.
+    """
+
+    tokens_per_s: float = 200.0
+    answer_tokens: int = 64
+    first_token_latency_s: float = 0.05
+    tools_bound: bool = False
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-streaming-chat"
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> "FakeStreamingChatModel":
+        return self.model_copy(update={"tools_bound": True})
+
+    def _wants_tool_call(self, messages: list[BaseMessage]) -> bool:
+        return self.tools_bound and not any(
+            isinstance(m, ToolMessage) for m in messages
+        )
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: CallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        text = ""
+        tool_calls = []
+        for chunk in self._stream(messages, stop=stop, **kwargs):
+            text += chunk.text
+            tool_calls.extend(chunk.message.tool_calls)
+        message = AIMessage(content=text, tool_calls=tool_calls)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _chunks(self, messages: list[BaseMessage]) -> list[ChatGenerationChunk]:
+        if self._wants_tool_call(messages):
+            question = next(
+                (m.content for m in reversed(messages) if isinstance(m, HumanMessage)),
+                "",
+            )
+            return [
+                ChatGenerationChunk(
+                    message=AIMessageChunk(
+                        content="",
+                        tool_calls=[
+                            {
+                                "name": "retrieve_context",
+                                "args": {"query": str(question)},
+                                "id": f"call_{uuid.uuid4().hex[:12]}",
+                            }
+                        ],
+                    )
+                )
+            ]
+
+        input_tokens = math.ceil(sum(len(str(m.content)) for m in messages) / 4)
+        chunks = []
+        for i in range(self.answer_tokens):
+            usage = None
+            if i == self.answer_tokens - 1:
+                usage = {
+                    "input_tokens": input_tokens,
+                    "output_tokens": self.answer_tokens,
+                    "total_tokens": input_tokens + self.answer_tokens,
+                }
+            chunks.append(
+                ChatGenerationChunk(
+                    message=AIMessageChunk(content=f"tok{i} ", usage_metadata=usage)
+                )
+            )
+        return chunks
+
+    def _stream(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: CallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.first_token_latency_s)
+        delay = 1.0 / self.tokens_per_s if self.tokens_per_s > 0 else 0.0
+        for i, chunk in enumerate(self._chunks(messages)):
+            if i:
+                time.sleep(delay)
+            if run_manager and chunk.text:
+                run_manager.on_llm_new_token(chunk.text)
+            yield chunk
+
+    async def _astream(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        # Waits without holding a thread, like a network-bound model client.
+        await asyncio.sleep(self.first_token_latency_s)
+        delay = 1.0 / self.tokens_per_s if self.tokens_per_s > 0 else 0.0
+        for i, chunk in enumerate(self._chunks(messages)):
+            if i:
+                await asyncio.sleep(delay)
+            if run_manager and chunk.text:
+                await run_manager.on_llm_new_token(chunk.text)
+            yield chunk
+
+
+# ----------------------------------------------------------------------
+# Synthetic corpus
+# ----------------------------------------------------------------------
+
+_VOCABULARY = [
+    "alpha", "beam", "calibration", "damper", "encoder", "flange", "gasket",
+    "housing", "impeller", "joint", "kinematic", "lubricant", "manifold",
+    "nozzle", "oscillator", "pressure", "quadrant", "relay", "sensor",
+    "thermostat", "valve", "winding", "actuator", "bearing", "coupling",
+    "diaphragm", "exhaust", "filter", "governor", "hydraulic", "inverter",
+    "junction", "coolant", "limiter", "motor", "nut", "o-ring", "piston",
+    "regulator", "spindle", "turbine", "torque", "voltage", "wiring",
+]  # fmt: skip
+
+
+def synthetic_page_text(doc_index: int, page_index: int, *, words: int = 400) -> str:
+    """Deterministic pseudo-manual text for one page."""
+    rng = random.Random(doc_index * 1_000_003 + page_index)
+    lines = [f"Section {page_index + 1}: part PN-{doc_index:03d}-{page_index:04d}"]
+    sentence: list[str] = []
+    for _ in range(words):
+        sentence.append(rng.choice(_VOCABULARY))
+        if len(sentence) >= rng.randint(8, 16):
+            lines.append(" ".join(sentence).capitalize() + ".")
+            sentence = []
+    if sentence:
+        lines.append(" ".join(sentence).capitalize() + ".")
+    return "\n".join(lines)
+
+
+def synthetic_manual_pages(
+    doc_index: int, *, sections: int = 24, page_chars: int = 2400, line_chars: int = 90
+) -> list[str]:
+    """Pages of a manual whose sections run across page breaks.
+
+    Each section is a heading and 1-5 paragraphs of 30-200 words, mostly drawn
+    from the section's own 8-word topic (so sections differ like real ones
+    do). Lines are wrapped at `line_chars` and pages cut every `page_chars`,
+    mid-paragraph and mid-sentence like a typeset document.
+    """
+    rng = random.Random(doc_index)
+    lines: list[str] = []
+    for section in range(sections):
+        lines += [f"Section {section + 1}: part PN-{doc_index:03d}-{section:04d}", ""]
+        topic = rng.sample(_VOCABULARY, 8)
+        for _ in range(rng.randint(1, 5)):
+            words: list[str] = []
+            sentence: list[str] = []
+            for _ in range(rng.randint(30, 200)):
+                sentence.append(
+                    rng.choice(topic if rng.random() < 0.7 else _VOCABULARY)
+                )
+                if len(sentence) >= rng.randint(8, 16):
+                    words += (" ".join(sentence).capitalize() + ".").split(" ")
+                    sentence = []
+            if sentence:
+                words += (" ".join(sentence).capitalize() + ".").split(" ")
+            line: list[str] = []
+            for word in words:
+                if line and len(" ".join(line)) + len(word) + 1 > line_chars:
+                    lines.append(" ".join(line))
+                    line = []
+                line.append(word)
+            lines += [" ".join(line), ""]
+    pages, page, size = [], [], 0
+    for line in lines:
+        if size + len(line) > page_chars and page:
+            pages.append("\n".join(page))
+            page, size = [], 0
+        page.append(line)
+        size += len(line) + 1
+    pages.append("\n".join(page))
+    return pages
+
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_text_pdf(path: Path, pages: list[str], *, line_chars: int = 90) -> None:
+    """Write a minimal, text-extractable PDF (Helvetica, one stream per page)."""
+    objects: list[bytes] = []
+
+    def add(obj: bytes) -> int:
+        objects.append(obj)
+        return len(objects)
+
+    font_id = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    pages_id = font_id + 2 * len(pages) + 1
+    page_ids = []
+    for text in pages:
+        ops = ["BT /F1 9 Tf 40 760 Td 11 TL"]
+        for paragraph in text.split("\n"):
+            for start in range(0, max(len(paragraph), 1), line_chars):
+                chunk = _pdf_escape(paragraph[start : start + line_chars])
+                ops.append(f"({chunk}) Tj T*")
+        ops.append("ET")
+        stream = "\n".join(ops).encode("latin-1", errors="replace")
+        content_id = add(
+            b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream"
+        )
+        page_ids.append(
+            add(
+                b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 612 792] "
+                b"/Contents %d 0 R /Resources << /Font << /F1 %d 0 R >> >> >>"
+                % (pages_id, content_id, font_id)
+            )
+        )
+    kids = b" ".join(b"%d 0 R" % page_id for page_id in page_ids)
+    add(b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(pages)))
+    catalog_id = add(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + obj + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1,
+        catalog_id,
+        xref,
+    )
+    path.write_bytes(bytes(out))
+
+
+def write_text_plain(path: Path, pages: list[str]) -> None:
+    """Plain text, pages separated by form feeds."""
+    path.write_text("\f".join(pages) + "\n", encoding="utf-8")
+
+
+def write_text_markdown(path: Path, pages: list[str]) -> None:
+    """Markdown, one `##` section per page (its first line is the heading)."""
+    with open(path, "w", encoding="utf-8") as f:
+        for text in pages:
+            heading, *lines = text.split("\n")
+            f.write(f"## {heading}\n\n" + "\n\n".join(lines) + "\n\n")
+
+
+def write_text_html(path: Path, pages: list[str]) -> None:
+    """HTML, one `<h2>` section per page (its first line is the heading)."""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("<!DOCTYPE html>\n<html><head><title>Manual</title>")
+        f.write("<style>p { margin: 0 }</style></head><body>\n")
+        for text in pages:
+            heading, *lines = (html.escape(line) for line in text.split("\n"))
+            f.write(f"<h2>{heading}</h2>\n")
+            f.write("".join(f"<p>{line}</p>\n" for line in lines))
+        f.write("</body></html>\n")
+
+
+def write_text_docx(path: Path, pages: list[str]) -> None:
+    """Minimal Word document, one paragraph per line and a page break per page."""
+    namespace = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr(
+            "[Content_Types].xml",
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/'
+            'content-types"><Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/word/document.xml" ContentType="application/'
+            'vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+            "</Types>",
+        )
+        with zf.open("word/document.xml", "w") as f:
+            f.write(
+                f'<?xml version="1.0" encoding="UTF-8"?><w:document xmlns:w="'
+                f'{namespace}"><w:body>'.encode()
+            )
+            for number, text in enumerate(pages):
+                if number:
+                    f.write(b'<w:p><w:r><w:br w:type="page"/></w:r></w:p>')
+                for line in text.split("\n"):
+                    f.write(
+                        f"<w:p><w:r><w:t>{html.escape(line)}</w:t></w:r></w:p>".encode()
+                    )
+            f.write(b"</w:body></w:document>")
+
+
+DOCUMENT_WRITERS = {
+    "pdf": write_text_pdf,
+    "docx": write_text_docx,
+    "html": write_text_html,
+    "markdown": write_text_markdown,
+    "text": write_text_plain,
+}
+
+
+def write_corpus(
+    directory: Path, *, documents: int, pages_per_document: int
+) -> list[Path]:
+    """Write `documents` synthetic PDFs; returns their paths."""
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for doc_index in range(documents):
+        path = directory / f"manual-{doc_index:03d}.pdf"
+        pages = [
+            synthetic_page_text(doc_index, page_index)
+            for page_index in range(pages_per_document)
+        ]
+        write_text_pdf(path, pages)
+        paths.append(path)
+    return paths
+
+
+def corpus_questions(
+    paths: list[Path],
+    *,
+    count: int,
+    pages_per_document: int,
+    kind: str = "sentence",
+    seed: int = 7,
+) -> list[tuple[str, str, int]]:
+    """`(question, expected_source, expected_page)` drawn from the corpus text.
+
+    `kind="sentence"` reuses a sentence of the page; `kind="part_number"` asks
+    for the page's part number, an exact-term query dense embeddings handle badly.
+    """
+    rng = random.Random(seed)
+    questions = []
+    for _ in range(count):
+        doc_index = rng.randrange(len(paths))
+        page_index = rng.randrange(pages_per_document)
+        if kind == "part_number":
+            question = f"Which section covers part PN-{doc_index:03d}-{page_index:04d}?"
+        else:
+            lines = synthetic_page_text(doc_index, page_index).split("\n")[1:]
+            question = rng.choice(lines).rstrip(".")
+        questions.append((question, str(paths[doc_index]), page_index + 1))
+    return questions
@@ -0,0 +1,126 @@
+"""Ingestion format benchmark: extraction + chunking throughput per format.
+
+Run from `src/`:
+
+    uv run python -m bench.ingest_formats --pages 2000
+
+Writes the same synthetic pages as PDF, DOCX, HTML, Markdown and plain text
+(one page per PDF page, DOCX page break, `<h2>` / `##` section or form feed)
+and loads each file through `IngestionRegistry` on one thread (PDFs use
+`PDFIngestion`, not the process pool, so formats are compared like for like).
+
+Reports MB/s, pages/s and chunks/s (best of `--repeat` runs), and whether every
+page is covered by the chunks' `page` .. `page_end` spans, which checks that
+every format yields the same metadata. `--chunking` picks the chunker as for
+`main.py --store`.
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+from bench.common import default_output_path, print_comparison, save_results
+from bench.fakes import DOCUMENT_WRITERS, synthetic_page_text
+from lib.chunking import StructuredChunker
+from lib.ingestion import FORMAT_SUFFIXES
+from lib.ingestion_pdf import PDFIngestion
+from lib.ingestion_registry import IngestionRegistry, default_engines
+
+
+def bench_format(
+    registry: IngestionRegistry, path: Path, *, pages: int, repeat: int
+) -> dict[str, Any]:
+    best_s = float("inf")
+    chunks = 0
+    seen_pages: set[int] = set()
+    for _ in range(repeat):
+        seen_pages = set()
+        chunks = 0
+        started = time.perf_counter()
+        for doc in registry.iter_load(path):
+            chunks += 1
+            page = doc.metadata["page"]
+            seen_pages.update(range(page, doc.metadata.get("page_end", page) + 1))
+        best_s = min(best_s, time.perf_counter() - started)
+    size_mb = path.stat().st_size / 1e6
+    return {
+        "format": registry.engine_for(path).format,
+        "size_mb": round(size_mb, 2),
+        "chunks": chunks,
+        "pages_ok": seen_pages == set(range(1, pages + 1)),
+        "elapsed_s": round(best_s, 3),
+        "mb_per_s": round(size_mb / best_s, 2),
+        "pages_per_s": round(pages / best_s, 1),
+        "chunks_per_s": round(chunks / best_s, 1),
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="bench.ingest_formats", description=__doc__)
+    parser.add_argument("--pages", type=int, default=2000, help="Pages per file.")
+    parser.add_argument(
+        "--formats",
+        default=",".join(DOCUMENT_WRITERS),
+        help="Comma-separated formats to run.",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per format.")
+    parser.add_argument(
+        "--chunking",
+        choices=("structured", "recursive"),
+        default="structured",
+        help="Chunking strategy (as --chunking of main.py).",
+    )
+    parser.add_argument("--output", type=Path, help="Where to write the JSON results.")
+    parser.add_argument(
+        "--baseline", type=Path, help="Earlier results JSON to compare against."
+    )
+    args = parser.parse_args(argv)
+
+    formats = [fmt.strip() for fmt in args.formats.split(",") if fmt.strip()]
+    chunker = StructuredChunker() if args.chunking == "structured" else None
+    engines = default_engines(chunker=chunker)
+    engines["pdf"] = PDFIngestion(chunker=chunker)
+    registry = IngestionRegistry(engines=engines)
+    pages = [synthetic_page_text(0, page) for page in range(args.pages)]
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="rag-bench-") as tmp:
+        for fmt in formats:
+            path = Path(tmp) / f"manual{FORMAT_SUFFIXES[fmt][0]}"
+            DOCUMENT_WRITERS[fmt](path, pages)
+            results.append(
+                bench_format(registry, path, pages=args.pages, repeat=args.repeat)
+            )
+
+    print(
+        f"\n  {'format':<9} {'MB':>6} {'chunks':>7} {'MB/s':>7} {'pages/s':>9} "
+        f"{'chunks/s':>9} {'pages ok':>8}"
+    )
+    for r in results:
+        print(
+            f"  {r['format']:<9} {r['size_mb']:>6.1f} {r['chunks']:>7} "
+            f"{r['mb_per_s']:>7.1f} {r['pages_per_s']:>9.1f} "
+            f"{r['chunks_per_s']:>9.1f} {'yes' if r['pages_ok'] else 'NO':>8}"
+        )
+
+    output = args.output or default_output_path("ingest_formats")
+    save_results(
+        output,
+        name="ingest_formats",
+        config={
+            "pages": args.pages,
+            "repeat": args.repeat,
+            "formats": formats,
+            "chunking": args.chunking,
+        },
+        results=results,
+    )
+    if args.baseline:
+        print_comparison(args.baseline, output)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,177 @@
+"""Ingestion memory benchmark: peak RSS of storing one very large PDF.
+
+Run from `src/`:
+
+    uv run python -m bench.ingest_memory --pages 10000
+
+Writes one synthetic PDF with `--pages` pages, then measures each mode in a
+fresh interpreter (so peaks do not carry over):
+
+- `list`: `PDFIngestion.load` (all chunks in a list), then the storing pipeline
+- `stream`: `PDFIngestion.iter_load` straight into the storing pipeline, which
+  embeds and upserts fixed-size windows and releases them
+- `extract`: `iter_load` alone (the extraction floor)
+
+The pipeline embeds with `HashingEmbeddings` and upserts into
+`DiscardingVectorStore`, so the numbers are ingestion's own memory, not the
+vector store's. Reports peak RSS, its growth over the interpreter with all
+modules imported, and the time to the first upsert.
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+from bench.common import (
+    default_output_path,
+    peak_rss_mb,
+    print_comparison,
+    save_results,
+)
+from bench.fakes import synthetic_page_text, write_text_pdf
+
+SRC_DIR = Path(__file__).resolve().parents[1]
+MODES = ("list", "stream", "extract")
+
+
+def _peak_mb() -> float:
+    """Peak RSS of this process image.
+
+    Linux carries `ru_maxrss` over `exec`, so a child would report the peak of
+    the parent that wrote the PDF; `VmHWM` starts fresh.
+    """
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return peak_rss_mb()
+
+
+def measure(mode: str, pdf: Path, *, batch_size: int) -> dict[str, Any]:
+    """Run one mode in this process; called in a fresh interpreter."""
+    from bench.fakes import DiscardingVectorStore, HashingEmbeddings
+    from lib.ingestion_pdf import PDFIngestion
+    from lib.ingestion_pipeline import IngestionPipeline
+
+    baseline = _peak_mb()
+    ingestion = PDFIngestion()
+    store = DiscardingVectorStore(embeddings=HashingEmbeddings())
+    pipeline = IngestionPipeline(vector_store=store, batch_size=batch_size)
+    started = time.perf_counter()
+    if mode == "list":
+        chunks = pipeline.run(ingestion.load(pdf)).chunks
+    elif mode == "stream":
+        chunks = pipeline.run(ingestion.iter_load(pdf)).chunks
+    else:
+        chunks = sum(1 for _ in ingestion.iter_load(pdf))
+    elapsed_s = time.perf_counter() - started
+    peak = _peak_mb()
+    return {
+        "mode": mode,
+        "chunks": chunks,
+        "elapsed_s": round(elapsed_s, 2),
+        "first_upsert_ms": (
+            round((store.first_upsert - started) * 1000, 1)
+            if store.first_upsert is not None
+            else None
+        ),
+        "baseline_rss_mb": baseline,
+        "peak_rss_mb": peak,
+        "growth_mb": round(peak - baseline, 1),
+    }
+
+
+def _run_child(mode: str, pdf: Path, *, batch_size: int) -> dict[str, Any]:
+    proc = subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "bench.ingest_memory",
+            "--child",
+            mode,
+            "--pdf",
+            str(pdf),
+            "--batch-size",
+            str(batch_size),
+        ],
+        cwd=SRC_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"{mode} failed:\n{proc.stderr[-2000:]}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="bench.ingest_memory", description=__doc__)
+    parser.add_argument("--pages", type=int, default=10_000, help="PDF page count.")
+    parser.add_argument(
+        "--pdf", type=Path, help="Measure this PDF instead of a synthetic one."
+    )
+    parser.add_argument(
+        "--modes", default=",".join(MODES), help="Comma-separated modes to run."
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=64, help="Chunks per embed/upsert window."
+    )
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--output", type=Path, help="Where to write the JSON results.")
+    parser.add_argument(
+        "--baseline", type=Path, help="Earlier results JSON to compare against."
+    )
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(measure(args.child, args.pdf, batch_size=args.batch_size)))
+        return 0
+
+    modes = [mode.strip() for mode in args.modes.split(",") if mode.strip()]
+    with tempfile.TemporaryDirectory(prefix="rag-bench-") as tmp:
+        pdf = args.pdf
+        if pdf is None:
+            pdf = Path(tmp) / "large.pdf"
+            write_text_pdf(
+                pdf, [synthetic_page_text(0, page) for page in range(args.pages)]
+            )
+        size_mb = round(pdf.stat().st_size / 1e6, 1)
+        print(f"PDF {pdf} ({size_mb} MB)")
+        results = [_run_child(mode, pdf, batch_size=args.batch_size) for mode in modes]
+
+    print(
+        f"\n  {'mode':<8} {'chunks':>7} {'peak MB':>8} {'growth MB':>10} "
+        f"{'first upsert ms':>16} {'elapsed s':>10}"
+    )
+    for r in results:
+        first = "-" if r["first_upsert_ms"] is None else f"{r['first_upsert_ms']:.0f}"
+        print(
+            f"  {r['mode']:<8} {r['chunks']:>7} {r['peak_rss_mb']:>8.1f} "
+            f"{r['growth_mb']:>10.1f} {first:>16} {r['elapsed_s']:>10.1f}"
+        )
+
+    output = args.output or default_output_path("ingest_memory")
+    save_results(
+        output,
+        name="ingest_memory",
+        config={
+            "pages": None if args.pdf else args.pages,
+            "pdf_mb": size_mb,
+            "batch_size": args.batch_size,
+        },
+        results=results,
+    )
+    if args.baseline:
+        print_comparison(args.baseline, output)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
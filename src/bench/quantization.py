@@ -0,0 +1,282 @@
+"""Recall vs. latency of quantization, HNSW and rescoring settings.
+
+Run from `src/` against a Qdrant server (local mode ignores quantization and
+HNSW, so it only checks that the script works):
+
+    uv run python -m bench.quantization --host localhost --points 100000 --dim 768
+
+One collection is built per quantization mode from the same synthetic,
+clustered unit vectors. Ground truth is an exact (brute-force) search on the
+unquantized collection; each search setting reports recall@k and query latency.
+"""
+
+import argparse
+import logging
+import time
+import warnings
+from itertools import product as cartesian
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.http import models as qdrant_models
+
+from bench.common import (
+    default_output_path,
+    parse_int_list,
+    percentiles,
+    print_comparison,
+    save_results,
+)
+from bench.fakes import memory_qdrant_client
+from lib.collection_config import QUANTIZATION_MODES, CollectionConfig
+
+COLLECTION_PREFIX = "bench_quantization"
+
+
+def clustered_vectors(
+    rng: np.random.Generator, *, count: int, dim: int, centers: np.ndarray
+) -> np.ndarray:
+    """Unit vectors scattered around `centers`, like embeddings of related text."""
+    picks = centers[rng.integers(len(centers), size=count)]
+    vectors = picks + 0.35 * rng.standard_normal((count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def _wait_indexed(
+    client: QdrantClient, name: str, *, points: int, timeout_s: float
+) -> float:
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout_s:
+        info = client.get_collection(collection_name=name)
+        indexed = info.indexed_vectors_count or 0
+        if info.status == qdrant_models.CollectionStatus.GREEN and indexed >= points:
+            break
+        time.sleep(0.5)
+    else:
+        logging.warning("Collection %s not fully indexed after %.0fs", name, timeout_s)
+    return time.perf_counter() - started
+
+
+def build_collection(
+    client: QdrantClient,
+    *,
+    quantization: str | None,
+    vectors: np.ndarray,
+    hnsw_m: int | None,
+    hnsw_ef_construct: int | None,
+    on_disk_vectors: bool,
+    timeout_s: float,
+) -> dict[str, Any]:
+    name = f"{COLLECTION_PREFIX}_{quantization or 'none'}"
+    config = CollectionConfig(
+        quantization=quantization,
+        on_disk_vectors=on_disk_vectors,
+        hnsw_m=hnsw_m,
+        hnsw_ef_construct=hnsw_ef_construct,
+    )
+    if client.collection_exists(collection_name=name):
+        client.delete_collection(collection_name=name)
+    client.create_collection(
+        collection_name=name,
+        vectors_config=config.vector_params(
+            size=vectors.shape[1], distance=qdrant_models.Distance.COSINE
+        ),
+        # Build HNSW for small benchmark collections too.
+        optimizers_config=qdrant_models.OptimizersConfigDiff(indexing_threshold=1),
+    )
+
+    started = time.perf_counter()
+    client.upload_collection(
+        collection_name=name,
+        vectors=vectors,
+        ids=range(len(vectors)),
+        batch_size=512,
+    )
+    upload_s = time.perf_counter() - started
+    index_s = (
+        _wait_indexed(client, name, points=len(vectors), timeout_s=timeout_s)
+        if timeout_s > 0
+        else 0.0
+    )
+    return {
+        "collection": name,
+        "config": config,
+        "upload_s": round(upload_s, 2),
+        "index_s": round(index_s, 2),
+        "index_ram_mb": round(
+            config.bytes_per_vector(vectors.shape[1]) * len(vectors) / 2**20, 1
+        ),
+    }
+
+
+def run_queries(
+    client: QdrantClient,
+    collection: str,
+    queries: np.ndarray,
+    *,
+    k: int,
+    search_params: qdrant_models.SearchParams | None,
+) -> tuple[list[list[int]], list[float]]:
+    ids, latencies = [], []
+    for query in queries:
+        started = time.perf_counter()
+        response = client.query_points(
+            collection_name=collection,
+            query=query.tolist(),
+            limit=k,
+            search_params=search_params,
+            with_payload=False,
+        )
+        latencies.append((time.perf_counter() - started) * 1000)
+        ids.append([int(point.id) for point in response.points])
+    return ids, latencies
+
+
+def _recall(found: list[list[int]], truth: list[list[int]], k: int) -> float:
+    hits = sum(len(set(f) & set(t[:k])) for f, t in zip(found, truth))
+    return round(hits / (k * len(truth)), 4)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="bench.quantization", description=__doc__)
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=6333)
+    parser.add_argument(
+        "--local",
+        action="store_true",
+        help="Use in-memory local mode (smoke test only: settings are ignored).",
+    )
+    parser.add_argument("--points", type=int, default=50_000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--clusters", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument(
+        "--quantization",
+        default="none," + ",".join(QUANTIZATION_MODES),
+        help="Comma-separated modes to build (none,scalar,product,binary).",
+    )
+    parser.add_argument("--search-ef", default="32,64,128", help="hnsw_ef values.")
+    parser.add_argument(
+        "--oversampling", default="1,2,4", help="Oversampling factors (quantized)."
+    )
+    parser.add_argument("--hnsw-m", type=int, default=None)
+    parser.add_argument("--hnsw-ef-construct", type=int, default=None)
+    parser.add_argument("--on-disk-vectors", action="store_true")
+    parser.add_argument("--index-timeout-s", type=float, default=600.0)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--keep", action="store_true", help="Keep the collections.")
+    parser.add_argument("--output", type=Path)
+    parser.add_argument("--baseline", type=Path)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    warnings.filterwarnings("ignore", message="Payload indexes have no effect")
+
+    if args.local:
+        print("Local mode ignores quantization and HNSW: expect recall 1.0.")
+        warnings.filterwarnings("ignore", category=UserWarning, module="qdrant_client")
+        client = memory_qdrant_client()
+    else:
+        client = QdrantClient(host=args.host, port=args.port, timeout=120)
+
+    modes = [
+        None if mode == "none" else mode
+        for mode in args.quantization.split(",")
+        if mode.strip()
+    ]
+    search_efs = parse_int_list(args.search_ef)
+    oversamplings = [float(v) for v in args.oversampling.split(",") if v.strip()]
+
+    rng = np.random.default_rng(args.seed)
+    centers = rng.standard_normal((args.clusters, args.dim)).astype(np.float32)
+    vectors = clustered_vectors(rng, count=args.points, dim=args.dim, centers=centers)
+    queries = clustered_vectors(rng, count=args.queries, dim=args.dim, centers=centers)
+
+    built = {}
+    for mode in dict.fromkeys([None, *modes]):
+        built[mode] = build_collection(
+            client,
+            quantization=mode,
+            vectors=vectors,
+            hnsw_m=args.hnsw_m,
+            hnsw_ef_construct=args.hnsw_ef_construct,
+            on_disk_vectors=args.on_disk_vectors,
+            # Local mode has no HNSW index to wait for.
+            timeout_s=0.0 if args.local else args.index_timeout_s,
+        )
+
+    truth, _ = run_queries(
+        client,
+        built[None]["collection"],
+        queries,
+        k=args.k,
+        search_params=qdrant_models.SearchParams(exact=True),
+    )
+
+    results = []
+    print(
+        f"\n{'quantization':<12} {'ef':>5} {'overs.':>6} {'rescore':>7} "
+        f"{'recall@k':>8} {'p50 ms':>7} {'p95 ms':>7} {'index MB':>9}"
+    )
+    for mode in modes:
+        info = built[mode]
+        settings = (
+            list(cartesian(search_efs, oversamplings, (True, False)))
+            if mode
+            else [(ef, None, True) for ef in search_efs]
+        )
+        for ef, oversampling, rescore in settings:
+            config = CollectionConfig(
+                quantization=mode,
+                search_ef=ef,
+                oversampling=oversampling,
+                rescore=rescore,
+            )
+            found, latencies = run_queries(
+                client,
+                info["collection"],
+                queries,
+                k=args.k,
+                search_params=config.search_params(),
+            )
+            latency = percentiles(latencies, (50, 95))
+            result = {
+                "quantization": mode or "none",
+                "search_ef": ef,
+                "oversampling": oversampling,
+                "rescore": rescore,
+                "recall": _recall(found, truth, args.k),
+                "latency_ms": latency,
+                "index_ram_mb": info["index_ram_mb"],
+                "upload_s": info["upload_s"],
+                "index_s": info["index_s"],
+            }
+            results.append(result)
+            print(
+                f"{result['quantization']:<12} {ef:>5} {oversampling or '-':>6} "
+                f"{'yes' if rescore else 'no':>7} {result['recall']:>8.4f} "
+                f"{latency['p50']:>7.2f} {latency['p95']:>7.2f} "
+                f"{info['index_ram_mb']:>9.1f}"
+            )
+
+    if not args.keep:
+        for info in built.values():
+            client.delete_collection(collection_name=info["collection"])
+
+    config = {
+        key: value
+        for key, value in vars(args).items()
+        if key not in ("output", "baseline")
+    }
+    output = args.output or default_output_path("quantization")
+    save_results(output, name="quantization", config=config, results=results)
+    if args.baseline:
+        print_comparison(args.baseline, output)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
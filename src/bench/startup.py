@@ -0,0 +1,150 @@
+"""Startup benchmark: CLI wall time and `-X importtime` breakdown.
+
+Run from `src/`:
+
+    uv run python -m bench.startup --runs 5
+
+Each measurement is a fresh interpreter. Reports
+
+- `main.py --help` wall time and the slowest top-level imports
+- the cold import time of every `lib` module on its own (what a mode pays
+  for the modules it loads)
+- with `--search QUERY`, `main.py --search-only QUERY --skip-verify` wall time
+  (needs the configured Qdrant and a cached query embedding or an API key)
+"""
+
+import argparse
+import os
+import pkgutil
+import re
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+from bench.common import (
+    default_output_path,
+    percentiles,
+    print_comparison,
+    save_results,
+)
+
+SRC_DIR = Path(__file__).resolve().parents[1]
+MAIN = SRC_DIR / "main.py"
+
+# "import time: self [us] | cumulative | imported package", nesting by indent.
+_IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)$")
+
+
+def parse_importtime(stderr: str) -> list[tuple[str, float]]:
+    """Top-level imports as `(module, cumulative_ms)`, in import order."""
+    top = []
+    for line in stderr.splitlines():
+        match = _IMPORT_LINE.match(line)
+        if match and len(match.group(3)) == 1:
+            top.append((match.group(4), int(match.group(2)) / 1000))
+    return top
+
+
+def _run(args: list[str]) -> tuple[float, list[tuple[str, float]]]:
+    """Run `python -X importtime *args` from `src/`; returns (wall_ms, imports)."""
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        cwd=SRC_DIR,
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+    if proc.returncode != 0:
+        raise RuntimeError(f"{' '.join(args)} failed:\n{proc.stderr[-2000:]}")
+    return wall_ms, parse_importtime(proc.stderr)
+
+
+def bench_command(name: str, args: list[str], *, runs: int, top: int) -> dict[str, Any]:
+    walls, imports = [], []
+    for _ in range(runs):
+        wall_ms, imports = _run(args)
+        walls.append(wall_ms)
+    slowest = sorted(imports, key=lambda item: item[1], reverse=True)[:top]
+    return {
+        "command": name,
+        "wall_ms": percentiles(walls, (50, 95)),
+        "import_ms": round(sum(ms for _, ms in imports), 1),
+        "top_imports": [{"module": m, "ms": round(ms, 1)} for m, ms in slowest],
+    }
+
+
+def bench_modules(*, runs: int) -> list[dict[str, Any]]:
+    modules = sorted(
+        f"lib.{info.name}" for info in pkgutil.iter_modules([str(SRC_DIR / "lib")])
+    )
+    results = []
+    for module in modules:
+        samples = []
+        for _ in range(runs):
+            _, imports = _run(["-c", f"import {module}"])
+            samples.append(next(ms for name, ms in imports if name == module))
+        results.append(
+            {"module": module, "import_ms": percentiles(samples, (50,))["p50"]}
+        )
+    return results
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="bench.startup", description=__doc__)
+    parser.add_argument("--runs", type=int, default=5, help="Runs per measurement.")
+    parser.add_argument("--top", type=int, default=8, help="Slowest imports shown.")
+    parser.add_argument(
+        "--search",
+        metavar="QUERY",
+        help="Also time `--search-only QUERY --skip-verify` (needs Qdrant).",
+    )
+    parser.add_argument("--output", type=Path, help="Where to write the JSON results.")
+    parser.add_argument(
+        "--baseline", type=Path, help="Earlier results JSON to compare against."
+    )
+    args = parser.parse_args(argv)
+
+    commands = [
+        bench_command("help", [str(MAIN), "--help"], runs=args.runs, top=args.top)
+    ]
+    if args.search:
+        commands.append(
+            bench_command(
+                "search_only",
+                [str(MAIN), "--search-only", args.search, "--skip-verify"],
+                runs=args.runs,
+                top=args.top,
+            )
+        )
+    modules = bench_modules(runs=args.runs)
+
+    for result in commands:
+        wall = result["wall_ms"]
+        print(
+            f"\n{result['command']}: wall p50={wall['p50']:.0f} ms "
+            f"p95={wall['p95']:.0f} ms, imports={result['import_ms']:.0f} ms"
+        )
+        for item in result["top_imports"]:
+            print(f"  {item['module']:<32} {item['ms']:>8.1f} ms")
+    print("\ncold import, one module per interpreter:")
+    for item in modules:
+        print(f"  {item['module']:<32} {item['import_ms']:>8.1f} ms")
+
+    output = args.output or default_output_path("startup")
+    save_results(
+        output,
+        name="startup",
+        config={"runs": args.runs, "search": bool(args.search)},
+        results=[{"commands": commands, "modules": modules}],
+    )
+    if args.baseline:
+        print_comparison(args.baseline, output)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
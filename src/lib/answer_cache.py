@@ -0,0 +1,321 @@
+import asyncio
+import contextlib
+import logging
+import sys
+import threading
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from typing import Any
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from qdrant_client import QdrantClient
+from qdrant_client.http import models as qdrant_models
+
+from lib.metrics import METRICS, span
+from lib.rag_two_step import ScoredDocument, TokenSink
+from lib.source_catalog import SourceCatalog
+
+log = logging.getLogger(__name__)
+
+_CACHE_REQUESTS = "rag_answer_cache_requests_total"
+
+
+@dataclass
+class CachedAnswer:
+    query: str
+    text: str
+    sources: list[ScoredDocument]
+    similarity: float
+
+
+@dataclass
+class CacheLookup:
+    """A lookup's hit (or None) and the collection version it was made under."""
+
+    answer: CachedAnswer | None
+    version: str
+
+
+class AnswerCache:
+    """Semantic cache of final answers, in a Qdrant collection of its own.
+
+    Entries are keyed by the question's embedding: a lookup returns the most
+    similar earlier question's answer if the cosine similarity reaches
+    `threshold`. Each entry also records
+
+    - the collection version from the source `catalog`, which ingestion
+      bumps whenever documents change, so `--store` invalidates every answer
+      (stale entries are purged on the first lookup that sees the new version)
+    - a `scope` string set by the caller (RAG mode, `k`, context budget), so
+      answers produced with different settings are not mixed; `retrieval_scope`
+      adds process-wide retrieval settings (retrieval mode, search parameters,
+      reranker, filter) to every scope
+
+    A miss is stored under the version its `lookup` saw, not the one current
+    once the answer is done, so an answer generated while `--store` changed
+    the documents is never served as current.
+
+    `client` can be the document Qdrant server (`<collection>__answers`) or a
+    local on-disk `QdrantClient(path=...)`. Query embeddings go through
+    `embeddings`, so with `CachedEmbeddings` a miss costs no extra API call.
+    """
+
+    def __init__(
+        self,
+        *,
+        client: QdrantClient,
+        collection_name: str,
+        embeddings: Embeddings,
+        catalog: SourceCatalog,
+        threshold: float = 0.95,
+        version_ttl_s: float = 5.0,
+        retrieval_scope: str = "",
+    ) -> None:
+        if not 0.0 < threshold <= 1.0:
+            raise ValueError("threshold must be in (0, 1]")
+        self.client = client
+        self.cache_name = f"{collection_name}__answers"
+        self.embeddings = embeddings
+        self.catalog = catalog
+        self.threshold = threshold
+        self.version_ttl_s = version_ttl_s
+        self.retrieval_scope = retrieval_scope
+
+        # Local mode is not thread-safe; a server client does not need this.
+        local = client.init_options.get("location") == ":memory:" or bool(
+            client.init_options.get("path")
+        )
+        self._client_lock = threading.Lock() if local else contextlib.nullcontext()
+        self._version_lock = threading.Lock()
+        self._version: str | None = None
+        self._version_read_at: float | None = None
+        self._purged_version: str | None = None
+
+    def invalidate(self) -> None:
+        """Re-read the collection version on the next lookup."""
+        with self._version_lock:
+            self._version_read_at = None
+
+    def lookup(self, query: str, *, scope: str) -> CacheLookup:
+        scope = self._scope(scope)
+        with span("answer_cache.lookup", scope=scope) as current:
+            version = self._current_version()
+            vector = self.embeddings.embed_query(query)
+            with self._client_lock:
+                if not self.client.collection_exists(collection_name=self.cache_name):
+                    hits = []
+                else:
+                    self._purge_stale(version)
+                    hits = self.client.query_points(
+                        collection_name=self.cache_name,
+                        query=vector,
+                        query_filter=_entry_filter(version=version, scope=scope),
+                        score_threshold=self.threshold,
+                        limit=1,
+                        with_payload=True,
+                    ).points
+            current.set(hit=bool(hits))
+        METRICS.increment(_CACHE_REQUESTS, labels={"result": "hit" if hits else "miss"})
+        if not hits:
+            return CacheLookup(answer=None, version=version)
+
+        payload = hits[0].payload or {}
+        log.info(
+            "Answer cache hit (similarity=%.4f) for `%s` via `%s`",
+            hits[0].score,
+            query,
+            payload.get("query"),
+        )
+        answer = CachedAnswer(
+            query=str(payload.get("query", "")),
+            text=str(payload.get("answer", "")),
+            sources=[
+                (
+                    Document(
+                        page_content=item.get("page_content", ""),
+                        metadata=item.get("metadata") or {},
+                    ),
+                    float(item.get("score", 0.0)),
+                )
+                for item in payload.get("sources") or []
+            ],
+            similarity=hits[0].score,
+        )
+        return CacheLookup(answer=answer, version=version)
+
+    def store(
+        self,
+        query: str,
+        *,
+        scope: str,
+        version: str,
+        text: str,
+        sources: list[ScoredDocument],
+    ) -> None:
+        """Save an answer built from the documents at `version` (from `lookup`)."""
+        if not text.strip():
+            return
+        scope = self._scope(scope)
+        vector = self.embeddings.embed_query(query)
+        with self._client_lock:
+            self._ensure_exists(len(vector))
+            self.client.upsert(
+                collection_name=self.cache_name,
+                points=[
+                    qdrant_models.PointStruct(
+                        id=str(uuid.uuid4()),
+                        vector=vector,
+                        payload={
+                            "query": query,
+                            "answer": text,
+                            "sources": [
+                                {
+                                    "page_content": doc.page_content,
+                                    "metadata": doc.metadata,
+                                    "score": float(score),
+                                }
+                                for doc, score in sources
+                            ],
+                            "scope": scope,
+                            "collection_version": version,
+                            "created_at": datetime.now(UTC).isoformat(
+                                timespec="seconds"
+                            ),
+                        },
+                    )
+                ],
+            )
+
+    def _scope(self, scope: str) -> str:
+        return f"{scope}:{self.retrieval_scope}" if self.retrieval_scope else scope
+
+    def _current_version(self) -> str:
+        with self._version_lock:
+            now = time.monotonic()
+            if (
+                self._version_read_at is None
+                or now - self._version_read_at > self.version_ttl_s
+            ):
+                self._version = self.catalog.version()
+                self._version_read_at = now
+            # Collections ingested before versioning share one initial version.
+            return self._version or "initial"
+
+    def _purge_stale(self, version: str) -> None:
+        if self._purged_version == version:
+            return
+        self.client.delete(
+            collection_name=self.cache_name,
+            points_selector=qdrant_models.FilterSelector(
+                filter=qdrant_models.Filter(
+                    must_not=[
+                        qdrant_models.FieldCondition(
+                            key="collection_version",
+                            match=qdrant_models.MatchValue(value=version),
+                        )
+                    ]
+                )
+            ),
+        )
+        self._purged_version = version
+
+    def _ensure_exists(self, size: int) -> None:
+        if self.client.collection_exists(collection_name=self.cache_name):
+            return
+        self.client.create_collection(
+            collection_name=self.cache_name,
+            vectors_config=qdrant_models.VectorParams(
+                size=size, distance=qdrant_models.Distance.COSINE
+            ),
+        )
+        for field in ("collection_version", "scope"):
+            self.client.create_payload_index(
+                collection_name=self.cache_name,
+                field_name=field,
+                field_schema=qdrant_models.PayloadSchemaType.KEYWORD,
+            )
+        log.info("Created answer cache '%s'", self.cache_name)
+
+
+def answer_scope(*, mode: str, k: int, context_tokens: int | None) -> str:
+    """Settings an answer depends on besides the question and the documents."""
+    return f"{mode}:k={k}:context_tokens={context_tokens or 'all'}"
+
+
+def _entry_filter(*, version: str, scope: str) -> qdrant_models.Filter:
+    return qdrant_models.Filter(
+        must=[
+            qdrant_models.FieldCondition(
+                key="collection_version", match=qdrant_models.MatchValue(value=version)
+            ),
+            qdrant_models.FieldCondition(
+                key="scope", match=qdrant_models.MatchValue(value=scope)
+            ),
+        ]
+    )
+
+
+def answer_with_cache(
+    *,
+    cache: AnswerCache | None,
+    query: str,
+    scope: str,
+    answer: Callable[[], tuple[str, list[ScoredDocument]]],
+    history: list[Any] | None = None,
+    show_header: bool = True,
+) -> tuple[str, list[ScoredDocument]]:
+    """Serve `query` from `cache` (printed like a streamed answer) or run `answer`.
+
+    Follow-ups (non-empty `history`) depend on the conversation and bypass the
+    cache.
+    """
+    if cache is None or history:
+        return answer()
+    result = cache.lookup(query, scope=scope)
+    cached = result.answer
+    if cached is not None:
+        if show_header:
+            print("Answer:")
+        sys.stdout.write(cached.text)
+        if not cached.text.endswith("\n"):
+            sys.stdout.write("\n")
+        sys.stdout.flush()
+        return cached.text, cached.sources
+
+    text, sources = answer()
+    cache.store(query, scope=scope, version=result.version, text=text, sources=sources)
+    return text, sources
+
+
+async def aanswer_with_cache(
+    *,
+    cache: AnswerCache | None,
+    query: str,
+    scope: str,
+    answer: Callable[[], Awaitable[tuple[str, list[ScoredDocument]]]],
+    sink: TokenSink,
+    history: list[Any] | None = None,
+) -> tuple[str, list[ScoredDocument]]:
+    """Async `answer_with_cache`: a cached answer goes to `sink` in one piece."""
+    if cache is None or history:
+        return await answer()
+    result = await asyncio.to_thread(cache.lookup, query, scope=scope)
+    cached = result.answer
+    if cached is not None:
+        await sink(cached.text)
+        return cached.text, cached.sources
+
+    text, sources = await answer()
+    await asyncio.to_thread(
+        cache.store,
+        query,
+        scope=scope,
+        version=result.version,
+        text=text,
+        sources=sources,
+    )
+    return text, sources
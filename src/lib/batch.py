@@ -0,0 +1,215 @@
+import asyncio
+import json
+import logging
+import time
+from collections.abc import Iterator
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from lib.context_builder import ContextBuilder
+from lib.metrics import span
+from lib.rag_two_step import (
+    ScoredDocument,
+    astream_answer_from_results,
+    sources_payload,
+)
+from lib.vector_db import VectorDB
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class BatchQuestion:
+    id: str
+    question: str
+
+
+@dataclass
+class BatchStats:
+    answered: int = 0
+    failed: int = 0
+    skipped: int = 0
+    elapsed_s: float = 0.0
+
+    @property
+    def questions_per_s(self) -> float:
+        return self.answered / self.elapsed_s if self.elapsed_s > 0 else 0.0
+
+
+def read_questions(path: str | Path) -> list[BatchQuestion]:
+    """Questions from a JSONL file: `{"id"?, "question"}` (or `"prompt"`) per line.
+
+    Lines without an `id` get their 1-based line number. Raises `ValueError`
+    (with the line) for a line that is not a JSON object with a question.
+    """
+    questions = []
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path}:{line_no}: invalid JSON ({e})") from None
+            if not isinstance(item, dict):
+                raise ValueError(f"{path}:{line_no}: expected a JSON object")
+            question = str(item.get("question") or item.get("prompt") or "").strip()
+            if not question:
+                raise ValueError(f"{path}:{line_no}: missing 'question'")
+            questions.append(
+                BatchQuestion(id=str(item.get("id", line_no)), question=question)
+            )
+    return questions
+
+
+def completed_ids(path: str | Path) -> set[str]:
+    """IDs already answered in an earlier run's output (the checkpoint).
+
+    Failed questions and a torn last line (interrupted write) are not counted,
+    so they are asked again.
+    """
+    done: set[str] = set()
+    if not Path(path).exists():
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                item = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if "answer" in item:
+                done.add(str(item["id"]))
+    return done
+
+
+def _terminate_last_line(path: str | Path) -> None:
+    """End a torn last line (interrupted write) so appends start a new line."""
+    if not Path(path).exists():
+        return
+    with open(path, "rb+") as f:
+        f.seek(0, 2)
+        if f.tell() == 0:
+            return
+        f.seek(-1, 2)
+        if f.read(1) != b"\n":
+            f.write(b"\n")
+
+
+def _chunks(items: list[BatchQuestion], size: int) -> Iterator[list[BatchQuestion]]:
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+async def arun_batch(
+    *,
+    vector_db: VectorDB,
+    llm: Any,
+    questions: list[BatchQuestion],
+    output_path: str | Path,
+    k: int,
+    concurrency: int = 8,
+    retrieval_batch_size: int = 64,
+    context_builder: ContextBuilder | None = None,
+) -> BatchStats:
+    """Answer `questions` with two-step RAG, appending results to `output_path`.
+
+    Retrieval runs per group of `retrieval_batch_size` questions (one batched
+    embeddings call + one `query_batch_points` request, see
+    `VectorDB.similarity_search_batch`); generation runs up to `concurrency`
+    answers at once. The next group is retrieved while earlier answers are
+    still generating, and at most `2 * concurrency` answers wait for a slot.
+
+    Each finished question is appended as one JSON line, in completion order,
+    and flushed, so the output doubles as the checkpoint: questions whose ID
+    already has an answer there are skipped on the next run.
+    """
+    stats = BatchStats()
+    started = time.perf_counter()
+    done = completed_ids(output_path)
+    pending = [q for q in questions if q.id not in done]
+    stats.skipped = len(questions) - len(pending)
+    if stats.skipped:
+        log.info(
+            "Resuming batch: %d of %d already answered", stats.skipped, len(questions)
+        )
+
+    slots = asyncio.Semaphore(concurrency)
+    backlog = asyncio.Semaphore(2 * concurrency)
+    tasks: set[asyncio.Task[None]] = set()
+
+    async def _sink(_: str) -> None:
+        return None
+
+    _terminate_last_line(output_path)
+    with open(output_path, "a", encoding="utf-8") as out:
+
+        def _write(item: dict[str, Any]) -> None:
+            out.write(json.dumps(item, ensure_ascii=False) + "\n")
+            out.flush()
+
+        async def _answer(question: BatchQuestion, results: list[ScoredDocument]):
+            try:
+                async with slots:
+                    question_started = time.perf_counter()
+                    with span("rag.query", mode="batch"):
+                        text, sources = await astream_answer_from_results(
+                            llm=llm,
+                            prompt=question.question,
+                            results=results,
+                            sink=_sink,
+                            context_builder=context_builder,
+                        )
+                _write(
+                    {
+                        "id": question.id,
+                        "question": question.question,
+                        "answer": text,
+                        "sources": sources_payload(sources),
+                        "elapsed_ms": round(
+                            (time.perf_counter() - question_started) * 1000, 1
+                        ),
+                    }
+                )
+                stats.answered += 1
+            except Exception as e:
+                log.exception("Question %s failed", question.id)
+                _write(
+                    {"id": question.id, "question": question.question, "error": str(e)}
+                )
+                stats.failed += 1
+            finally:
+                backlog.release()
+
+        for group in _chunks(pending, retrieval_batch_size):
+            with span("batch.retrieve", queries=len(group)):
+                results = await asyncio.to_thread(
+                    vector_db.similarity_search_batch,
+                    [q.question for q in group],
+                    k=k,
+                    batch_size=retrieval_batch_size,
+                )
+            for question, found in zip(group, results):
+                await backlog.acquire()
+                task = asyncio.create_task(_answer(question, found))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+
+        if tasks:
+            await asyncio.gather(*tasks)
+
+    stats.elapsed_s = time.perf_counter() - started
+    log.info(
+        "Batch done: %d answered, %d failed, %d skipped (%.1fs, %.2f questions/s)",
+        stats.answered,
+        stats.failed,
+        stats.skipped,
+        stats.elapsed_s,
+        stats.questions_per_s,
+    )
+    return stats
+
+
+def run_batch(**kwargs: Any) -> BatchStats:
+    """Sync entry point for `arun_batch` (CLI)."""
+    return asyncio.run(arun_batch(**kwargs))
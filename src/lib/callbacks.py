@@ -1,13 +1,39 @@
 import logging
+import time
 from typing import Any
+from uuid import UUID
 
 from langchain_core.callbacks.base import BaseCallbackHandler
 
+from lib.metrics import METRICS, record_span
+
 log = logging.getLogger(__name__)
 
 
 class ToolCallLoggingCallbackHandler(BaseCallbackHandler):
-    """Logs tool calls via LangChain's callback system."""
+    """Logs and times tool calls via LangChain's callback system.
+
+    Each finished call is recorded as a `tool.<name>` stage (span + duration
+    histogram) and counted in `rag_tool_calls_total`.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._running: dict[UUID, tuple[str, int]] = {}
+
+    def _finish(self, run_id: UUID | None, *, error: BaseException | None) -> None:
+        name, start_ns = self._running.pop(run_id, ("(tool)", None))
+        status = "error" if error else "ok"
+        METRICS.increment(
+            "rag_tool_calls_total", labels={"tool": name, "status": status}
+        )
+        if start_ns is not None:
+            record_span(
+                f"tool.{name}",
+                start_ns=start_ns,
+                end_ns=time.time_ns(),
+                error=f"{type(error).__name__}: {error}" if error else None,
+            )
 
     def on_tool_start(
         self,
@@ -18,6 +44,8 @@ class ToolCallLoggingCallbackHandler(BaseCallbackHandler):
         name = serialized.get("name") or serialized.get("id") or "(tool)"
         run_id = kwargs.get("run_id")
         tool_call_id = kwargs.get("tool_call_id")
+        if run_id is not None:
+            self._running[run_id] = (str(name), time.time_ns())
         log.info(
             "Tool call start name=%s run_id=%s tool_call_id=%s input_chars=%d",
             name,
@@ -29,6 +57,7 @@ class ToolCallLoggingCallbackHandler(BaseCallbackHandler):
     def on_tool_end(self, output: Any, **kwargs: Any) -> None:
         run_id = kwargs.get("run_id")
         tool_call_id = kwargs.get("tool_call_id")
+        self._finish(run_id, error=None)
         output_type = type(output).__name__
 
         output_chars: int | None
@@ -54,6 +83,7 @@ class ToolCallLoggingCallbackHandler(BaseCallbackHandler):
     def on_tool_error(self, error: BaseException, **kwargs: Any) -> None:
         run_id = kwargs.get("run_id")
         tool_call_id = kwargs.get("tool_call_id")
+        self._finish(run_id, error=error)
         log.exception(
             "Tool call error run_id=%s tool_call_id=%s",
             run_id,
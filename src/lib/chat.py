@@ -1,30 +1,46 @@
 import logging
 from typing import Any
 
-from langchain_core.messages import (
-    AIMessage,
-    HumanMessage,
-)
 from langchain_core.vectorstores import VectorStore
 
-from lib.rag_agent import stream_rag_agent_answer
-from lib.rag_two_step import stream_rag_answer
+from lib.answer_cache import AnswerCache, answer_scope, answer_with_cache
+from lib.context_builder import ContextBuilder
+from lib.memory import ConversationMemory
+from lib.rag_two_step import ScoredDocument, stream_rag_answer
+from lib.search_filter import display_source
 
 log = logging.getLogger(__name__)
 
 
-def print_sources(*, vector_store: VectorStore, query: str, k: int) -> None:
-    results = vector_store.similarity_search_with_score(query, k=k)
+def print_results(
+    results: list[ScoredDocument], *, title: str, preview_chars: int = 0
+) -> None:
+    """Render scored documents, optionally with a content preview."""
+    if not results:
+        print(f"{title}\n(no matches)")
+        return
+
+    print(title)
+    for i, (doc, score) in enumerate(results, start=1):
+        meta = doc.metadata or {}
+        src = display_source(str(meta.get("source", ""))) or "?"
+        page = meta.get("page", "?")
+        if meta.get("page_end", page) != page:
+            page = f"{page}-{meta['page_end']}"
+        print(f"[{i}] score={float(score):.4f} source={src} page={page}")
+        if preview_chars > 0:
+            content = (doc.page_content or "").strip().replace("\n", " ")
+            preview = content[:preview_chars]
+            if len(content) > preview_chars:
+                preview += "..."
+            if preview:
+                print(f"    {preview}")
+
+
+def print_sources(*, query: str, results: list[ScoredDocument]) -> None:
+    """Print the sources an answer was built from (no additional search)."""
     print(f"Printing sources for query: `{query}`")
-    if results:
-        print("\nSources:")
-        for i, (doc, score) in enumerate(results, start=1):
-            meta = doc.metadata or {}
-            src = meta.get("source", "?")
-            page = meta.get("page", "?")
-            print(f"[{i}] score={float(score):.4f} source={src} page={page}")
-    else:
-        print("\nSources:\n(no matches)")
+    print_results(results, title="\nSources:")
 
 
 def interactive_chat(
@@ -34,40 +50,81 @@ def interactive_chat(
     vector_store: VectorStore,
     k: int,
     agent_mode: bool = False,
+    context_builder: ContextBuilder | None = None,
+    memory: ConversationMemory | None = None,
+    answer_cache: AnswerCache | None = None,
+    agent_prefetch: bool = True,
 ) -> None:
+    """Multi-turn chat loop; `memory` bounds the history sent with each turn.
+
+    With an `answer_cache`, questions asked without prior history (the first
+    one) can be answered from the cache.
+    """
+    session = None
+    if agent_mode:
+        # Imported on use: the agent stack (LangGraph) is slow to load.
+        from lib.rag_agent import RagAgentSession
+
+        session = RagAgentSession(
+            llm=llm,
+            vector_store=vector_store,
+            k=k,
+            context_builder=context_builder,
+            prefetch=agent_prefetch,
+        )
+        session.warm_up()
+    memory = memory or ConversationMemory(llm=llm)
+
     print("Interactive mode. Type 'exit' or 'quit' to leave.")
-    history: list[Any] = []
-
-    while True:
-        try:
-            user_input = input("\nYou: ").strip()
-        except EOFError:
-            print()
-            return
-
-        if not user_input:
-            continue
-        if user_input.lower() in {"exit", "quit"}:
-            return
-
-        if agent_mode:
-            assistant_text = stream_rag_agent_answer(
-                llm=llm,
-                vector_store=vector_store,
-                prompt=user_input,
-                k=k,
-                history=history,
-                show_header=False,
-            )
-        else:
-            assistant_text = stream_rag_answer(
-                llm=llm,
-                retriever=retriever,
-                prompt=user_input,
+    try:
+        while True:
+            try:
+                user_input = input("\nYou: ").strip()
+            except EOFError:
+                print()
+                return
+
+            if not user_input:
+                continue
+            if user_input.lower() in {"exit", "quit"}:
+                return
+
+            history = memory.messages()
+            query = user_input
+            if session is not None:
+                # The agent writes its own tool queries from the history.
+                answer = lambda: session.stream(
+                    prompt=user_input,
+                    history=history,
+                    show_header=False,
+                )
+            else:
+                query = memory.retrieval_query(user_input)
+                answer = lambda: stream_rag_answer(
+                    llm=llm,
+                    retriever=retriever,
+                    prompt=user_input,
+                    history=history,
+                    show_header=False,
+                    context_builder=context_builder,
+                    retrieval_query=query,
+                )
+            assistant_text, sources = answer_with_cache(
+                cache=answer_cache,
+                query=user_input,
+                scope=answer_scope(
+                    mode="agent" if session is not None else "two_step",
+                    k=k,
+                    context_tokens=(
+                        context_builder.max_tokens if context_builder else None
+                    ),
+                ),
+                answer=answer,
                 history=history,
                 show_header=False,
             )
-        history.append(HumanMessage(content=user_input))
-        history.append(AIMessage(content=assistant_text))
+            memory.add_turn(user_input, assistant_text)
 
-        print_sources(vector_store=vector_store, query=user_input, k=k)
+            print_sources(query=query, results=sources)
+    finally:
+        memory.close(wait=False)
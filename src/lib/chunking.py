@@ -0,0 +1,266 @@
+import bisect
+import math
+import re
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass
+
+_ATX_HEADING = re.compile(r"^ {0,3}#{1,6}(?:[ \t]|$)")
+_TERMINAL_PUNCTUATION = ".,;!?"
+# A sentence ends at . ! or ? (and closing quotes/brackets) before whitespace
+# and an upper-case letter, digit or opening quote/bracket.
+_SENTENCE_END = re.compile(r"(?<=[.!?])[\"')\]]*\s+(?=[\"'(\[]?[A-Z0-9])")
+
+
+def approximate_tokens(text: str) -> int:
+    """~4 characters per token, the usual ratio for English with BPE tokenizers."""
+    return math.ceil(len(text) / 4)
+
+
+def is_heading(line: str) -> bool:
+    """A Markdown heading, or a short title-like line (no sentence punctuation).
+
+    This only looks at the line itself; `StructuredChunker` also requires a
+    title-like line to be set off from the text around it.
+    """
+    line = line.strip()
+    if not line:
+        return False
+    if _ATX_HEADING.match(line):
+        return True
+    return (
+        len(line) <= 60
+        and len(line.split()) <= 10
+        and (line[0].isupper() or line[0].isdigit())
+        and line[-1] not in _TERMINAL_PUNCTUATION
+        and not _SENTENCE_END.search(line)
+    )
+
+
+@dataclass
+class _Unit:
+    """A heading or sentence, with the pages it starts and ends on."""
+
+    text: str
+    page: int
+    page_end: int
+    tokens: int
+    heading: bool = False
+    # Tokens of the paragraph this unit starts (0 inside a paragraph).
+    paragraph_tokens: int = 0
+
+
+@dataclass(frozen=True)
+class Chunk:
+    text: str
+    page: int
+    page_end: int
+    tokens: int
+
+
+class StructuredChunker:
+    """Chunks a whole document along its structure, across page breaks.
+
+    The document is read as one stream of `(page, text)` pairs and cut into
+    headings, paragraphs (blank lines) and sentences. Units are packed into
+    chunks of at most `max_tokens`:
+
+    - a heading closes the current chunk once it holds `min_tokens` (default
+      a quarter of `max_tokens`), so sections start a chunk of their own; a
+      heading is never left at the end of a chunk
+    - a paragraph that does not fit in the current chunk starts a new one
+      (again once the chunk holds `min_tokens`)
+    - otherwise chunks are cut between sentences; only a sentence longer than
+      `max_tokens` is cut between words
+
+    Markdown headings always count; a short title-like line (`is_heading`)
+    only when it is set off by blank lines (a heading or the start or end of
+    the document count as one), so a short line of narrow-column text in the
+    middle of a sentence is not taken for a heading.
+
+    There is no overlap: chunks end at sentence boundaries, so no sentence is
+    cut in two. Each chunk reports the pages it starts and ends on.
+
+    Tokens are counted with `count_tokens` (default: `approximate_tokens`,
+    which keeps chunk boundaries, and therefore point IDs, the same with or
+    without `tiktoken`). At most about a page plus one open paragraph (capped
+    at `max_tokens`) is buffered.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_tokens: int = 256,
+        min_tokens: int | None = None,
+        count_tokens: Callable[[str], int] = approximate_tokens,
+    ) -> None:
+        if min_tokens is None:
+            min_tokens = max(1, max_tokens // 4)
+        if not 0 < min_tokens <= max_tokens:
+            raise ValueError("Expected 0 < min_tokens <= max_tokens")
+        self.max_tokens = max_tokens
+        self.min_tokens = min_tokens
+        self.count_tokens = count_tokens
+
+    def split(self, page_texts: Iterable[tuple[int, str]]) -> Iterator[Chunk]:
+        """Chunks of a document given as `(page, text)` pairs in order."""
+        units: list[_Unit] = []
+        tokens = 0
+        for unit in self._units(page_texts):
+            if units and (
+                (unit.heading and tokens >= self.min_tokens)
+                or (
+                    unit.paragraph_tokens
+                    and tokens + unit.paragraph_tokens > self.max_tokens
+                    and tokens >= self.min_tokens
+                )
+                or tokens + unit.tokens > self.max_tokens
+            ):
+                # Headings at the end go with the text that follows them.
+                cut = len(units)
+                while cut and units[cut - 1].heading:
+                    cut -= 1
+                if cut:
+                    yield self._chunk(units[:cut])
+                    units = units[cut:]
+                elif not unit.heading or tokens + unit.tokens > self.max_tokens:
+                    # Only headings so far (e.g. a table of contents).
+                    yield self._chunk(units)
+                    units = []
+                tokens = sum(u.tokens for u in units)
+            units.append(unit)
+            tokens += unit.tokens
+        if units:
+            yield self._chunk(units)
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _chunk(units: list[_Unit]) -> Chunk:
+        parts = [units[0].text]
+        for unit in units[1:]:
+            parts.append("\n\n" if unit.heading or unit.paragraph_tokens else " ")
+            parts.append(unit.text)
+        return Chunk(
+            text="".join(parts),
+            page=units[0].page,
+            page_end=max(unit.page_end for unit in units),
+            tokens=sum(unit.tokens for unit in units),
+        )
+
+    def _units(self, page_texts: Iterable[tuple[int, str]]) -> Iterator[_Unit]:
+        """Headings and sentences of the document, in order."""
+        lines: list[tuple[int, str]] = []
+        # Whether `lines` continues a paragraph already partly handed out.
+        continued = False
+        for item in self._lines(page_texts):
+            if item is None:
+                # Paragraphs may continue on the next page; past `max_tokens`
+                # the complete sentences are handed out so the buffer stays
+                # bounded.
+                if sum(len(line) for _, line in lines) > 4 * self.max_tokens:
+                    *done, last = self._sentences(lines)
+                    yield from self._mark_paragraph(done, continued=continued)
+                    lines = [(last.page, last.text)]
+                    continued = continued or bool(done)
+                continue
+            page, line, heading = item
+            if not line or heading:
+                yield from self._paragraph(lines, continued=continued)
+                lines, continued = [], False
+            if heading:
+                yield _Unit(line, page, page, self.count_tokens(line), heading=True)
+            elif line:
+                lines.append((page, line))
+        yield from self._paragraph(lines, continued=continued)
+
+    @staticmethod
+    def _lines(
+        page_texts: Iterable[tuple[int, str]],
+    ) -> Iterator[tuple[int, str, bool] | None]:
+        """`(page, line, heading)` for each stripped line; None after each page.
+
+        A title-like line waits for the next line to decide whether it is set
+        off, so it may come after the None of its page.
+        """
+        # Whether the previous line is blank, a heading or the document start.
+        after_break = True
+        pending: tuple[int, str] | None = None
+        for page, text in page_texts:
+            for line in text.splitlines():
+                line = line.strip()
+                atx = bool(_ATX_HEADING.match(line))
+                if pending is not None:
+                    heading = not line or atx
+                    yield (*pending, heading)
+                    after_break, pending = heading, None
+                if atx:
+                    yield page, line, True
+                    after_break = True
+                elif after_break and is_heading(line):
+                    pending = (page, line)
+                else:
+                    yield page, line, False
+                    after_break = not line
+            yield None
+        if pending is not None:
+            yield (*pending, True)
+
+    def _paragraph(
+        self, lines: list[tuple[int, str]], *, continued: bool
+    ) -> Iterator[_Unit]:
+        if lines:
+            yield from self._mark_paragraph(self._sentences(lines), continued=continued)
+
+    @staticmethod
+    def _mark_paragraph(units: list[_Unit], *, continued: bool) -> list[_Unit]:
+        if units and not continued:
+            units[0].paragraph_tokens = sum(unit.tokens for unit in units)
+        return units
+
+    def _sentences(self, lines: list[tuple[int, str]]) -> list[_Unit]:
+        """Sentences of a paragraph, each with the page(s) it spans."""
+        text = " ".join(line for _, line in lines)
+        # Offset in `text` where each line starts, and its page.
+        offsets: list[int] = []
+        offset = 0
+        for _, line in lines:
+            offsets.append(offset)
+            offset += len(line) + 1
+
+        def page_at(position: int) -> int:
+            return lines[bisect.bisect_right(offsets, position) - 1][0]
+
+        units: list[_Unit] = []
+        begin = 0
+        for match in [*_SENTENCE_END.finditer(text), None]:
+            end = match.start() if match else len(text)
+            stop = match.end() if match else len(text)
+            sentence = text[begin:stop].strip()
+            if sentence:
+                units.extend(
+                    self._fit(sentence, page_at(begin), page_at(max(begin, end - 1)))
+                )
+            begin = stop
+        return units
+
+    def _fit(self, sentence: str, page: int, page_end: int) -> Iterator[_Unit]:
+        """`sentence` as one unit, or cut between words if over `max_tokens`."""
+        tokens = self.count_tokens(sentence)
+        if tokens <= self.max_tokens:
+            yield _Unit(sentence, page, page_end, tokens)
+            return
+        piece: list[str] = []
+        piece_tokens = 0
+        for word in sentence.split(" "):
+            word_tokens = self.count_tokens(word + " ")
+            if piece and piece_tokens + word_tokens > self.max_tokens:
+                text = " ".join(piece)
+                yield _Unit(text, page, page_end, self.count_tokens(text))
+                piece, piece_tokens = [], 0
+            piece.append(word)
+            piece_tokens += word_tokens
+        if piece:
+            text = " ".join(piece)
+            yield _Unit(text, page, page_end, self.count_tokens(text))
@@ -0,0 +1,168 @@
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+# The CLI reads QUANTIZATION_MODES before it knows whether Qdrant is needed.
+if TYPE_CHECKING:
+    from qdrant_client.http import models as qdrant_models
+
+QUANTIZATION_MODES = ("scalar", "product", "binary")
+
+
+@dataclass(frozen=True)
+class CollectionConfig:
+    """Storage, index and search settings of the dense vector.
+
+    Storage/index settings (`quantization`, `on_disk_*`, `hnsw_*`) apply when
+    the collection is created; search settings (`search_ef`, `rescore`,
+    `oversampling`) apply to every query.
+
+    - `quantization`: `"scalar"` (int8, 4x smaller), `"product"` (16x) or
+      `"binary"` (32x); quantized vectors stay in RAM
+    - `on_disk_vectors` / `on_disk_payload`: keep originals / payloads on disk
+      (memory-mapped) instead of RAM
+    - `hnsw_m`, `hnsw_ef_construct`: HNSW graph degree and build-time beam
+    - `search_ef`: search-time beam (higher = better recall, slower)
+    - `rescore`, `oversampling`: fetch `oversampling * k` candidates with the
+      quantized vectors, then rescore them with the original vectors
+    """
+
+    quantization: str | None = None
+    on_disk_vectors: bool = False
+    on_disk_payload: bool = False
+    hnsw_m: int | None = None
+    hnsw_ef_construct: int | None = None
+    search_ef: int | None = None
+    rescore: bool = True
+    oversampling: float | None = None
+
+    def __post_init__(self) -> None:
+        if self.quantization not in (None, *QUANTIZATION_MODES):
+            raise ValueError(f"Unknown quantization: {self.quantization}")
+        if self.oversampling is not None and self.oversampling < 1.0:
+            raise ValueError("oversampling must be >= 1.0")
+
+    def has_storage_settings(self) -> bool:
+        """Whether any creation-time (storage/index) setting is non-default."""
+        return bool(
+            self.quantization
+            or self.on_disk_vectors
+            or self.on_disk_payload
+            or self.hnsw_m is not None
+            or self.hnsw_ef_construct is not None
+        )
+
+    def storage_differences(
+        self, params: "qdrant_models.CollectionParams"
+    ) -> list[str]:
+        """Creation-time settings requested here that `params` does not have."""
+        from qdrant_client.http import models as qdrant_models
+
+        vectors = params.vectors
+        if not isinstance(vectors, qdrant_models.VectorParams):
+            vectors = (vectors or {}).get("")
+        if vectors is None:
+            return []
+
+        differences = []
+        quantization = vectors.quantization_config or params.quantization_config
+        current = next(
+            (
+                mode
+                for mode in QUANTIZATION_MODES
+                if quantization is not None and getattr(quantization, mode, None)
+            ),
+            None,
+        )
+        if current != self.quantization:
+            differences.append(f"quantization={current}")
+        if bool(vectors.on_disk) != self.on_disk_vectors:
+            differences.append(f"on_disk_vectors={bool(vectors.on_disk)}")
+        if bool(params.on_disk_payload) != self.on_disk_payload:
+            differences.append(f"on_disk_payload={bool(params.on_disk_payload)}")
+        hnsw = vectors.hnsw_config
+        for name, wanted in (
+            ("m", self.hnsw_m),
+            ("ef_construct", self.hnsw_ef_construct),
+        ):
+            current_value = getattr(hnsw, name, None) if hnsw else None
+            if wanted is not None and current_value != wanted:
+                differences.append(f"hnsw_{name}={current_value}")
+        return differences
+
+    def quantization_config(self) -> "qdrant_models.QuantizationConfig | None":
+        from qdrant_client.http import models as qdrant_models
+
+        if self.quantization == "scalar":
+            return qdrant_models.ScalarQuantization(
+                scalar=qdrant_models.ScalarQuantizationConfig(
+                    type=qdrant_models.ScalarType.INT8, quantile=0.99, always_ram=True
+                )
+            )
+        if self.quantization == "product":
+            return qdrant_models.ProductQuantization(
+                product=qdrant_models.ProductQuantizationConfig(
+                    compression=qdrant_models.CompressionRatio.X16, always_ram=True
+                )
+            )
+        if self.quantization == "binary":
+            return qdrant_models.BinaryQuantization(
+                binary=qdrant_models.BinaryQuantizationConfig(always_ram=True)
+            )
+        return None
+
+    def hnsw_config(self) -> "qdrant_models.HnswConfigDiff | None":
+        from qdrant_client.http import models as qdrant_models
+
+        if self.hnsw_m is None and self.hnsw_ef_construct is None:
+            return None
+        return qdrant_models.HnswConfigDiff(
+            m=self.hnsw_m, ef_construct=self.hnsw_ef_construct
+        )
+
+    def vector_params(
+        self, *, size: int, distance: "qdrant_models.Distance"
+    ) -> "qdrant_models.VectorParams":
+        from qdrant_client.http import models as qdrant_models
+
+        return qdrant_models.VectorParams(
+            size=size,
+            distance=distance,
+            on_disk=self.on_disk_vectors or None,
+            hnsw_config=self.hnsw_config(),
+            quantization_config=self.quantization_config(),
+        )
+
+    def search_params(self) -> "qdrant_models.SearchParams | None":
+        from qdrant_client.http import models as qdrant_models
+
+        quantization = None
+        if not self.rescore or self.oversampling is not None:
+            quantization = qdrant_models.QuantizationSearchParams(
+                rescore=self.rescore, oversampling=self.oversampling
+            )
+        if self.search_ef is None and quantization is None:
+            return None
+        return qdrant_models.SearchParams(
+            hnsw_ef=self.search_ef, quantization=quantization
+        )
+
+    def describe_search(self) -> str:
+        """Non-default search settings (answer cache scopes)."""
+        parts = []
+        if self.search_ef is not None:
+            parts.append(f"search_ef={self.search_ef}")
+        if not self.rescore:
+            parts.append("rescore=off")
+        if self.oversampling is not None:
+            parts.append(f"oversampling={self.oversampling}")
+        return " ".join(parts)
+
+    def bytes_per_vector(self, dim: int) -> float:
+        """Approximate RAM per vector for the (quantized) search index."""
+        if self.quantization == "scalar":
+            return float(dim)
+        if self.quantization == "product":
+            return dim * 4 / 16
+        if self.quantization == "binary":
+            return dim / 8
+        return 0.0 if self.on_disk_vectors else dim * 4.0
@@ -0,0 +1,251 @@
+import logging
+import math
+import re
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from lib.rag_two_step import ScoredDocument
+
+log = logging.getLogger(__name__)
+
+# Shortest suffix/prefix match treated as splitter overlap rather than chance.
+MIN_OVERLAP_CHARS = 32
+# Word-shingle Jaccard similarity above which two passages count as duplicates.
+DUPLICATE_SIMILARITY = 0.85
+# Joins passages in the prompt context.
+SEPARATOR = "\n\n"
+
+_WORD_RE = re.compile(r"\w+")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def _approximate_tokens(text: str) -> int:
+    # ~4 characters per token for English text with BPE tokenizers.
+    return math.ceil(len(text) / 4)
+
+
+class Tokenizer:
+    """Counts (and truncates to) tokens with the chat model's tiktoken encoding.
+
+    The encoding is loaded on first use. `tiktoken` downloads encodings on
+    first use, so offline (and for unknown models without a fallback) this
+    degrades to a ~4 characters per token estimate and logs a warning.
+    """
+
+    def __init__(
+        self, *, model: str | None = None, encoding: str = "o200k_base"
+    ) -> None:
+        self.model = model
+        self.encoding_name = encoding
+        self._encoding: Any = None
+        self._loaded = False
+
+    def _load(self) -> Any:
+        if self._loaded:
+            return self._encoding
+        self._loaded = True
+        try:
+            import tiktoken
+
+            try:
+                self._encoding = tiktoken.encoding_for_model(self.model or "")
+            except KeyError:
+                self._encoding = tiktoken.get_encoding(self.encoding_name)
+        except Exception as e:
+            log.warning("tiktoken unavailable (%s); estimating token counts", e)
+            self._encoding = None
+        return self._encoding
+
+    def count(self, text: str) -> int:
+        encoding = self._load()
+        if encoding is None:
+            return _approximate_tokens(text)
+        return len(encoding.encode(text, disallowed_special=()))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        encoding = self._load()
+        if encoding is None:
+            return text[: max_tokens * 4]
+        tokens = encoding.encode(text, disallowed_special=())
+        return encoding.decode(tokens[:max_tokens])
+
+
+@dataclass
+class Passage:
+    """Contiguous context text built from one or more retrieved chunks."""
+
+    text: str
+    score: float
+    metadata: dict[str, Any]
+    parts: list["ScoredDocument"] = field(default_factory=list)
+
+
+@dataclass
+class BuiltContext:
+    passages: list[Passage]
+    tokens: int
+    retrieved: int
+    merged: int
+    duplicates: int
+    truncated: bool
+
+    @property
+    def text(self) -> str:
+        return SEPARATOR.join(p.text for p in self.passages)
+
+    @property
+    def sources(self) -> list["ScoredDocument"]:
+        """Retrieved chunks that made it into the context, best first."""
+        parts = [part for p in self.passages for part in p.parts]
+        return sorted(parts, key=lambda part: part[1], reverse=True)
+
+
+def _overlap(left: str, right: str) -> int:
+    """Length of the longest suffix of `left` that is a prefix of `right`."""
+    if len(right) < MIN_OVERLAP_CHARS:
+        return 0
+    probe = right[:MIN_OVERLAP_CHARS]
+    start = left.find(probe)
+    while start != -1:
+        length = len(left) - start
+        if right.startswith(left[start:]) and length < len(right):
+            return length
+        start = left.find(probe, start + 1)
+    return 0
+
+
+def _merge_group(passages: list[Passage]) -> tuple[list[Passage], int]:
+    """Chain overlapping passages of one source page; returns (passages, merges)."""
+    merges = 0
+    changed = True
+    while changed:
+        changed = False
+        for i, left in enumerate(passages):
+            for j, right in enumerate(passages):
+                if i == j:
+                    continue
+                length = _overlap(left.text, right.text)
+                if not length:
+                    continue
+                left.text += right.text[length:]
+                left.score = max(left.score, right.score)
+                left.parts.extend(right.parts)
+                del passages[j]
+                merges += 1
+                changed = True
+                break
+            if changed:
+                break
+    return passages, merges
+
+
+def _normalize(text: str) -> str:
+    return _SPACE_RE.sub(" ", text).strip().casefold()
+
+
+def _shingles(text: str, size: int = 3) -> set[tuple[str, ...]]:
+    words = _WORD_RE.findall(text)
+    if len(words) <= size:
+        return {tuple(words)}
+    return {tuple(words[i : i + size]) for i in range(len(words) - size + 1)}
+
+
+def _drop_duplicates(passages: list[Passage]) -> tuple[list[Passage], int]:
+    """Drop passages contained in, or nearly identical to, a better one."""
+    kept: list[tuple[Passage, str, set[tuple[str, ...]]]] = []
+    for passage in sorted(passages, key=lambda p: p.score, reverse=True):
+        norm = _normalize(passage.text)
+        shingles = _shingles(norm)
+        duplicate = any(
+            norm in other_norm
+            or len(shingles & other) / len(shingles | other) >= DUPLICATE_SIMILARITY
+            for _, other_norm, other in kept
+        )
+        if not duplicate:
+            kept.append((passage, norm, shingles))
+    return [passage for passage, _, _ in kept], len(passages) - len(kept)
+
+
+class ContextBuilder:
+    """Turns retrieved chunks into a compact, token-budgeted prompt context.
+
+    1. Chunks of the same `(source, page)` whose text overlaps (the splitter's
+       `chunk_overlap`) are stitched into one passage, scored by its best chunk.
+    2. Passages contained in, or nearly identical to, a better-scoring passage
+       are dropped (e.g. the same page ingested under two paths).
+    3. Passages are packed best-first while they fit in `max_tokens`; a
+       passage that does not fit is skipped in favour of smaller ones. If not
+       even the best one fits, it is truncated to the budget.
+
+    `max_tokens=None` keeps every passage (merge and dedup still apply); the
+    reported token count is then an estimate, so `tokenizer` (and `tiktoken`,
+    which downloads its encoding on first use) is only used with a budget.
+    """
+
+    def __init__(
+        self, *, max_tokens: int | None = None, tokenizer: Tokenizer | None = None
+    ) -> None:
+        if max_tokens is not None and max_tokens <= 0:
+            raise ValueError("max_tokens must be positive")
+        self.max_tokens = max_tokens
+        self.tokenizer = tokenizer or Tokenizer()
+
+    def build(self, results: list["ScoredDocument"]) -> BuiltContext:
+        groups: dict[tuple[Any, Any], list[Passage]] = {}
+        for doc, score in results:
+            meta = doc.metadata or {}
+            key = (meta.get("source"), meta.get("page"))
+            groups.setdefault(key, []).append(
+                Passage(
+                    text=doc.page_content.strip(),
+                    score=float(score),
+                    metadata=dict(meta),
+                    parts=[(doc, score)],
+                )
+            )
+
+        passages: list[Passage] = []
+        merged = 0
+        for group in groups.values():
+            group, merges = _merge_group(group)
+            passages.extend(group)
+            merged += merges
+        passages, duplicates = _drop_duplicates(passages)
+
+        packed, tokens, truncated = self._pack(passages)
+        return BuiltContext(
+            passages=packed,
+            tokens=tokens,
+            retrieved=len(results),
+            merged=merged,
+            duplicates=duplicates,
+            truncated=truncated,
+        )
+
+    def _pack(self, passages: list[Passage]) -> tuple[list[Passage], int, bool]:
+        count = self.tokenizer.count
+        if self.max_tokens is None:
+            text = SEPARATOR.join(p.text for p in passages)
+            return passages, _approximate_tokens(text), False
+
+        separator = count(SEPARATOR)
+        packed: list[Passage] = []
+        used = 0
+        for passage in passages:
+            cost = count(passage.text) + (separator if packed else 0)
+            if used + cost <= self.max_tokens:
+                packed.append(passage)
+                used += cost
+
+        if packed or not passages:
+            return packed, used, False
+        best = passages[0]
+        best.text = self.tokenizer.truncate(best.text, self.max_tokens)
+        # Keep only the chunks that still start inside the truncated text.
+        best.parts = [
+            part
+            for i, part in enumerate(best.parts)
+            if i == 0 or part[0].page_content.strip()[:MIN_OVERLAP_CHARS] in best.text
+        ]
+        return [best], count(best.text), True
@@ -0,0 +1,271 @@
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from langchain_core.embeddings import Embeddings
+
+from .metrics import METRICS, span
+from .normalize import normalize_query
+
+log = logging.getLogger(__name__)
+
+_CACHE_REQUESTS = "rag_embedding_cache_requests_total"
+
+
+class CachedEmbeddings(Embeddings):
+    """Caching wrapper around an `Embeddings` implementation.
+
+    Query embeddings are looked up in an in-process LRU first, then in an
+    on-disk sqlite store (shared across CLI invocations), and only then
+    computed by the wrapped embeddings. Entries are keyed by embedding model
+    name and normalized query text. Document embeddings are passed through.
+
+    `embeddings` may be a zero-argument factory instead; it is called on the
+    first cache miss, so runs served from the cache never import or construct
+    the API client.
+
+    A disk hit refreshes the entry's `last_used` (for LRU eviction) only if it
+    is older than `touch_interval_s`, so repeated hits do not each commit.
+    The async path runs sqlite calls in a worker thread.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings | Callable[[], Embeddings],
+        *,
+        model: str,
+        path: str | Path | None = None,
+        max_memory_entries: int = 1024,
+        max_disk_entries: int = 100_000,
+        touch_interval_s: float = 600.0,
+    ) -> None:
+        self._embeddings = embeddings if isinstance(embeddings, Embeddings) else None
+        self._factory = None if isinstance(embeddings, Embeddings) else embeddings
+        self.model = model
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.touch_interval_s = touch_interval_s
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._memory: OrderedDict[str, list[float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: sqlite3.Connection | None = None
+        self._disk_entries = 0
+        if path:
+            self._db = self._open_db(Path(path))
+
+    @property
+    def embeddings(self) -> Embeddings:
+        """The wrapped embeddings, built by the factory on first use."""
+        if self._embeddings is None:
+            with self._lock:
+                if self._embeddings is None:
+                    assert self._factory is not None
+                    self._embeddings = self._factory()
+        return self._embeddings
+
+    @property
+    def dimension(self) -> int | None:
+        """Vector size if the wrapped embeddings know it (never builds them)."""
+        return getattr(self._embeddings, "dimension", None)
+
+    # ------------------------------------------------------------------
+    # Embeddings interface
+    # ------------------------------------------------------------------
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        return await self.embeddings.aembed_documents(texts)
+
+    def embed_query(self, text: str) -> list[float]:
+        with span("embed_query") as current:
+            key = self._key(text)
+            cached = self._lookup(key)
+            current.set(cache_hit=cached is not None)
+            if cached is not None:
+                return cached
+
+            vector = self.embeddings.embed_query(text)
+            self._store(key, vector)
+            return vector
+
+    def embed_queries(self, texts: list[str]) -> list[list[float]]:
+        """Embed many queries: cache hits are served, misses in one API call.
+
+        Misses go through the wrapped `embed_documents` (the batched endpoint);
+        for OpenAI-style models query and document embeddings are the same.
+        """
+        with span("embed_queries", queries=len(texts)) as current:
+            keys = [self._key(text) for text in texts]
+            vectors = [self._lookup(key) for key in keys]
+            missing = {
+                key: text
+                for key, text, vector in zip(keys, texts, vectors)
+                if vector is None
+            }
+            current.set(misses=len(missing))
+            if missing:
+                computed = dict(
+                    zip(
+                        missing, self.embeddings.embed_documents(list(missing.values()))
+                    )
+                )
+                for key, vector in computed.items():
+                    self._store(key, vector)
+                vectors = [
+                    vector if vector is not None else computed[key]
+                    for key, vector in zip(keys, vectors)
+                ]
+            return vectors
+
+    async def aembed_query(self, text: str) -> list[float]:
+        with span("embed_query") as current:
+            key = self._key(text)
+            cached = await self._off_loop(self._lookup, key)
+            current.set(cache_hit=cached is not None)
+            if cached is not None:
+                return cached
+
+            vector = await self.embeddings.aembed_query(text)
+            await self._off_loop(self._store, key, vector)
+            return vector
+
+    # ------------------------------------------------------------------
+    # Stats / lifecycle
+    # ------------------------------------------------------------------
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "memory_entries": len(self._memory),
+            "disk_entries": self._disk_entries,
+        }
+
+    def close(self) -> None:
+        log.info("Embedding cache stats model=%s %s", self.model, self.stats())
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    async def _off_loop(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Call `func` in a worker thread if it may block on the disk store."""
+        if self._db is None:
+            return func(*args)
+        return await asyncio.to_thread(func, *args)
+
+    def _key(self, text: str) -> str:
+        payload = f"{self.model}\0{normalize_query(text)}".encode("utf-8")
+        return hashlib.sha256(payload).hexdigest()
+
+    def _open_db(self, path: Path) -> sqlite3.Connection:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        db = sqlite3.connect(str(path), check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS query_embeddings ("
+            " key TEXT PRIMARY KEY,"
+            " model TEXT NOT NULL,"
+            " vector BLOB NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        db.execute(
+            "CREATE INDEX IF NOT EXISTS query_embeddings_last_used"
+            " ON query_embeddings (last_used)"
+        )
+        db.commit()
+        (self._disk_entries,) = db.execute(
+            "SELECT COUNT(*) FROM query_embeddings"
+        ).fetchone()
+        log.info("Opened embedding cache %s (entries=%d)", path, self._disk_entries)
+        return db
+
+    def _lookup(self, key: str) -> list[float] | None:
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                METRICS.increment(_CACHE_REQUESTS, labels={"result": "memory"})
+                return vector
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT vector, last_used FROM query_embeddings WHERE key = ?",
+                    (key,),
+                ).fetchone()
+                if row is not None:
+                    now = time.time()
+                    if now - row[1] > self.touch_interval_s:
+                        self._db.execute(
+                            "UPDATE query_embeddings SET last_used = ? WHERE key = ?",
+                            (now, key),
+                        )
+                        self._db.commit()
+                    vector = array("d", row[0]).tolist()
+                    self._remember(key, vector)
+                    self.hits += 1
+                    self.disk_hits += 1
+                    METRICS.increment(_CACHE_REQUESTS, labels={"result": "disk"})
+                    return vector
+
+            self.misses += 1
+            METRICS.increment(_CACHE_REQUESTS, labels={"result": "miss"})
+            return None
+
+    def _store(self, key: str, vector: list[float]) -> None:
+        with self._lock:
+            self._remember(key, vector)
+            if self._db is None:
+                return
+
+            cursor = self._db.execute(
+                "INSERT OR IGNORE INTO query_embeddings (key, model, vector, last_used)"
+                " VALUES (?, ?, ?, ?)",
+                (key, self.model, array("d", vector).tobytes(), time.time()),
+            )
+            if cursor.rowcount > 0:
+                self._disk_entries += 1
+            if self._disk_entries > self.max_disk_entries:
+                self._evict_disk()
+            self._db.commit()
+
+    def _remember(self, key: str, vector: list[float]) -> None:
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self) -> None:
+        """Drop the least recently used tenth of the disk store."""
+        assert self._db is not None
+        excess = self._disk_entries - self.max_disk_entries
+        drop = max(excess, self.max_disk_entries // 10)
+        self._db.execute(
+            "DELETE FROM query_embeddings WHERE key IN ("
+            " SELECT key FROM query_embeddings ORDER BY last_used LIMIT ?)",
+            (drop,),
+        )
+        (self._disk_entries,) = self._db.execute(
+            "SELECT COUNT(*) FROM query_embeddings"
+        ).fetchone()
+        log.info("Evicted embedding cache entries; remaining=%d", self._disk_entries)
@@ -1,16 +1,225 @@
+import logging
+import mimetypes
+import zipfile
 from abc import ABC, abstractmethod
+from collections.abc import Iterable, Iterator
 from pathlib import Path
 
 from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from .chunking import StructuredChunker
+
+# Suffixes of each supported document format (lower case).
+FORMAT_SUFFIXES: dict[str, tuple[str, ...]] = {
+    "pdf": (".pdf",),
+    "docx": (".docx",),
+    "html": (".html", ".htm", ".xhtml"),
+    "markdown": (".md", ".markdown"),
+    "text": (".txt", ".text"),
+}
+DOCUMENT_SUFFIXES = tuple(s for suffixes in FORMAT_SUFFIXES.values() for s in suffixes)
+
+# Metadata flag of the marker chunk `iter_load_many` yields for a file without
+# extractable text, so the ingestion pipeline drops what it stored for it.
+EMPTY_DOCUMENT = "empty_document"
+
+DOCX_MIME = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+MIME_FORMATS = {
+    "application/pdf": "pdf",
+    DOCX_MIME: "docx",
+    "text/html": "html",
+    "application/xhtml+xml": "html",
+    "text/markdown": "markdown",
+    "text/x-markdown": "markdown",
+    "text/plain": "text",
+}
+
+
+def sniff_mime(path: Path) -> str | None:
+    """MIME type of a file from its first bytes (PDF, DOCX, HTML or plain text)."""
+    with open(path, "rb") as f:
+        head = f.read(4096)
+    if head.startswith(b"%PDF-"):
+        return "application/pdf"
+    if head.startswith(b"PK\x03\x04"):
+        try:
+            with zipfile.ZipFile(path) as zf:
+                if "word/document.xml" in zf.namelist():
+                    return DOCX_MIME
+        except zipfile.BadZipFile:
+            pass
+        return None
+    if b"\0" in head:
+        return None
+    lowered = head.lstrip(b"\xef\xbb\xbf \t\r\n").lower()
+    if lowered.startswith((b"<!doctype html", b"<html")) or b"<body" in lowered:
+        return "text/html"
+    try:
+        # The last character may be cut off by the 4 KB window.
+        head.decode("utf-8")
+    except UnicodeDecodeError as e:
+        if e.start < len(head) - 3:
+            return None
+    return "text/plain"
+
+
+def empty_document(path: str | Path) -> Document:
+    """Marker for a file without extractable text (see `is_empty_document`)."""
+    return Document(
+        page_content="", metadata={"source": str(path), EMPTY_DOCUMENT: True}
+    )
+
+
+def is_empty_document(doc: Document) -> bool:
+    return bool((doc.metadata or {}).get(EMPTY_DOCUMENT))
+
+
+def detect_format(document: str | Path) -> str | None:
+    """Format of a document (a `FORMAT_SUFFIXES` key), or `None` if unsupported.
+
+    The suffix decides when it is a known one; otherwise the MIME type guessed
+    from the name, then the one sniffed from the content.
+    """
+    path = Path(document)
+    if not path.exists():
+        raise FileNotFoundError(path)
+    suffix = path.suffix.lower()
+    for fmt, suffixes in FORMAT_SUFFIXES.items():
+        if suffix in suffixes:
+            return fmt
+    mime, _ = mimetypes.guess_type(path.name)
+    if mime in MIME_FORMATS:
+        return MIME_FORMATS[mime]
+    return MIME_FORMATS.get(sniff_mime(path) or "")
 
 
 class Ingestion(ABC):
     """Abstract interface for document ingestion.
 
-    Expected implementations: PDFIngestion, WordIngestion, WebIngestion, ...
+    Implementations: PDFIngestion, DocxIngestion, HTMLIngestion,
+    MarkdownIngestion, TextIngestion; `IngestionRegistry` picks one per file.
+
+    Implementations yield chunks lazily from `iter_load`, buffering at most a
+    page (or similar unit) at a time, so memory does not grow with document
+    size; `load` collects them into a list.
     """
 
     @abstractmethod
+    def iter_load(self, document: str | Path) -> Iterator[Document]:
+        """Yield the chunks of a document as LangChain Documents."""
+        ...
+
     def load(self, document: str | Path) -> list[Document]:
         """Load a document and return a list of LangChain Documents."""
+        return list(self.iter_load(document))
+
+
+class PagedIngestion(Ingestion):
+    """Shared base of the format engines: page texts in, chunks out.
+
+    A subclass yields `(page, text)` pairs from `iter_page_texts` (1-based
+    `page`; a page may come in several parts), which become chunks with
+    `source` and `page` metadata, the same for every format:
+
+    - with a `chunker`, the whole document is chunked along its headings,
+      paragraphs and sentences, across page breaks; chunks also record
+      `page_end`, the page they end on
+    - otherwise each part is split on its own with
+      `RecursiveCharacterTextSplitter(chunk_size, chunk_overlap)`
+    """
+
+    format: str = ""
+
+    def __init__(
+        self,
+        *,
+        chunk_size: int = 900,
+        chunk_overlap: int = 150,
+        chunker: StructuredChunker | None = None,
+    ) -> None:
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.chunker = chunker
+        self._log = logging.getLogger(type(self).__module__)
+        self._splitter = self._make_splitter()
+
+    @property
+    def suffixes(self) -> tuple[str, ...]:
+        return FORMAT_SUFFIXES[self.format]
+
+    @abstractmethod
+    def iter_page_texts(self, path: Path) -> Iterator[tuple[int, str]]:
+        """Yield `(page, text)` pairs of a document in order."""
         ...
+
+    def iter_pages(self, document: str | Path) -> Iterator[Document]:
+        """Yield the chunks of a document without checking it first."""
+        return self._split(Path(document), self.iter_page_texts(Path(document)))
+
+    def iter_load(self, document: str | Path) -> Iterator[Document]:
+        """Yield chunks page by page, so consumers can start before parsing ends."""
+        path = self._check_path(document)
+
+        nr_chunks = 0
+        for doc in self.iter_pages(path):
+            nr_chunks += 1
+            yield doc
+
+        if not nr_chunks:
+            raise ValueError(f"No extractable text found in {path}")
+        self._log.info("Loaded %s chunks from %s", nr_chunks, path)
+
+    def iter_load_many(self, documents: Iterable[str | Path]) -> Iterator[Document]:
+        """Yield chunks of many documents.
+
+        A file without text is logged and yields one `empty_document` marker
+        instead, so a re-ingestion can delete the chunks stored for it.
+        """
+        paths = [self._check_path(d) for d in documents]
+        for path in paths:
+            nr_chunks = 0
+            for doc in self.iter_pages(path):
+                nr_chunks += 1
+                yield doc
+            if nr_chunks:
+                self._log.info("Loaded %s chunks from %s", nr_chunks, path)
+            else:
+                self._log.warning("No extractable text found in %s", path)
+                yield empty_document(path)
+
+    def _make_splitter(self) -> RecursiveCharacterTextSplitter:
+        return RecursiveCharacterTextSplitter(
+            chunk_size=self.chunk_size,
+            chunk_overlap=self.chunk_overlap,
+        )
+
+    def _split(
+        self, path: Path, page_texts: Iterable[tuple[int, str]]
+    ) -> Iterator[Document]:
+        if self.chunker is not None:
+            for chunk in self.chunker.split(page_texts):
+                yield Document(
+                    page_content=chunk.text,
+                    metadata={
+                        "source": str(path),
+                        "page": chunk.page,
+                        "page_end": chunk.page_end,
+                    },
+                )
+            return
+        for page, text in page_texts:
+            text = text.strip()
+            if not text:
+                continue
+            for chunk in self._splitter.split_text(text):
+                yield Document(
+                    page_content=chunk,
+                    metadata={"source": str(path), "page": page},
+                )
+
+    def _check_path(self, document: str | Path) -> Path:
+        path = Path(document)
+        if detect_format(path) != self.format:
+            raise ValueError(f"Expected a {self.format} file, got: {path}")
+        return path
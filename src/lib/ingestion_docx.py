@@ -0,0 +1,79 @@
+import zipfile
+from collections.abc import Iterator
+from pathlib import Path
+from xml.etree import ElementTree
+
+from .chunking import StructuredChunker
+from .ingestion import PagedIngestion
+from .ingestion_text import PageBuffer
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_PARAGRAPH = f"{_W}p"
+_TEXT = f"{_W}t"
+_TAB = f"{_W}tab"
+_BREAK = f"{_W}br"
+_CARRIAGE_RETURN = f"{_W}cr"
+_RENDERED_PAGE_BREAK = f"{_W}lastRenderedPageBreak"
+_BREAK_TYPE = f"{_W}type"
+
+
+class DocxIngestion(PagedIngestion):
+    """Word (`.docx`) files, read with the standard library only.
+
+    `word/document.xml` is streamed out of the archive with `iterparse`; each
+    paragraph (including those in tables and text boxes) is turned into text
+    and then dropped from the tree. Pages follow explicit page breaks and the
+    page breaks Word recorded when it last laid out the document; a document
+    without either is one page (split into parts of `max_buffer_chars`).
+    """
+
+    format = "docx"
+
+    def __init__(
+        self,
+        *,
+        chunk_size: int = 900,
+        chunk_overlap: int = 150,
+        chunker: StructuredChunker | None = None,
+        max_buffer_chars: int = 64 * 1024,
+    ) -> None:
+        super().__init__(
+            chunk_size=chunk_size, chunk_overlap=chunk_overlap, chunker=chunker
+        )
+        self.max_buffer_chars = max_buffer_chars
+
+    def iter_page_texts(self, path: Path) -> Iterator[tuple[int, str]]:
+        buffer = PageBuffer(max_chars=self.max_buffer_chars)
+        # Word writes an explicit break and then a rendered one for the same
+        # page; breaks with no text in between count once.
+        text_since_break = False
+        with zipfile.ZipFile(path) as zf, zf.open("word/document.xml") as xml:
+            parents: list[ElementTree.Element] = []
+            for event, elem in ElementTree.iterparse(xml, events=("start", "end")):
+                if event == "start":
+                    parents.append(elem)
+                    continue
+                parents.pop()
+                if elem.tag != _PARAGRAPH:
+                    continue
+                for node in elem.iter():
+                    if node.tag == _TEXT and node.text:
+                        buffer.add(node.text)
+                        text_since_break = True
+                    elif node.tag == _TAB:
+                        buffer.add("\t")
+                    elif node.tag == _CARRIAGE_RETURN:
+                        buffer.add("\n")
+                    elif node.tag == _BREAK and node.get(_BREAK_TYPE) != "page":
+                        buffer.add("\n")
+                    elif node.tag in (_BREAK, _RENDERED_PAGE_BREAK):
+                        if text_since_break:
+                            yield from buffer.next_page()
+                            text_since_break = False
+                buffer.add("\n\n")
+                yield from buffer.boundary()
+                # Done with this paragraph; a nested one is not read again
+                # by the paragraph that contains it.
+                if parents:
+                    parents[-1].remove(elem)
+        yield from buffer.flush()
@@ -0,0 +1,301 @@
+import glob
+import logging
+import multiprocessing
+import os
+import time
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from pathlib import Path
+
+from langchain_core.documents import Document
+
+from .chunking import StructuredChunker
+from .ingestion import DOCUMENT_SUFFIXES, empty_document, is_empty_document
+from .ingestion_pdf import PDFIngestion
+from .metrics import METRICS, record_span
+
+log = logging.getLogger(__name__)
+
+_GLOB_CHARS = frozenset("*?[")
+
+
+def expand_document_paths(
+    patterns: Iterable[str | Path], *, suffixes: Iterable[str] = DOCUMENT_SUFFIXES
+) -> list[Path]:
+    """Expand files, directories (recursively) and glob patterns into file paths.
+
+    Directories and globs only contribute files with one of `suffixes`; explicit
+    file paths are returned as-is so the ingestion engine can sniff or reject them.
+    """
+    wanted = {s.lower() for s in suffixes}
+    paths: list[Path] = []
+    for pattern in patterns:
+        pattern_str = str(pattern)
+        if _GLOB_CHARS.intersection(pattern_str):
+            candidates = [Path(p) for p in glob.glob(pattern_str, recursive=True)]
+        elif Path(pattern_str).is_dir():
+            candidates = list(Path(pattern_str).rglob("*"))
+        else:
+            paths.append(Path(pattern_str))
+            continue
+        paths.extend(
+            sorted(p for p in candidates if p.is_file() and p.suffix.lower() in wanted)
+        )
+
+    # Keep order, drop duplicates (overlapping globs/directories).
+    return list(dict.fromkeys(paths))
+
+
+class IngestionProgress:
+    """Tracks extraction throughput and logs it periodically."""
+
+    def __init__(self, *, total_files: int, interval_s: float = 5.0) -> None:
+        self.total_files = total_files
+        self.interval_s = interval_s
+        self.files = 0
+        self.pages = 0
+        self.chunks = 0
+        self._started = time.perf_counter()
+        self._last_report = self._started
+
+    def add(self, *, pages: int = 0, chunks: int = 0, files: int = 0) -> None:
+        if pages:
+            METRICS.increment("rag_ingest_pages_total", pages)
+        self.pages += pages
+        self.chunks += chunks
+        self.files += files
+        now = time.perf_counter()
+        if now - self._last_report >= self.interval_s:
+            self._last_report = now
+            self.report()
+
+    def report(self, *, final: bool = False) -> None:
+        elapsed = max(time.perf_counter() - self._started, 1e-9)
+        log.info(
+            "%s files=%d/%d pages=%d (%.1f pages/s) chunks=%d (%.1f chunks/s)",
+            "Extraction done:" if final else "Extraction progress:",
+            self.files,
+            self.total_files,
+            self.pages,
+            self.pages / elapsed,
+            self.chunks,
+            self.chunks / elapsed,
+        )
+
+
+def _count_pages(path: Path) -> int:
+    return PDFIngestion.page_count(path)
+
+
+def _extract_page_range(
+    path: Path, start: int, stop: int, chunk_size: int, chunk_overlap: int
+) -> list[Document]:
+    ingestion = PDFIngestion(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    return list(ingestion.iter_pages(path, start, stop))
+
+
+def _extract_page_texts(path: Path, start: int, stop: int) -> list[tuple[int, str]]:
+    return list(PDFIngestion().iter_page_texts(path, start, stop))
+
+
+class ParallelPDFIngestion(PDFIngestion):
+    """`PDFIngestion` that extracts text across a process pool.
+
+    `pypdf` extraction is CPU-bound, so files are split into page ranges of
+    `pages_per_task` and processed by `max_workers` processes; at most
+    `max_pending_tasks` ranges are scheduled ahead of the consumer.
+
+    Without a `chunker`, workers also chunk and chunks are yielded in
+    completion order as soon as a range finishes. With a `chunker`, workers
+    only extract text and the consumer chunks each file as one page stream in
+    page order, so sections and paragraphs continue across ranges and the
+    chunks do not depend on `pages_per_task`.
+    """
+
+    def __init__(
+        self,
+        *,
+        chunk_size: int = 900,
+        chunk_overlap: int = 150,
+        chunker: StructuredChunker | None = None,
+        max_workers: int | None = None,
+        pages_per_task: int = 16,
+        max_pending_tasks: int | None = None,
+        progress_interval_s: float = 5.0,
+    ) -> None:
+        super().__init__(
+            chunk_size=chunk_size, chunk_overlap=chunk_overlap, chunker=chunker
+        )
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.pages_per_task = pages_per_task
+        self.max_pending_tasks = max_pending_tasks or 2 * self.max_workers
+        self.progress_interval_s = progress_interval_s
+
+    def iter_load(self, document: str | Path) -> Iterator[Document]:
+        path = self._check_path(document)
+        nr_chunks = 0
+        for doc in self.iter_load_many([path]):
+            if is_empty_document(doc):
+                continue
+            nr_chunks += 1
+            yield doc
+        if not nr_chunks:
+            raise ValueError(f"No extractable text found in {path}")
+
+    def iter_load_many(self, documents: Iterable[str | Path]) -> Iterator[Document]:
+        """Yield chunks of many PDFs; a file without text yields `empty_document`."""
+        paths = [self._check_path(d) for d in documents]
+        progress = IngestionProgress(
+            total_files=len(paths), interval_s=self.progress_interval_s
+        )
+
+        # Spawned workers do not inherit the embedding/upsert threads of the
+        # consumer, which forking a multi-threaded process would.
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(
+            max_workers=self.max_workers, mp_context=context
+        ) as pool:
+            if self.chunker is None:
+                yield from self._iter_completed(pool, paths, progress)
+            else:
+                yield from self._iter_in_order(pool, paths, progress)
+
+        progress.report(final=True)
+
+    def _iter_completed(
+        self,
+        pool: ProcessPoolExecutor,
+        paths: list[Path],
+        progress: IngestionProgress,
+    ) -> Iterator[Document]:
+        todo = deque(paths)
+        ranges: deque[tuple[Path, int, int]] = deque()
+        remaining_ranges: dict[Path, int] = {}
+        file_chunks: dict[Path, int] = {}
+        pending: dict[Future, tuple[str, Path, int, int]] = {}
+
+        while todo or ranges or pending:
+            while len(pending) < self.max_pending_tasks and (ranges or todo):
+                if ranges:
+                    path, start, stop = ranges.popleft()
+                    future = pool.submit(
+                        _extract_page_range,
+                        path,
+                        start,
+                        stop,
+                        self.chunk_size,
+                        self.chunk_overlap,
+                    )
+                    pending[future] = (
+                        "extract",
+                        path,
+                        stop - start,
+                        time.time_ns(),
+                    )
+                else:
+                    path = todo.popleft()
+                    future = pool.submit(_count_pages, path)
+                    pending[future] = ("count", path, 0, time.time_ns())
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                kind, path, nr_pages, submitted_ns = pending.pop(future)
+                if kind == "count":
+                    total = future.result()
+                    starts = range(0, total, self.pages_per_task)
+                    ranges.extend(
+                        (path, s, min(s + self.pages_per_task, total)) for s in starts
+                    )
+                    remaining_ranges[path] = len(starts)
+                    file_chunks[path] = 0
+                    if not starts:
+                        yield from self._finish_file(path, 0, progress)
+                    continue
+
+                docs = future.result()
+                # Submit-to-completion, so it includes time queued in the pool.
+                record_span(
+                    "ingest.extract",
+                    start_ns=submitted_ns,
+                    end_ns=time.time_ns(),
+                    source=str(path),
+                    pages=nr_pages,
+                )
+                remaining_ranges[path] -= 1
+                file_chunks[path] += len(docs)
+                progress.add(pages=nr_pages, chunks=len(docs))
+                yield from docs
+                if remaining_ranges[path] == 0:
+                    yield from self._finish_file(path, file_chunks[path], progress)
+
+    def _iter_in_order(
+        self,
+        pool: ProcessPoolExecutor,
+        paths: list[Path],
+        progress: IngestionProgress,
+    ) -> Iterator[Document]:
+        todo = deque(paths)
+        counts: deque[tuple[Path, Future]] = deque()
+        ranges: deque[tuple[Path, int, int]] = deque()
+        files: deque[tuple[Path, int]] = deque()
+        # Extraction tasks in submission order, which is page order per file.
+        scheduled: deque[tuple[Future, Path, int, int]] = deque()
+
+        def schedule() -> None:
+            while len(scheduled) < self.max_pending_tasks:
+                # Page counts run a few files ahead so they never hold up
+                # extraction of the current file.
+                while todo and len(counts) < self.max_workers:
+                    path = todo.popleft()
+                    counts.append((path, pool.submit(_count_pages, path)))
+                if ranges:
+                    path, start, stop = ranges.popleft()
+                    future = pool.submit(_extract_page_texts, path, start, stop)
+                    scheduled.append((future, path, stop - start, time.time_ns()))
+                elif counts:
+                    path, future = counts.popleft()
+                    total = future.result()
+                    starts = range(0, total, self.pages_per_task)
+                    ranges.extend(
+                        (path, s, min(s + self.pages_per_task, total)) for s in starts
+                    )
+                    files.append((path, len(starts)))
+                else:
+                    return
+
+        def page_texts(nr_ranges: int) -> Iterator[tuple[int, str]]:
+            for _ in range(nr_ranges):
+                schedule()
+                future, path, nr_pages, submitted_ns = scheduled.popleft()
+                texts = future.result()
+                record_span(
+                    "ingest.extract",
+                    start_ns=submitted_ns,
+                    end_ns=time.time_ns(),
+                    source=str(path),
+                    pages=nr_pages,
+                )
+                progress.add(pages=nr_pages)
+                yield from texts
+
+        schedule()
+        while files:
+            path, nr_ranges = files.popleft()
+            nr_chunks = 0
+            for doc in self._split(path, page_texts(nr_ranges)):
+                nr_chunks += 1
+                progress.add(chunks=1)
+                yield doc
+            yield from self._finish_file(path, nr_chunks, progress)
+            schedule()
+
+    def _finish_file(
+        self, path: Path, nr_chunks: int, progress: IngestionProgress
+    ) -> Iterator[Document]:
+        progress.add(files=1)
+        if nr_chunks:
+            self._log.info("Loaded %s chunks from %s", nr_chunks, path)
+        else:
+            self._log.warning("No extractable text found in %s", path)
+            yield empty_document(path)
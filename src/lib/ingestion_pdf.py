@@ -1,49 +1,59 @@
-import logging
+from collections.abc import Iterator
 from pathlib import Path
 
 from langchain_core.documents import Document
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 from pypdf import PdfReader
 
-from .ingestion import Ingestion
+from .chunking import StructuredChunker
+from .ingestion import PagedIngestion
 
 
-class PDFIngestion(Ingestion):
+class PDFIngestion(PagedIngestion):
     """Loads a PDF file and returns chunked LangChain Documents.
 
     Each chunk carries metadata: source (path) and page (1-based).
+
+    Pages are read from the open file (not a copy of it in memory) and
+    extracted one at a time. `pypdf` caches every parsed object, including
+    decoded page content, so the cache is dropped every `cache_pages` pages;
+    what remains is the page index (a few KB per page).
     """
 
-    def __init__(self, *, chunk_size: int = 900, chunk_overlap: int = 150) -> None:
-        self._log = logging.getLogger(__name__)
-        self._splitter = RecursiveCharacterTextSplitter(
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap,
+    format = "pdf"
+
+    def __init__(
+        self,
+        *,
+        chunk_size: int = 900,
+        chunk_overlap: int = 150,
+        chunker: StructuredChunker | None = None,
+        cache_pages: int = 256,
+    ) -> None:
+        super().__init__(
+            chunk_size=chunk_size, chunk_overlap=chunk_overlap, chunker=chunker
         )
+        self.cache_pages = cache_pages
 
-    def load(self, document: str | Path) -> list[Document]:
+    def iter_pages(
+        self, document: str | Path, start: int = 0, stop: int | None = None
+    ) -> Iterator[Document]:
+        """Yield chunks for pages `[start, stop)` (0-based) of a PDF."""
         path = Path(document)
-        if not path.exists():
-            raise FileNotFoundError(path)
-        if path.suffix.lower() != ".pdf":
-            raise ValueError(f"Expected a .pdf file, got: {path}")
-
-        reader = PdfReader(str(path))
-        lc_docs: list[Document] = []
-        for idx, page in enumerate(reader.pages):
-            page_text = (page.extract_text() or "").strip()
-            if not page_text:
-                continue
-
-            for chunk in self._splitter.split_text(page_text):
-                lc_docs.append(
-                    Document(
-                        page_content=chunk,
-                        metadata={"source": str(path), "page": idx + 1},
-                    )
-                )
-
-        if not lc_docs:
-            raise ValueError(f"No extractable text found in {path}")
-        self._log.info("Loaded %s chunks from %s", len(lc_docs), path)
-        return lc_docs
+        return self._split(path, self.iter_page_texts(path, start, stop))
+
+    def iter_page_texts(
+        self, path: Path, start: int = 0, stop: int | None = None
+    ) -> Iterator[tuple[int, str]]:
+        with open(path, "rb") as f:
+            reader = PdfReader(f)
+            stop = len(reader.pages) if stop is None else min(stop, len(reader.pages))
+            for idx in range(start, stop):
+                page_text = reader.pages[idx].extract_text() or ""
+                if (idx - start + 1) % self.cache_pages == 0:
+                    reader.resolved_objects.clear()
+                yield idx + 1, page_text
+
+    @staticmethod
+    def page_count(document: str | Path) -> int:
+        with open(document, "rb") as f:
+            return len(PdfReader(f).pages)
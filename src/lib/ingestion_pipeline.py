@@ -0,0 +1,412 @@
+import contextvars
+import hashlib
+import logging
+import random
+import threading
+import time
+import uuid
+from collections.abc import Callable, Iterable
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from itertools import islice
+from typing import Any, TypeVar
+
+from langchain_core.documents import Document
+from langchain_qdrant import QdrantVectorStore, SparseEmbeddings
+from qdrant_client.http import models as qdrant_models
+from qdrant_client.http.exceptions import ResponseHandlingException
+
+from .ingestion import is_empty_document
+from .metrics import METRICS, span
+from .search_filter import document_filter, normalize_source
+from .source_catalog import SourceCatalog, document_id
+
+log = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Fixed namespace so the same chunk always maps to the same Qdrant point ID.
+CHUNK_ID_NAMESPACE = uuid.UUID("5b0c1f4e-8d3a-4c55-9a43-2f7d1c6e9b10")
+
+# HTTP statuses worth retrying: rate limits and transient server errors.
+RETRYABLE_STATUS_CODES = frozenset({408, 429, 500, 502, 503, 504})
+
+# OpenAI SDK exceptions are matched by name so `openai` stays an indirect
+# dependency (it comes in through `langchain-openai`).
+RETRYABLE_ERROR_NAMES = frozenset(
+    {"RateLimitError", "APITimeoutError", "APIConnectionError", "InternalServerError"}
+)
+
+
+def is_retryable(error: BaseException) -> bool:
+    """True for rate limits and transient network/server errors."""
+    if isinstance(error, ResponseHandlingException):
+        return True
+    if type(error).__name__ in RETRYABLE_ERROR_NAMES:
+        return True
+    status_code = getattr(error, "status_code", None)
+    return status_code in RETRYABLE_STATUS_CODES
+
+
+def call_with_retry(
+    fn: Callable[[], T],
+    *,
+    what: str,
+    max_retries: int,
+    base_delay: float,
+    max_delay: float,
+) -> T:
+    """Call `fn`, retrying retryable errors with exponential backoff + full jitter."""
+    attempt = 0
+    while True:
+        try:
+            return fn()
+        except Exception as e:
+            if attempt >= max_retries or not is_retryable(e):
+                raise
+            delay = random.uniform(0.0, min(max_delay, base_delay * 2**attempt))
+            attempt += 1
+            log.warning(
+                "%s failed (%s); retry %d/%d in %.2fs",
+                what,
+                type(e).__name__,
+                attempt,
+                max_retries,
+                delay,
+            )
+            time.sleep(delay)
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def chunk_point_id(doc: Document) -> str:
+    """Deterministic point ID from tenant, source, page and content hash."""
+    meta = doc.metadata or {}
+    digest = meta.get("content_hash") or content_hash(doc.page_content)
+    key = f"{meta.get('source', '')}\0{meta.get('page', '')}\0{digest}"
+    if meta.get("tenant") is not None:
+        key = f"{meta['tenant']}\0{key}"
+    return str(uuid.uuid5(CHUNK_ID_NAMESPACE, key))
+
+
+def _sparse_embeddings(vector_store: QdrantVectorStore) -> SparseEmbeddings | None:
+    try:
+        return vector_store.sparse_embeddings
+    except ValueError:  # dense-only store
+        return None
+
+
+@dataclass
+class IngestionStats:
+    chunks: int = 0
+    batches: int = 0
+    skipped: int = 0
+    deleted: int = 0
+    elapsed_s: float = 0.0
+
+    @property
+    def chunks_per_s(self) -> float:
+        return self.chunks / self.elapsed_s if self.elapsed_s > 0 else 0.0
+
+
+class IngestionPipeline:
+    """Streams chunks into Qdrant through a bounded pool of embed+upsert workers.
+
+    Chunks are grouped into batches of `batch_size` as they arrive from the
+    (lazy) ingestion iterator. Each batch is embedded and upserted on one of
+    `max_concurrency` worker threads, so network I/O for early batches overlaps
+    parsing of later pages. At most `max_pending_batches` batches are in flight;
+    the producer blocks beyond that (backpressure), which bounds memory.
+
+    Ingestion is incremental: every chunk gets a deterministic point ID (see
+    `chunk_point_id`), after its `source` is normalized (`normalize_source`,
+    so the same file given as different paths is one source). A document is a
+    source within a `tenant`: the same file stored for two tenants is two
+    independent documents. Chunks whose ID already exists for their document
+    are not embedded again, and once a document has been fully processed, its
+    points that no longer correspond to any chunk (removed or edited pages)
+    are deleted. If a `catalog` is given, each
+    processed source's entry is then refreshed, and the collection version is
+    bumped when any chunk was added or deleted.
+
+    A source given as an `empty_document` marker (a file without text) keeps
+    no chunks: all of its points are deleted and its catalog entry dropped.
+
+    If the run fails, the batches stored so far stay; the catalog and version
+    are still refreshed for them, but nothing is deleted. Re-running the same
+    ingestion skips the stored chunks and completes it.
+
+    When the vector store has sparse embeddings (hybrid collections), each
+    point also gets its sparse vector next to the dense one.
+
+    Every new chunk records `document_id` (stable per source and tenant),
+    `ingested_at` (start of the run, ISO 8601 UTC) and, if given, `tenant` in
+    its metadata, so searches can filter on them (see `SearchFilter`).
+    Unchanged chunks keep their original `ingested_at`.
+    """
+
+    def __init__(
+        self,
+        *,
+        vector_store: QdrantVectorStore,
+        catalog: SourceCatalog | None = None,
+        batch_size: int = 64,
+        max_concurrency: int = 4,
+        max_pending_batches: int | None = None,
+        max_retries: int = 6,
+        base_delay: float = 1.0,
+        max_delay: float = 30.0,
+        tenant: str | None = None,
+    ) -> None:
+        if batch_size <= 0:
+            raise ValueError("batch_size must be positive")
+        if max_concurrency <= 0:
+            raise ValueError("max_concurrency must be positive")
+
+        self.vector_store = vector_store
+        self.sparse_embeddings = _sparse_embeddings(vector_store)
+        self.catalog = catalog
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+        self.max_pending_batches = max_pending_batches or 2 * max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.tenant = tenant
+
+    def run(self, chunks: Iterable[Document]) -> IngestionStats:
+        """Embed and upsert all chunks; returns throughput stats."""
+        with span("ingest.run") as current:
+            stats = self._run(chunks)
+            current.set(
+                chunks=stats.chunks,
+                batches=stats.batches,
+                skipped=stats.skipped,
+                deleted=stats.deleted,
+            )
+        return stats
+
+    def _run(self, chunks: Iterable[Document]) -> IngestionStats:
+        stats = IngestionStats()
+        started = time.perf_counter()
+        labels: dict[str, Any] = {
+            "ingested_at": datetime.now(UTC).isoformat(timespec="seconds")
+        }
+        if self.tenant is not None:
+            labels["tenant"] = self.tenant
+        slots = threading.BoundedSemaphore(self.max_pending_batches)
+        errors: list[BaseException] = []
+        lock = threading.Lock()
+
+        def _on_done(future: Future[int]) -> None:
+            slots.release()
+            with lock:
+                error = future.exception()
+                if error is not None:
+                    errors.append(error)
+                    return
+                stats.chunks += future.result()
+                stats.batches += 1
+
+        existing: dict[str, set[str]] = {}
+        seen: dict[str, set[str]] = {}
+        page_ranges: dict[str, tuple[int, int]] = {}
+
+        def _new_chunks() -> Iterable[Document]:
+            for doc in chunks:
+                source = normalize_source(str((doc.metadata or {}).get("source", "")))
+                if source not in existing:
+                    with span("ingest.existing_ids", source=source):
+                        existing[source] = self._existing_point_ids(source)
+                    seen[source] = set()
+                if is_empty_document(doc):
+                    # No text any more: everything stored for it is stale.
+                    continue
+
+                doc.metadata = {
+                    **(doc.metadata or {}),
+                    **labels,
+                    "source": source,
+                    "document_id": document_id(source, self.tenant),
+                    "content_hash": content_hash(doc.page_content),
+                }
+                point_id = chunk_point_id(doc)
+                page = doc.metadata.get("page")
+                if isinstance(page, int):
+                    page_end = doc.metadata.get("page_end", page)
+                    low, high = page_ranges.get(source, (page, page_end))
+                    page_ranges[source] = (min(low, page), max(high, page_end))
+                if point_id in seen[source] or point_id in existing[source]:
+                    seen[source].add(point_id)
+                    stats.skipped += 1
+                    continue
+                seen[source].add(point_id)
+                yield doc
+
+        iterator = iter(_new_chunks())
+        try:
+            with ThreadPoolExecutor(
+                max_workers=self.max_concurrency, thread_name_prefix="ingest"
+            ) as pool:
+                while batch := list(islice(iterator, self.batch_size)):
+                    slots.acquire()
+                    with lock:
+                        if errors:
+                            slots.release()
+                            break
+                    # Run in a copy of this context so batch spans nest under
+                    # the run.
+                    future = pool.submit(
+                        contextvars.copy_context().run, self._process_batch, batch
+                    )
+                    future.add_done_callback(_on_done)
+            if errors:
+                raise errors[0]
+        except Exception:
+            log.error(
+                "Ingestion failed after storing %d chunks in %d batches; stale "
+                "chunks were not deleted. Re-run the same ingestion to finish it "
+                "(stored chunks are skipped).",
+                stats.chunks,
+                stats.batches,
+            )
+            if stats.chunks:
+                self._refresh_catalog(existing, page_ranges, changed=True)
+            raise
+
+        for source, point_ids in existing.items():
+            stale = point_ids - seen[source]
+            if stale:
+                with span("ingest.delete_stale", source=source, points=len(stale)):
+                    self._delete_points(stale)
+                stats.deleted += len(stale)
+                log.info("Deleted %d stale chunks of %s", len(stale), source)
+        self._refresh_catalog(
+            existing, page_ranges, changed=bool(stats.chunks or stats.deleted)
+        )
+
+        stats.elapsed_s = time.perf_counter() - started
+        log.info(
+            "Ingested %d chunks in %d batches, skipped %d unchanged, deleted %d "
+            "stale (%.1fs, %.1f chunks/s)",
+            stats.chunks,
+            stats.batches,
+            stats.skipped,
+            stats.deleted,
+            stats.elapsed_s,
+            stats.chunks_per_s,
+        )
+        return stats
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _refresh_catalog(
+        self,
+        sources: Iterable[str],
+        page_ranges: dict[str, tuple[int, int]],
+        *,
+        changed: bool,
+    ) -> None:
+        """Refresh the catalog entries of `sources`; bump the version if `changed`."""
+        if self.catalog is None:
+            return
+        for source in sources:
+            page_min, page_max = page_ranges.get(source, (None, None))
+            with span("ingest.catalog", source=source):
+                self.catalog.record(
+                    source=source,
+                    tenant=self.tenant,
+                    page_min=page_min,
+                    page_max=page_max,
+                )
+        if changed:
+            version = self.catalog.bump_version()
+            log.info("Documents changed; collection version is now %s", version)
+
+    def _existing_point_ids(self, source: str) -> set[str]:
+        """IDs of all points currently stored for `source` of this tenant."""
+        source_filter = document_filter(source, self.tenant)
+        point_ids: set[str] = set()
+        offset = None
+        while True:
+            points, offset = self.vector_store.client.scroll(
+                collection_name=self.vector_store.collection_name,
+                scroll_filter=source_filter,
+                limit=1024,
+                offset=offset,
+                with_payload=False,
+                with_vectors=False,
+            )
+            point_ids.update(str(point.id) for point in points)
+            if offset is None:
+                break
+        return point_ids
+
+    def _delete_points(self, point_ids: set[str]) -> None:
+        ordered = sorted(point_ids)
+        for start in range(0, len(ordered), 1024):
+            selector = qdrant_models.PointIdsList(points=ordered[start : start + 1024])
+            call_with_retry(
+                lambda: self.vector_store.client.delete(
+                    collection_name=self.vector_store.collection_name,
+                    points_selector=selector,
+                ),
+                what="Deleting stale points",
+                max_retries=self.max_retries,
+                base_delay=self.base_delay,
+                max_delay=self.max_delay,
+            )
+
+    def _process_batch(self, batch: list[Document]) -> int:
+        texts = [doc.page_content for doc in batch]
+        with span("ingest.embed", chunks=len(batch)):
+            vectors = call_with_retry(
+                lambda: self.vector_store.embeddings.embed_documents(texts),
+                what="Embedding batch",
+                max_retries=self.max_retries,
+                base_delay=self.base_delay,
+                max_delay=self.max_delay,
+            )
+
+        named_vectors: list[dict[str, Any]] = [
+            {self.vector_store.vector_name: vector} for vector in vectors
+        ]
+        if self.sparse_embeddings is not None:
+            with span("ingest.embed_sparse", chunks=len(batch)):
+                sparse_vectors = self.sparse_embeddings.embed_documents(texts)
+            for named, sparse in zip(named_vectors, sparse_vectors, strict=True):
+                named[self.vector_store.sparse_vector_name] = (
+                    qdrant_models.SparseVector(
+                        indices=sparse.indices, values=sparse.values
+                    )
+                )
+
+        points = [
+            qdrant_models.PointStruct(
+                id=chunk_point_id(doc),
+                vector=named,
+                payload={
+                    self.vector_store.content_payload_key: doc.page_content,
+                    self.vector_store.metadata_payload_key: doc.metadata,
+                },
+            )
+            for doc, named in zip(batch, named_vectors, strict=True)
+        ]
+        with span("ingest.upsert", points=len(points)):
+            call_with_retry(
+                lambda: self.vector_store.client.upsert(
+                    collection_name=self.vector_store.collection_name,
+                    points=points,
+                ),
+                what="Upserting batch",
+                max_retries=self.max_retries,
+                base_delay=self.base_delay,
+                max_delay=self.max_delay,
+            )
+        METRICS.increment("rag_ingest_chunks_total", len(points))
+        return len(points)
@@ -0,0 +1,77 @@
+import logging
+from collections.abc import Iterable, Iterator, Mapping
+from pathlib import Path
+
+from langchain_core.documents import Document
+
+from .chunking import StructuredChunker
+from .ingestion import FORMAT_SUFFIXES, Ingestion, PagedIngestion, detect_format
+from .ingestion_docx import DocxIngestion
+from .ingestion_parallel import ParallelPDFIngestion
+from .ingestion_text import HTMLIngestion, MarkdownIngestion, TextIngestion
+
+log = logging.getLogger(__name__)
+
+
+def default_engines(
+    *,
+    chunk_size: int = 900,
+    chunk_overlap: int = 150,
+    chunker: StructuredChunker | None = None,
+    max_workers: int | None = None,
+) -> dict[str, PagedIngestion]:
+    """One engine per supported format; PDFs are extracted on a process pool."""
+    chunking = {
+        "chunk_size": chunk_size,
+        "chunk_overlap": chunk_overlap,
+        "chunker": chunker,
+    }
+    return {
+        "pdf": ParallelPDFIngestion(**chunking, max_workers=max_workers),
+        "docx": DocxIngestion(**chunking),
+        "html": HTMLIngestion(**chunking),
+        "markdown": MarkdownIngestion(**chunking),
+        "text": TextIngestion(**chunking),
+    }
+
+
+class IngestionRegistry(Ingestion):
+    """Dispatches each document to the engine of its format.
+
+    The format comes from the file suffix or, for unknown suffixes, the MIME
+    type (guessed from the name, then sniffed from the first bytes; see
+    `detect_format`). Every engine yields the same `source` / `page` metadata.
+    By default documents are chunked with `StructuredChunker`.
+    """
+
+    def __init__(self, *, engines: Mapping[str, PagedIngestion] | None = None) -> None:
+        self.engines = dict(engines or default_engines(chunker=StructuredChunker()))
+
+    @property
+    def suffixes(self) -> tuple[str, ...]:
+        """File suffixes picked up from directories and glob patterns."""
+        return tuple(s for fmt in self.engines for s in FORMAT_SUFFIXES[fmt])
+
+    def engine_for(self, document: str | Path) -> PagedIngestion:
+        """Engine for `document`; `ValueError` if its format is not supported."""
+        fmt = detect_format(document)
+        if fmt not in self.engines:
+            raise ValueError(f"Unsupported document format: {document}")
+        return self.engines[fmt]
+
+    def iter_load(self, document: str | Path) -> Iterator[Document]:
+        return self.engine_for(document).iter_load(document)
+
+    def iter_load_many(self, documents: Iterable[str | Path]) -> Iterator[Document]:
+        """Yield chunks of many documents, grouped by format.
+
+        Every path is checked before the first chunk is yielded; files without
+        text yield an `empty_document` marker.
+        """
+        groups: dict[str, list[Path]] = {}
+        for document in documents:
+            engine = self.engine_for(document)
+            groups.setdefault(engine.format, []).append(Path(document))
+        for fmt, paths in groups.items():
+            log.info("Ingesting %d %s file(s)", len(paths), fmt)
+            yield from self.engines[fmt].iter_load_many(paths)
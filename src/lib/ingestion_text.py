@@ -0,0 +1,240 @@
+import re
+from collections.abc import Iterator
+from html.parser import HTMLParser
+from pathlib import Path
+
+from langchain_text_splitters import Language, RecursiveCharacterTextSplitter
+
+from .chunking import StructuredChunker
+from .ingestion import PagedIngestion
+
+_READ_BLOCK = 64 * 1024
+_ATX_HEADING = re.compile(r"^ {0,3}(#{1,6})(?:[ \t]|$)")
+_FENCE = re.compile(r"^ {0,3}(`{3,}|~{3,})")
+_BLANK_LINES = re.compile(r"\n{3,}")
+_INLINE_SPACE = re.compile(r"[^\S\n]+")
+_LINE_END_SPACE = re.compile(r" ?\n ?")
+
+
+class PageBuffer:
+    """Text of the current page, handed out in parts of about `max_chars`.
+
+    Engines `add` text and call `boundary` where a part may end (a paragraph
+    break), so a page of any length is buffered at most `max_chars` at a time.
+    """
+
+    def __init__(self, *, max_chars: int = 64 * 1024) -> None:
+        self.max_chars = max_chars
+        self.page = 1
+        self._parts: list[str] = []
+        self._size = 0
+        self._page_has_text = False
+
+    def add(self, text: str) -> None:
+        self._parts.append(text)
+        self._size += len(text)
+
+    def boundary(self) -> Iterator[tuple[int, str]]:
+        """Hand out the buffer if it is full."""
+        if self._size >= self.max_chars:
+            yield from self.flush()
+
+    def flush(self) -> Iterator[tuple[int, str]]:
+        text = "".join(self._parts)
+        self._parts, self._size = [], 0
+        if text.strip():
+            self._page_has_text = True
+            yield self.page, text
+
+    def next_page(self, *, skip_empty: bool = False) -> Iterator[tuple[int, str]]:
+        """Flush and start a new page (unless `skip_empty` and this one has no text)."""
+        yield from self.flush()
+        if self._page_has_text or not skip_empty:
+            self.page += 1
+            self._page_has_text = False
+
+
+class TextIngestion(PagedIngestion):
+    """Plain-text files; pages are separated by form feeds (`\\f`).
+
+    The file is read line by line (UTF-8, undecodable bytes replaced).
+    """
+
+    format = "text"
+
+    def __init__(
+        self,
+        *,
+        chunk_size: int = 900,
+        chunk_overlap: int = 150,
+        chunker: StructuredChunker | None = None,
+        max_buffer_chars: int = 64 * 1024,
+    ) -> None:
+        super().__init__(
+            chunk_size=chunk_size, chunk_overlap=chunk_overlap, chunker=chunker
+        )
+        self.max_buffer_chars = max_buffer_chars
+
+    def iter_page_texts(self, path: Path) -> Iterator[tuple[int, str]]:
+        buffer = PageBuffer(max_chars=self.max_buffer_chars)
+        with open(path, encoding="utf-8", errors="replace") as f:
+            for line in f:
+                *done, line = line.split("\f")
+                for text in done:
+                    buffer.add(text)
+                    yield from buffer.next_page()
+                buffer.add(line)
+                if not line.strip():
+                    yield from buffer.boundary()
+        yield from buffer.flush()
+
+
+class MarkdownIngestion(TextIngestion):
+    """Markdown files; each heading of level <= `section_level` starts a page.
+
+    Headings inside fenced code blocks do not count. Chunks are split on
+    Markdown structure (headings, code blocks, rules) before paragraphs.
+    """
+
+    format = "markdown"
+
+    def __init__(
+        self,
+        *,
+        chunk_size: int = 900,
+        chunk_overlap: int = 150,
+        chunker: StructuredChunker | None = None,
+        max_buffer_chars: int = 64 * 1024,
+        section_level: int = 2,
+    ) -> None:
+        super().__init__(
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            chunker=chunker,
+            max_buffer_chars=max_buffer_chars,
+        )
+        self.section_level = section_level
+
+    def iter_page_texts(self, path: Path) -> Iterator[tuple[int, str]]:
+        buffer = PageBuffer(max_chars=self.max_buffer_chars)
+        fence: str | None = None
+        with open(path, encoding="utf-8", errors="replace") as f:
+            for line in f:
+                if match := _FENCE.match(line):
+                    marker = match.group(1)
+                    if fence is None:
+                        fence = marker
+                    elif marker[0] == fence[0] and len(marker) >= len(fence):
+                        fence = None
+                elif fence is None:
+                    heading = _ATX_HEADING.match(line)
+                    if heading and len(heading.group(1)) <= self.section_level:
+                        yield from buffer.next_page(skip_empty=True)
+                buffer.add(line)
+                if fence is None and not line.strip():
+                    yield from buffer.boundary()
+        yield from buffer.flush()
+
+    def _make_splitter(self) -> RecursiveCharacterTextSplitter:
+        return RecursiveCharacterTextSplitter.from_language(
+            Language.MARKDOWN,
+            chunk_size=self.chunk_size,
+            chunk_overlap=self.chunk_overlap,
+        )
+
+
+class _HTMLText(HTMLParser):
+    """Visible text of an HTML document, cut into pages at section headings."""
+
+    SKIP = frozenset(
+        {"head", "title", "script", "style", "noscript", "template", "svg"}
+    )
+    BLOCK = frozenset(
+        "address article aside blockquote br dd div dl dt figcaption figure footer "
+        "form h1 h2 h3 h4 h5 h6 header hr li main nav ol p pre section table td th "
+        "tr ul".split()
+    )
+
+    def __init__(self, *, section_level: int, max_chars: int) -> None:
+        super().__init__(convert_charrefs=True)
+        self.section_level = section_level
+        self.buffer = PageBuffer(max_chars=max_chars)
+        self.ready: list[tuple[int, str]] = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag: str, attrs: list) -> None:
+        if tag == "body":
+            # `</head>` is optional.
+            self._skip_depth = 0
+        elif tag in self.SKIP:
+            self._skip_depth += 1
+            return
+        if tag in self.BLOCK:
+            level = int(tag[1]) if tag[0] == "h" and tag[1:].isdigit() else None
+            if level is not None and level <= self.section_level:
+                self.ready.extend(self.buffer.next_page(skip_empty=True))
+            self.buffer.add("\n\n")
+            self.ready.extend(self.buffer.boundary())
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in self.SKIP:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag in self.BLOCK:
+            self.buffer.add("\n\n")
+
+    def handle_data(self, data: str) -> None:
+        if not self._skip_depth:
+            self.buffer.add(data)
+
+    def close(self) -> None:
+        super().close()
+        self.ready.extend(self.buffer.flush())
+
+
+def _tidy_html_text(text: str) -> str:
+    """Collapse whitespace within lines and runs of blank lines."""
+    text = _LINE_END_SPACE.sub("\n", _INLINE_SPACE.sub(" ", text))
+    return _BLANK_LINES.sub("\n\n", text)
+
+
+class HTMLIngestion(PagedIngestion):
+    """HTML files; each `<h1>`..`<hN>` (N = `section_level`) starts a page.
+
+    The file is fed to `html.parser` in 64 KB blocks; `<head>`, scripts,
+    styles and inline SVG are dropped and block elements become paragraph
+    breaks.
+    """
+
+    format = "html"
+
+    def __init__(
+        self,
+        *,
+        chunk_size: int = 900,
+        chunk_overlap: int = 150,
+        chunker: StructuredChunker | None = None,
+        max_buffer_chars: int = 64 * 1024,
+        section_level: int = 2,
+    ) -> None:
+        super().__init__(
+            chunk_size=chunk_size, chunk_overlap=chunk_overlap, chunker=chunker
+        )
+        self.max_buffer_chars = max_buffer_chars
+        self.section_level = section_level
+
+    def iter_page_texts(self, path: Path) -> Iterator[tuple[int, str]]:
+        parser = _HTMLText(
+            section_level=self.section_level, max_chars=self.max_buffer_chars
+        )
+        with open(path, encoding="utf-8", errors="replace") as f:
+            while block := f.read(_READ_BLOCK):
+                parser.feed(block)
+                yield from self._drain(parser)
+        parser.close()
+        yield from self._drain(parser)
+
+    @staticmethod
+    def _drain(parser: _HTMLText) -> Iterator[tuple[int, str]]:
+        ready, parser.ready = parser.ready, []
+        for page, text in ready:
+            yield page, _tidy_html_text(text)
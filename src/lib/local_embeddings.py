@@ -0,0 +1,172 @@
+import importlib.util
+import logging
+import os
+import threading
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Protocol
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from .metrics import span
+
+log = logging.getLogger(__name__)
+
+DEFAULT_LOCAL_EMBEDDING_MODEL = "BAAI/bge-small-en-v1.5"
+
+_MISSING_DEPENDENCY = (
+    "Local embeddings need the optional 'local' dependencies (uv sync --extra local)"
+)
+
+
+class EmbeddingModel(Protocol):
+    """Embeds a batch of texts; `fastembed.TextEmbedding` fits."""
+
+    def embed(
+        self, documents: Iterable[str], batch_size: int = ...
+    ) -> Iterable[Any]: ...
+
+
+def load_fastembed_model(model_name: str, threads: int) -> EmbeddingModel:
+    try:
+        from fastembed import TextEmbedding
+    except ImportError as e:
+        raise RuntimeError(_MISSING_DEPENDENCY) from e
+    log.info("Loading embedding model %s (ONNX, threads=%d)", model_name, threads)
+    return TextEmbedding(model_name=model_name, threads=threads)
+
+
+def estimate_tokens(text: str, *, max_tokens: int = 512) -> int:
+    """Rough token count (~4 characters per token), capped at the model limit."""
+    return min(max_tokens, len(text) // 4 + 2)
+
+
+def plan_batches(
+    texts: list[str], *, max_batch_tokens: int, max_batch_size: int
+) -> list[list[int]]:
+    """Group text indices into batches of similar length.
+
+    The model pads every text in a batch to the longest one, so texts are
+    sorted by estimated length and a batch is closed once `size x longest`
+    would exceed `max_batch_tokens` (or it holds `max_batch_size` texts).
+    """
+    order = sorted(range(len(texts)), key=lambda i: estimate_tokens(texts[i]))
+    batches: list[list[int]] = []
+    batch: list[int] = []
+    longest = 0
+    for i in order:
+        tokens = estimate_tokens(texts[i])
+        if batch and (
+            len(batch) >= max_batch_size
+            or (len(batch) + 1) * max(longest, tokens) > max_batch_tokens
+        ):
+            batches.append(batch)
+            batch, longest = [], 0
+        batch.append(i)
+        longest = max(longest, tokens)
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+class LocalEmbeddings(Embeddings):
+    """Embeddings computed on the local CPU (no API calls, no rate limits).
+
+    Texts are grouped by length (`plan_batches`) and the batches are run on
+    `max_workers` threads, each with its share of the CPU cores (ONNX Runtime
+    releases the GIL). Results are written into one `float32` matrix;
+    `embed_array` returns it as is, `embed_documents` converts it to lists in a
+    single call for the LangChain / Qdrant interfaces.
+
+    `model` defaults to `model_name` loaded with `fastembed` on first use
+    (optional dependency; `RuntimeError` if it is not installed). Queries and
+    documents are embedded the same way, so `CachedEmbeddings.embed_queries`
+    may batch query misses through `embed_documents`.
+    """
+
+    def __init__(
+        self,
+        *,
+        model_name: str = DEFAULT_LOCAL_EMBEDDING_MODEL,
+        model: EmbeddingModel | None = None,
+        max_batch_tokens: int = 8192,
+        max_batch_size: int = 64,
+        max_workers: int | None = None,
+    ) -> None:
+        if model is None and importlib.util.find_spec("fastembed") is None:
+            raise RuntimeError(_MISSING_DEPENDENCY)
+        self.model_name = model_name
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max_batch_size
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+
+        self._model = model
+        self._model_lock = threading.Lock()
+        self._dimension: int | None = None
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="embed"
+        )
+
+    @property
+    def dimension(self) -> int:
+        """Vector size, from one probe embedding on first access."""
+        if self._dimension is None:
+            self._dimension = int(self.embed_array(["dimension probe"]).shape[1])
+        return self._dimension
+
+    # ------------------------------------------------------------------
+    # Embeddings interface
+    # ------------------------------------------------------------------
+
+    def embed_array(self, texts: list[str]) -> np.ndarray:
+        """Embed `texts` into a `(len(texts), dimension)` float32 matrix."""
+        if not texts:
+            return np.empty((0, self._dimension or 0), dtype=np.float32)
+        model = self._load()
+        batches = plan_batches(
+            texts,
+            max_batch_tokens=self.max_batch_tokens,
+            max_batch_size=self.max_batch_size,
+        )
+        with span("embed_local", texts=len(texts), batches=len(batches)):
+            out: np.ndarray | None = None
+            for batch, vectors in zip(
+                batches,
+                self._executor.map(
+                    lambda batch: self._embed_batch(model, texts, batch), batches
+                ),
+            ):
+                if out is None:
+                    out = np.empty((len(texts), vectors.shape[1]), dtype=np.float32)
+                out[batch] = vectors
+        assert out is not None
+        self._dimension = out.shape[1]
+        return out
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.embed_array(texts).tolist()
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_array([text])[0].tolist()
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _load(self) -> EmbeddingModel:
+        with self._model_lock:
+            if self._model is None:
+                threads = max(1, (os.cpu_count() or 1) // self.max_workers)
+                self._model = load_fastembed_model(self.model_name, threads)
+            return self._model
+
+    @staticmethod
+    def _embed_batch(
+        model: EmbeddingModel, texts: list[str], batch: list[int]
+    ) -> np.ndarray:
+        rows = model.embed([texts[i] for i in batch], batch_size=len(batch))
+        return np.asarray(list(rows), dtype=np.float32)
@@ -0,0 +1,185 @@
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from lib.context_builder import Tokenizer
+from lib.metrics import span
+
+log = logging.getLogger(__name__)
+
+
+SUMMARY_PROMPT = (
+    "You maintain a running summary of a conversation between a user and an "
+    "assistant answering questions from a document knowledge base.\n"
+    "Update the summary with the new lines. Keep names, numbers, document "
+    "titles and open questions; drop pleasantries. Reply with the updated "
+    "summary only, at most {words} words."
+)
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+# Evicted turns kept for the summarizer while it keeps failing.
+MAX_UNSUMMARIZED_TURNS = 32
+
+REWRITE_PROMPT = (
+    "Rewrite the user's follow-up question as a standalone search query for a "
+    "document knowledge base, resolving pronouns and references from the "
+    "conversation. Reply with the query only."
+)
+
+
+@dataclass
+class _Turn:
+    user: HumanMessage
+    assistant: AIMessage
+    tokens: int
+
+    def render(self) -> str:
+        return f"User: {self.user.content}\nAssistant: {self.assistant.content}"
+
+
+class ConversationMemory:
+    """Bounded chat history for multi-turn RAG.
+
+    The last `max_turns` turns are kept verbatim as long as they fit in
+    `max_tokens` minus the summary's share (a quarter); the latest turn is
+    always kept. Older turns are folded into a running summary by `llm` on a
+    background thread, so the next turn does not wait for it; until the summary
+    catches up, evicted turns are simply not in the history. If summarizing keeps
+    failing, only the newest `MAX_UNSUMMARIZED_TURNS` evicted turns are kept for
+    it. `messages()` therefore stays roughly constant in size however long the
+    session runs.
+
+    With `rewrite_queries`, `retrieval_query` turns a follow-up ("and its
+    torque?") into a standalone search query using the history (one extra,
+    non-streamed model call per turn).
+    """
+
+    def __init__(
+        self,
+        *,
+        llm: Any,
+        max_turns: int = 4,
+        max_tokens: int = 2000,
+        summarize: bool = True,
+        rewrite_queries: bool = False,
+        tokenizer: Tokenizer | None = None,
+    ) -> None:
+        if max_turns < 1:
+            raise ValueError("max_turns must be >= 1")
+        self.llm = llm
+        self.max_turns = max_turns
+        self.max_tokens = max_tokens
+        self.rewrite_queries = rewrite_queries
+        self.tokenizer = tokenizer or Tokenizer()
+        self.summary = ""
+        self.summary_tokens = max(max_tokens // 4, 64)
+
+        self._lock = threading.Lock()
+        self._turns: list[_Turn] = []
+        self._evicted: list[_Turn] = []
+        self._pending: Future[None] | None = None
+        self._executor = (
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix="memory-summary")
+            if summarize
+            else None
+        )
+
+    def messages(self) -> list[Any]:
+        """History to send with the next question: summary + recent turns."""
+        with self._lock:
+            out: list[Any] = []
+            if self.summary:
+                out.append(SystemMessage(content=SUMMARY_PREFIX + self.summary))
+            for turn in self._turns:
+                out.extend((turn.user, turn.assistant))
+            return out
+
+    def add_turn(self, user: str, assistant: str) -> None:
+        tokens = self.tokenizer.count(user) + self.tokenizer.count(assistant)
+        with self._lock:
+            self._turns.append(
+                _Turn(HumanMessage(content=user), AIMessage(content=assistant), tokens)
+            )
+            while len(self._turns) > 1 and (
+                len(self._turns) > self.max_turns
+                or sum(t.tokens for t in self._turns)
+                > self.max_tokens - self.summary_tokens
+            ):
+                self._evicted.append(self._turns.pop(0))
+            if self._executor is None:
+                self._evicted.clear()
+            elif len(self._evicted) > MAX_UNSUMMARIZED_TURNS:
+                dropped = len(self._evicted) - MAX_UNSUMMARIZED_TURNS
+                del self._evicted[:dropped]
+                log.warning("Dropped %d unsummarized turn(s) from memory", dropped)
+        self._schedule_summary()
+
+    def retrieval_query(self, question: str) -> str:
+        """Standalone search query for `question` (itself unless rewriting)."""
+        history = self.messages()
+        if not self.rewrite_queries or not history:
+            return question
+        try:
+            with span("memory.rewrite"):
+                response = self.llm.invoke(
+                    [
+                        SystemMessage(content=REWRITE_PROMPT),
+                        *history,
+                        HumanMessage(content=f"Follow-up question: {question}"),
+                    ]
+                )
+        except Exception:
+            log.warning("Query rewrite failed; retrieving with the question as-is")
+            return question
+        query = str(response.content).strip()
+        log.info("Rewrote retrieval query: `%s` -> `%s`", question, query)
+        return query or question
+
+    def close(self, *, wait: bool = True) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=not wait)
+
+    def _schedule_summary(self) -> None:
+        with self._lock:
+            if self._executor is None or not self._evicted:
+                return
+            if self._pending is not None and not self._pending.done():
+                # Picked up when the running summary finishes.
+                return
+            batch = list(self._evicted)
+            self._pending = self._executor.submit(self._summarize, self.summary, batch)
+
+    def _summarize(self, summary: str, batch: list[_Turn]) -> None:
+        limit = self.summary_tokens
+        new_lines = "\n\n".join(turn.render() for turn in batch)
+        try:
+            with span("memory.summarize", turns=len(batch)):
+                response = self.llm.invoke(
+                    [
+                        SystemMessage(
+                            content=SUMMARY_PROMPT.format(words=int(limit * 0.75))
+                        ),
+                        HumanMessage(
+                            content=f"Current summary:\n{summary or '(none)'}\n\n"
+                            f"New lines:\n{new_lines}"
+                        ),
+                    ]
+                )
+            updated = self.tokenizer.truncate(str(response.content).strip(), limit)
+        except Exception:
+            log.exception("Conversation summary failed; retrying after next turn")
+            with self._lock:
+                self._pending = None
+            return
+
+        with self._lock:
+            self.summary = updated
+            # `add_turn` may have dropped some of the batch meanwhile.
+            done = {id(turn) for turn in batch}
+            self._evicted = [t for t in self._evicted if id(t) not in done]
+            self._pending = None
+        log.info("Folded %d turn(s) into the conversation summary", len(batch))
+        self._schedule_summary()
@@ -0,0 +1,455 @@
+import contextvars
+import json
+import logging
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Iterator, Mapping
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+
+log = logging.getLogger(__name__)
+
+# Seconds; covers cached embeddings (sub-ms) up to slow model turns.
+DURATION_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)  # fmt: skip
+RATE_BUCKETS = (1.0, 5.0, 10.0, 25.0, 50.0, 100.0, 200.0, 500.0, 1000.0)
+
+STAGE_DURATION = "rag_stage_duration_seconds"
+
+_HELP = {
+    STAGE_DURATION: "Duration of instrumented stages (one per span name).",
+    "rag_llm_time_to_first_token_seconds": (
+        "Time from the model call (agent: turn start) to the first answer token."
+    ),
+    "rag_llm_tokens_per_second": "Output tokens per second while streaming.",
+    "rag_llm_output_tokens_total": "Output tokens streamed by the model.",
+    "rag_llm_input_tokens_total": "Prompt tokens reported by the model backend.",
+    "rag_tool_calls_total": "Agent tool calls by tool and status.",
+    "rag_agent_prefetch_total": (
+        "Agent prefetched searches: served a tool call (hit), tool query did not "
+        "match (miss) or no tool call used it (unused)."
+    ),
+    "rag_embedding_cache_requests_total": "Query embedding lookups by result.",
+    "rag_answer_cache_requests_total": "Answer cache lookups by result.",
+    "rag_rerank_cache_requests_total": "Reranker (query, chunk) score lookups.",
+    "rag_ingest_chunks_total": "Chunks embedded and upserted.",
+    "rag_ingest_pages_total": "PDF pages extracted.",
+}
+
+Labels = tuple[tuple[str, str], ...]
+
+
+def _labels(labels: Mapping[str, Any] | None) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in (labels or {}).items()))
+
+
+@dataclass
+class _Histogram:
+    buckets: tuple[float, ...]
+    counts: list[int] = field(default_factory=list)
+    total: float = 0.0
+    count: int = 0
+
+    def __post_init__(self) -> None:
+        self.counts = [0] * len(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.total += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+class MetricsRegistry:
+    """In-process counters and histograms, rendered in Prometheus text format."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counters: dict[str, dict[Labels, float]] = {}
+        self._histograms: dict[str, dict[Labels, _Histogram]] = {}
+
+    def increment(
+        self, name: str, value: float = 1.0, *, labels: Mapping[str, Any] | None = None
+    ) -> None:
+        key = _labels(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def observe(
+        self,
+        name: str,
+        value: float,
+        *,
+        labels: Mapping[str, Any] | None = None,
+        buckets: tuple[float, ...] = DURATION_BUCKETS,
+    ) -> None:
+        key = _labels(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = _Histogram(buckets=buckets)
+            histogram.observe(value)
+
+    def snapshot(self) -> dict[str, Any]:
+        """Counters and histogram count/sum, keyed by `name{labels}`."""
+        with self._lock:
+            out: dict[str, Any] = {}
+            for name, series in self._counters.items():
+                for key, value in series.items():
+                    out[name + _format_labels(key)] = value
+            for name, series in self._histograms.items():
+                for key, histogram in series.items():
+                    out[name + _format_labels(key)] = {
+                        "count": histogram.count,
+                        "sum": histogram.total,
+                    }
+            return out
+
+    def render_prometheus(self) -> str:
+        lines: list[str] = []
+        with self._lock:
+            for name in sorted(self._counters):
+                lines.append(f"# HELP {name} {_HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} counter")
+                for key, value in sorted(self._counters[name].items()):
+                    lines.append(f"{name}{_format_labels(key)} {value:g}")
+            for name in sorted(self._histograms):
+                lines.append(f"# HELP {name} {_HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} histogram")
+                for key, histogram in sorted(self._histograms[name].items()):
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        le = key + (("le", f"{bound:g}"),)
+                        lines.append(f"{name}_bucket{_format_labels(le)} {count}")
+                    inf = key + (("le", "+Inf"),)
+                    lines.append(
+                        f"{name}_bucket{_format_labels(inf)} {histogram.count}"
+                    )
+                    lines.append(f"{name}_sum{_format_labels(key)} {histogram.total:g}")
+                    lines.append(f"{name}_count{_format_labels(key)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        (k, v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in labels
+    )
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+
+METRICS = MetricsRegistry()
+
+
+# ----------------------------------------------------------------------
+# Tracing
+# ----------------------------------------------------------------------
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: str | None
+    start_ns: int
+    end_ns: int = 0
+    attributes: dict[str, Any] = field(default_factory=dict)
+    error: str | None = None
+
+    @property
+    def duration_s(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e9
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+
+_CURRENT_SPAN: contextvars.ContextVar[Span | None] = contextvars.ContextVar(
+    "rag_current_span", default=None
+)
+
+
+def _otlp_value(value: Any) -> dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_span(span: Span) -> dict[str, Any]:
+    out: dict[str, Any] = {
+        "traceId": span.trace_id,
+        "spanId": span.span_id,
+        "name": span.name,
+        "kind": 1,  # SPAN_KIND_INTERNAL
+        "startTimeUnixNano": str(span.start_ns),
+        "endTimeUnixNano": str(span.end_ns),
+        "attributes": [
+            {"key": k, "value": _otlp_value(v)} for k, v in span.attributes.items()
+        ],
+        "status": ({"code": 2, "message": span.error} if span.error else {"code": 1}),
+    }
+    if span.parent_id:
+        out["parentSpanId"] = span.parent_id
+    return out
+
+
+class TraceFileExporter:
+    """Appends finished traces to a file as OTLP/JSON, one request per line.
+
+    The layout matches the OpenTelemetry Collector `file` exporter, so the file
+    can be replayed into any OTLP backend (e.g. with the collector's `otlpjsonfile`
+    receiver). Spans are buffered per trace and written when the root ends.
+
+    A span that ends after its root (a cancelled prefetch, a background
+    summary) is written on its own line right away, and a trace whose root has
+    not ended `max_pending_s` after its first span is written as it is, so
+    the buffer stays bounded in a long-running server.
+    """
+
+    # Recently written traces remembered to recognize late spans.
+    _WRITTEN_TRACES = 4096
+
+    def __init__(
+        self,
+        path: str | Path,
+        *,
+        service_name: str = "learning-rag",
+        max_pending_s: float = 300.0,
+    ):
+        self.path = Path(path)
+        self.service_name = service_name
+        self.max_pending_s = max_pending_s
+        self._lock = threading.Lock()
+        # trace ID -> (monotonic time of its first span, spans so far)
+        self._pending: dict[str, tuple[float, list[Span]]] = {}
+        self._written: OrderedDict[str, None] = OrderedDict()
+
+    def on_end(self, span: Span) -> None:
+        now = time.monotonic()
+        ready: list[list[Span]] = []
+        with self._lock:
+            if span.trace_id in self._written:
+                ready.append([span])
+            else:
+                _, spans = self._pending.setdefault(span.trace_id, (now, []))
+                spans.append(span)
+                if span.parent_id is None:
+                    ready.append(self._take(span.trace_id))
+            # Oldest first (insertion order).
+            for trace_id, (first_seen, _) in list(self._pending.items()):
+                if now - first_seen <= self.max_pending_s:
+                    break
+                ready.append(self._take(trace_id))
+        for spans in ready:
+            self._write(spans)
+
+    def _take(self, trace_id: str) -> list[Span]:
+        _, spans = self._pending.pop(trace_id)
+        self._written[trace_id] = None
+        if len(self._written) > self._WRITTEN_TRACES:
+            self._written.popitem(last=False)
+        return spans
+
+    def _write(self, spans: list[Span]) -> None:
+        request = {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [
+                            {
+                                "key": "service.name",
+                                "value": {"stringValue": self.service_name},
+                            }
+                        ]
+                    },
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": __name__},
+                            "spans": [_otlp_span(s) for s in spans],
+                        }
+                    ],
+                }
+            ]
+        }
+        line = json.dumps(request, separators=(",", ":"))
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+_exporter: TraceFileExporter | None = None
+
+
+def configure_trace_file(path: str | Path | None) -> None:
+    """Export spans to `path` as OTLP/JSON lines (`None` disables export)."""
+    global _exporter
+    _exporter = TraceFileExporter(path) if path else None
+    if path:
+        log.info("Writing traces to %s", path)
+
+
+def current_span() -> Span | None:
+    return _CURRENT_SPAN.get()
+
+
+def _finish(span: Span) -> None:
+    METRICS.observe(STAGE_DURATION, span.duration_s, labels={"stage": span.name})
+    log.debug("span %s %.1f ms %s", span.name, span.duration_s * 1000, span.attributes)
+    if _exporter is not None:
+        _exporter.on_end(span)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span]:
+    """Time a stage: records `rag_stage_duration_seconds{stage=name}` and a span.
+
+    Spans nest through a context variable, so a stage started while another is
+    active (in the same thread or asyncio task) becomes its child.
+    """
+    parent = _CURRENT_SPAN.get()
+    current = Span(
+        name=name,
+        trace_id=parent.trace_id if parent else secrets.token_hex(16),
+        span_id=secrets.token_hex(8),
+        parent_id=parent.span_id if parent else None,
+        start_ns=time.time_ns(),
+        attributes=dict(attributes),
+    )
+    token = _CURRENT_SPAN.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _CURRENT_SPAN.reset(token)
+        current.end_ns = time.time_ns()
+        _finish(current)
+
+
+def record_span(
+    name: str, *, start_ns: int, end_ns: int, error: str | None = None, **attributes
+) -> None:
+    """Record a stage measured outside a `span` block (e.g. from callbacks)."""
+    parent = _CURRENT_SPAN.get()
+    _finish(
+        Span(
+            name=name,
+            trace_id=parent.trace_id if parent else secrets.token_hex(16),
+            span_id=secrets.token_hex(8),
+            parent_id=parent.span_id if parent else None,
+            start_ns=start_ns,
+            end_ns=end_ns,
+            attributes=dict(attributes),
+            error=error,
+        )
+    )
+
+
+class StreamTimer:
+    """Time to first token and output token rate of one streamed model response."""
+
+    def __init__(self, *, mode: str) -> None:
+        self.mode = mode
+        self.started = time.perf_counter()
+        self.first_token: float | None = None
+        self.deltas = 0
+        self.input_tokens: int | None = None
+        self.output_tokens: int | None = None
+
+    def on_delta(self) -> None:
+        if self.first_token is None:
+            self.first_token = time.perf_counter()
+        self.deltas += 1
+
+    def on_chunk(self, chunk: Any) -> None:
+        """Pick up token usage if the backend reports it (e.g. `stream_usage`)."""
+        usage = getattr(chunk, "usage_metadata", None)
+        if usage:
+            self.input_tokens = (self.input_tokens or 0) + usage.get("input_tokens", 0)
+            self.output_tokens = (self.output_tokens or 0) + usage.get(
+                "output_tokens", 0
+            )
+
+    def finish(self, target: Span | None = None) -> None:
+        finished = time.perf_counter()
+        labels = {"mode": self.mode}
+        # Without reported usage, each streamed delta counts as one token.
+        tokens = self.output_tokens if self.output_tokens else self.deltas
+        METRICS.increment("rag_llm_output_tokens_total", tokens, labels=labels)
+        if self.input_tokens:
+            METRICS.increment(
+                "rag_llm_input_tokens_total", self.input_tokens, labels=labels
+            )
+
+        attributes: dict[str, Any] = {"llm.output_tokens": tokens}
+        if self.input_tokens:
+            attributes["llm.input_tokens"] = self.input_tokens
+        if self.first_token is not None:
+            ttft = self.first_token - self.started
+            METRICS.observe("rag_llm_time_to_first_token_seconds", ttft, labels=labels)
+            attributes["llm.ttft_ms"] = round(ttft * 1000, 2)
+            streaming_s = finished - self.first_token
+            if tokens > 1 and streaming_s > 0:
+                rate = (tokens - 1) / streaming_s
+                METRICS.observe(
+                    "rag_llm_tokens_per_second",
+                    rate,
+                    labels=labels,
+                    buckets=RATE_BUCKETS,
+                )
+                attributes["llm.tokens_per_s"] = round(rate, 1)
+        if target is not None:
+            target.set(**attributes)
+
+
+# ----------------------------------------------------------------------
+# Standalone Prometheus endpoint (the HTTP server mounts `/metrics` itself)
+# ----------------------------------------------------------------------
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = METRICS.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        log.debug("metrics endpoint: " + format, *args)
+
+
+def start_metrics_server(*, host: str = "127.0.0.1", port: int) -> ThreadingHTTPServer:
+    """Serve `GET /metrics` from a daemon thread."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(
+        target=server.serve_forever, name="metrics-http", daemon=True
+    ).start()
+    log.info("Serving Prometheus metrics on http://%s:%d/metrics", host, port)
+    return server
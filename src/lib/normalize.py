@@ -0,0 +1,13 @@
+import re
+import unicodedata
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_query(text: str) -> str:
+    """Normalize a query so trivially different spellings share a cache entry.
+
+    Applies Unicode NFKC, case folding and whitespace collapsing.
+    """
+    text = unicodedata.normalize("NFKC", text).casefold()
+    return _WHITESPACE_RE.sub(" ", text).strip()
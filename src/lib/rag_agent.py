@@ -1,13 +1,24 @@
+import asyncio
+import contextvars
 import logging
 import sys
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Any
 
 from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage, ToolMessage
+from langchain_core.tools import StructuredTool
 from langchain_core.vectorstores import VectorStore
 from langchain.agents import create_agent
 from langchain.tools import tool
 
 from lib.callbacks import ToolCallLoggingCallbackHandler
+from lib.context_builder import ContextBuilder
+from lib.metrics import METRICS, StreamTimer, span
+from lib.normalize import normalize_query
+from lib.rag_two_step import ScoredDocument, TokenSink
+from lib.search_filter import SearchFilter, normalize_source
+from lib.sparse_embeddings import sparse_tokens
 from lib.vector_db import VectorDB
 
 log = logging.getLogger(__name__)
@@ -16,9 +27,61 @@ log = logging.getLogger(__name__)
 # Here we let the model decide when to call the retrieval tool
 AGENTIC_RAG_SYSTEM_PROMPT = (
     "You have access to a tool that retrieves context from a knowledge base. "
-    "Use the tool to help answer user queries. Indicate in the response on the sources"
+    "Use the tool to help answer user queries. If you need several searches, "
+    "request them together in one step. Indicate in the response on the sources"
 )
 
+# Jaccard overlap of search terms above which a `retrieve_context` query is
+# served from the turn's prefetched search for the raw prompt.
+PREFETCH_MATCH = 0.6
+
+_PREFETCH_RESULTS = "rag_agent_prefetch_total"
+
+# Shared by every session (threads start on first use), so sessions own no
+# threads and need no closing.
+_PREFETCH_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="agent-prefetch")
+
+
+class _Prefetch:
+    """Search for the raw prompt, started alongside the turn's first model call."""
+
+    def __init__(self, query: str, future: "Future[Any] | asyncio.Task[Any]") -> None:
+        self.query = query
+        self.terms = set(sparse_tokens(query))
+        self.future = future
+        self.used = False
+        # Mark a failure of an unused search as seen (no "never retrieved" noise).
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+
+    def matches(self, query: str) -> bool:
+        terms = set(sparse_tokens(query))
+        if not terms or not self.terms:
+            return normalize_query(query) == normalize_query(self.query)
+        return len(terms & self.terms) / len(terms | self.terms) >= PREFETCH_MATCH
+
+    def finish(self) -> None:
+        if not self.used:
+            METRICS.increment(_PREFETCH_RESULTS, labels={"result": "unused"})
+            self.future.cancel()
+
+
+# The current turn's prefetch; tools run in copies of the turn's context.
+_CURRENT_PREFETCH: contextvars.ContextVar[_Prefetch | None] = contextvars.ContextVar(
+    "agent_prefetch", default=None
+)
+
+
+def _matching_prefetch(query: str) -> _Prefetch | None:
+    prefetch = _CURRENT_PREFETCH.get()
+    if prefetch is None:
+        return None
+    hit = prefetch.matches(query)
+    METRICS.increment(_PREFETCH_RESULTS, labels={"result": "hit" if hit else "miss"})
+    if not hit:
+        return None
+    prefetch.used = True
+    return prefetch
+
 
 def _get_message_text(message: Any) -> str:
     text = getattr(message, "text", None)
@@ -28,16 +91,73 @@ def _get_message_text(message: Any) -> str:
     return content if isinstance(content, str) else str(content)
 
 
+def _event_message(event: Any) -> Any | None:
+    # stream_mode="messages" typically yields (message, metadata)
+    if isinstance(event, tuple) and event:
+        return event[0]
+    # stream_mode="values" yields a state dict with a messages list
+    if isinstance(event, dict) and "messages" in event and event["messages"]:
+        return event["messages"][-1]
+    return None
+
+
+def _message_delta(message: Any, printed_full: str) -> tuple[str, str]:
+    """Return `(delta, printed_full)` for an AI message; empty delta otherwise."""
+    if isinstance(message, AIMessageChunk):
+        text = _get_message_text(message)
+        return text, printed_full + text
+
+    if isinstance(message, AIMessage):
+        text = _get_message_text(message)
+        if not text:
+            return "", printed_full
+        # Some backends yield cumulative text.
+        if text.startswith(printed_full):
+            return text[len(printed_full) :], text
+        return text, printed_full + text
+
+    return "", printed_full
+
+
+def _tool_sources(message: Any) -> list[ScoredDocument]:
+    # Tool activity is logged via callbacks; skip printing, but keep the
+    # scored documents `retrieve_context` returned as its artifact.
+    if (
+        isinstance(message, ToolMessage)
+        and message.name == "retrieve_context"
+        and message.artifact
+    ):
+        return list(message.artifact)
+    return []
+
+
+def _log_first_event(started: float) -> None:
+    log.info(
+        "Agent turn startup: first stream event after %.1f ms",
+        (time.perf_counter() - started) * 1000,
+    )
+
+
 def _stream_agent_messages(
-    *, agent: Any, messages: list[Any], callbacks: list[Any] | None
-) -> str:
-    wrote_any = False
+    *,
+    agent: Any,
+    messages: list[Any],
+    callbacks: list[Any] | None,
+    max_concurrency: int | None = None,
+) -> tuple[str, list[ScoredDocument]]:
     printed_full = ""
+    sources: list[ScoredDocument] = []
+    started = time.perf_counter()
+    first_event = True
+    timer = StreamTimer(mode="agent")
 
     def _iter_stream_events():
         """Prefer token/message streaming; fall back to state-value streaming."""
 
-        callback_config = {"callbacks": callbacks or []}
+        callback_config = {
+            "callbacks": callbacks or [],
+            "max_concurrency": max_concurrency,
+        }
 
         # Attempt passing callbacks via config (Runnable-style)
         for mode in ("messages", "values"):
@@ -51,52 +171,367 @@ def _stream_agent_messages(
         # Last-ditch fallback (should not usually happen)
         yield from agent.stream({"messages": messages}, stream_mode="values")
 
-    for event in _iter_stream_events():
-        # stream_mode="messages" typically yields (message, metadata)
-        if isinstance(event, tuple) and event:
-            message = event[0]
-        # stream_mode="values" yields a state dict with a messages list
-        elif isinstance(event, dict) and "messages" in event and event["messages"]:
-            message = event["messages"][-1]
-        else:
-            continue
-
-        if isinstance(message, ToolMessage):
-            # Tool activity is logged via callbacks; skip printing.
-            continue
-
-        if isinstance(message, AIMessageChunk):
-            text = _get_message_text(message)
-            if not text:
+    with span("llm_stream") as current:
+        for event in _iter_stream_events():
+            if first_event:
+                first_event = False
+                _log_first_event(started)
+
+            message = _event_message(event)
+            if message is None:
                 continue
-            wrote_any = True
-            sys.stdout.write(text)
-            sys.stdout.flush()
-            printed_full += text
-            continue
-
-        if isinstance(message, AIMessage):
-            text = _get_message_text(message)
-            if not text:
+            if isinstance(message, ToolMessage):
+                sources.extend(_tool_sources(message))
                 continue
-            wrote_any = True
-
-            # Some backends yield cumulative text.
-            if text.startswith(printed_full):
-                delta = text[len(printed_full) :]
-                printed_full = text
-            else:
-                delta = text
-                printed_full += text
 
+            timer.on_chunk(message)
+            delta, printed_full = _message_delta(message, printed_full)
             if delta:
+                timer.on_delta()
                 sys.stdout.write(delta)
                 sys.stdout.flush()
+        timer.finish(current)
 
-    if wrote_any and not printed_full.endswith("\n"):
+    if printed_full and not printed_full.endswith("\n"):
         print()
 
-    return printed_full
+    return printed_full, sources
+
+
+async def _astream_agent_messages(
+    *,
+    agent: Any,
+    messages: list[Any],
+    callbacks: list[Any] | None,
+    sink: TokenSink,
+    max_concurrency: int | None = None,
+) -> tuple[str, list[ScoredDocument]]:
+    printed_full = ""
+    sources: list[ScoredDocument] = []
+    started = time.perf_counter()
+    first_event = True
+    timer = StreamTimer(mode="agent")
+
+    with span("llm_stream") as current:
+        async for event in agent.astream(
+            {"messages": messages},
+            stream_mode="messages",
+            config={"callbacks": callbacks or [], "max_concurrency": max_concurrency},
+        ):
+            if first_event:
+                first_event = False
+                _log_first_event(started)
+
+            message = _event_message(event)
+            if message is None:
+                continue
+            if isinstance(message, ToolMessage):
+                sources.extend(_tool_sources(message))
+                continue
+
+            timer.on_chunk(message)
+            delta, printed_full = _message_delta(message, printed_full)
+            if delta:
+                timer.on_delta()
+                await sink(delta)
+        timer.finish(current)
+
+    return printed_full, sources
+
+
+def _tool_filter(
+    source: str | None, page_min: int | None, page_max: int | None
+) -> SearchFilter:
+    return SearchFilter(
+        sources=(normalize_source(source),) if source else (),
+        page_min=page_min,
+        page_max=page_max,
+    )
+
+
+def _filter_kwargs(search_filter: SearchFilter | None) -> dict[str, Any]:
+    return {"filter": search_filter.to_qdrant()} if search_filter else {}
+
+
+class RagAgentSession:
+    """Agent graph + tools built once and reused across turns.
+
+    Building the tools and compiling the agent graph with `create_agent` is
+    per-process work; a session does it once for a given `(llm, vector_store, k)`
+    so that each turn only pays for streaming.
+
+    With a `vector_db`, `astream` retrieves through its async Qdrant client;
+    otherwise async retrieval runs the sync search in a worker thread.
+
+    `retrieve_context` results go through `context_builder` (merge, dedup and
+    token budget per tool call) before they are returned to the model. The
+    tool takes optional `source` / `page_min` / `page_max` arguments that
+    narrow the search (on top of the vector DB's own `search_filter`).
+
+    With `prefetch`, each turn starts a search for the raw prompt in parallel
+    with the first model call; a `retrieve_context` call whose query shares
+    enough search terms with the prompt (`PREFETCH_MATCH`) is served from it,
+    taking embedding + search off the path to the first answer token. Tool
+    calls the model emits together run concurrently (up to
+    `tool_concurrency`).
+    """
+
+    def __init__(
+        self,
+        *,
+        llm: Any,
+        vector_store: VectorStore,
+        k: int,
+        vector_db: VectorDB | None = None,
+        context_builder: ContextBuilder | None = None,
+        prefetch: bool = True,
+        tool_concurrency: int = 4,
+    ) -> None:
+        self.llm = llm
+        self.vector_store = vector_store
+        self.k = k
+        self.vector_db = vector_db
+        self.context_builder = context_builder or ContextBuilder()
+        self.prefetch = prefetch
+        self.tool_concurrency = tool_concurrency
+
+        started = time.perf_counter()
+        self.agent = create_agent(
+            llm,
+            tools=self._build_tools(),
+            system_prompt=AGENTIC_RAG_SYSTEM_PROMPT,
+        )
+        self.build_ms = (time.perf_counter() - started) * 1000
+        log.info("Agent session built in %.1f ms (k=%d)", self.build_ms, k)
+
+    def warm_up(self) -> None:
+        """Open connections before the first question.
+
+        Pings the Qdrant collection and embeds a fixed probe query, which opens
+        the HTTP connection to the embeddings backend (and is served from the
+        query embedding cache on later runs).
+        """
+        started = time.perf_counter()
+        client = getattr(self.vector_store, "client", None)
+        collection_name = getattr(self.vector_store, "collection_name", None)
+        if client is not None and collection_name is not None:
+            client.get_collection(collection_name=collection_name)
+        embeddings = getattr(self.vector_store, "embeddings", None)
+        if embeddings is not None:
+            embeddings.embed_query("agent-session-warm-up")
+        log.info(
+            "Agent session warmed up in %.1f ms", (time.perf_counter() - started) * 1000
+        )
+
+    def stream(
+        self,
+        *,
+        prompt: str,
+        history: list[Any] | None = None,
+        show_header: bool = True,
+    ) -> tuple[str, list[ScoredDocument]]:
+        messages: list[Any] = []
+        if history:
+            messages.extend(history)
+        messages.append(HumanMessage(content=prompt))
+
+        if show_header:
+            print("Answer:")
+
+        with span("rag.query", mode="agent"):
+            prefetch = self._start_prefetch(prompt)
+            token = _CURRENT_PREFETCH.set(prefetch)
+            try:
+                return _stream_agent_messages(
+                    agent=self.agent,
+                    messages=messages,
+                    callbacks=[ToolCallLoggingCallbackHandler()],
+                    max_concurrency=self.tool_concurrency,
+                )
+            finally:
+                _CURRENT_PREFETCH.reset(token)
+                if prefetch is not None:
+                    prefetch.finish()
+
+    async def astream(
+        self,
+        *,
+        prompt: str,
+        sink: TokenSink,
+        history: list[Any] | None = None,
+    ) -> tuple[str, list[ScoredDocument]]:
+        messages: list[Any] = []
+        if history:
+            messages.extend(history)
+        messages.append(HumanMessage(content=prompt))
+
+        with span("rag.query", mode="agent"):
+            prefetch = None
+            if self.prefetch:
+                prefetch = _Prefetch(
+                    prompt, asyncio.create_task(self._asearch(prompt, prefetch=True))
+                )
+            token = _CURRENT_PREFETCH.set(prefetch)
+            try:
+                return await _astream_agent_messages(
+                    agent=self.agent,
+                    messages=messages,
+                    callbacks=[ToolCallLoggingCallbackHandler()],
+                    sink=sink,
+                    max_concurrency=self.tool_concurrency,
+                )
+            finally:
+                _CURRENT_PREFETCH.reset(token)
+                if prefetch is not None:
+                    prefetch.finish()
+
+    def _start_prefetch(self, prompt: str) -> _Prefetch | None:
+        if not self.prefetch:
+            return None
+        future = _PREFETCH_POOL.submit(
+            contextvars.copy_context().run, self._search, prompt, prefetch=True
+        )
+        return _Prefetch(prompt, future)
+
+    def _search(
+        self,
+        query: str,
+        *,
+        prefetch: bool = False,
+        search_filter: SearchFilter | None = None,
+    ) -> list[ScoredDocument]:
+        kwargs = _filter_kwargs(search_filter)
+        with span("retrieve.prefetch" if prefetch else "retrieve", k=self.k):
+            return self.vector_store.similarity_search_with_score(
+                query, k=self.k, **kwargs
+            )
+
+    async def _asearch(
+        self,
+        query: str,
+        *,
+        prefetch: bool = False,
+        search_filter: SearchFilter | None = None,
+    ) -> list[ScoredDocument]:
+        kwargs = _filter_kwargs(search_filter)
+        with span("retrieve.prefetch" if prefetch else "retrieve", k=self.k):
+            if self.vector_db is not None:
+                return await self.vector_db.asimilarity_search_with_score(
+                    query, k=self.k, **kwargs
+                )
+            return await asyncio.to_thread(
+                self.vector_store.similarity_search_with_score,
+                query,
+                k=self.k,
+                **kwargs,
+            )
+
+    def _build_tools(self) -> list[Any]:
+        vector_store = self.vector_store
+        context_builder = self.context_builder
+
+        def _serialize(results: list[ScoredDocument]) -> tuple[str, Any]:
+            context = context_builder.build(results)
+            content = "\n\n".join(
+                (
+                    f"Source: {passage.metadata}\nContent: {passage.text}"
+                    for passage in context.passages
+                )
+            )
+            return content, context.sources
+
+        def retrieve(
+            query: str,
+            source: str | None = None,
+            page_min: int | None = None,
+            page_max: int | None = None,
+        ):
+            """Retrieve information to help answer a query.
+
+            Args:
+                query: What to search for.
+                source: Only search this document (a source from list_sources).
+                page_min: Only search pages from this page number on.
+                page_max: Only search pages up to this page number.
+            """
+            search_filter = _tool_filter(source, page_min, page_max)
+            # The prefetch searched without tool arguments.
+            prefetch = None if search_filter else _matching_prefetch(query)
+            if prefetch is not None and isinstance(prefetch.future, Future):
+                try:
+                    return _serialize(prefetch.future.result())
+                except Exception:
+                    log.warning("Prefetched search failed; searching again")
+            return _serialize(self._search(query, search_filter=search_filter))
+
+        async def aretrieve(
+            query: str,
+            source: str | None = None,
+            page_min: int | None = None,
+            page_max: int | None = None,
+        ):
+            search_filter = _tool_filter(source, page_min, page_max)
+            prefetch = None if search_filter else _matching_prefetch(query)
+            if prefetch is not None:
+                try:
+                    return _serialize(await asyncio.wrap_future(prefetch.future))
+                except Exception:
+                    log.warning("Prefetched search failed; searching again")
+            return _serialize(await self._asearch(query, search_filter=search_filter))
+
+        retrieve_context = StructuredTool.from_function(
+            func=retrieve,
+            coroutine=aretrieve,
+            name="retrieve_context",
+            parse_docstring=True,
+            response_format="content_and_artifact",
+        )
+
+        @tool
+        def list_sources() -> list[str]:
+            """List unique document sources available in the RAG knowledge base."""
+
+            return VectorDB.list_sources(vector_store=vector_store)
+
+        return [retrieve_context, list_sources]
+
+
+class AgentSessions:
+    """Agent sessions for one model and vector store, one per `k`, built on use.
+
+    Held by its caller (the chat loop, the server app), so sessions and the
+    clients they reference live exactly as long as that caller.
+    """
+
+    def __init__(
+        self,
+        *,
+        llm: Any,
+        vector_store: VectorStore,
+        vector_db: VectorDB | None = None,
+        context_builder: ContextBuilder | None = None,
+        prefetch: bool = True,
+    ) -> None:
+        self.llm = llm
+        self.vector_store = vector_store
+        self.vector_db = vector_db
+        self.context_builder = context_builder
+        self.prefetch = prefetch
+        self._sessions: dict[int, RagAgentSession] = {}
+
+    def get(self, k: int) -> RagAgentSession:
+        session = self._sessions.get(k)
+        if session is None:
+            session = RagAgentSession(
+                llm=self.llm,
+                vector_store=self.vector_store,
+                k=k,
+                vector_db=self.vector_db,
+                context_builder=self.context_builder,
+                prefetch=self.prefetch,
+            )
+            self._sessions[k] = session
+        return session
 
 
 def stream_rag_agent_answer(
@@ -107,40 +542,20 @@ def stream_rag_agent_answer(
     k: int,
     history: list[Any] | None = None,
     show_header: bool = True,
-) -> str:
-    """Agentic RAG: let the model call a retrieval tool (per LangChain RAG docs)."""
-
-    @tool(response_format="content_and_artifact")
-    def retrieve_context(query: str):
-        """Retrieve information to help answer a query."""
-        retrieved_docs = vector_store.similarity_search(query, k=k)
-        serialized = "\n\n".join(
-            (
-                f"Source: {doc.metadata}\nContent: {doc.page_content}"
-                for doc in retrieved_docs
-            )
-        )
-        return serialized, retrieved_docs
-
-    @tool
-    def list_sources() -> list[str]:
-        """List unique document sources available in the RAG knowledge base."""
-
-        return VectorDB.list_sources(vector_store=vector_store)
-
-    agent = create_agent(
-        llm,
-        tools=[retrieve_context, list_sources],
-        system_prompt=AGENTIC_RAG_SYSTEM_PROMPT,
-    )
-    messages: list[Any] = []
-    if history:
-        messages.extend(history)
-    messages.append(HumanMessage(content=prompt))
-
-    if show_header:
-        print("Answer:")
+    context_builder: ContextBuilder | None = None,
+    prefetch: bool = True,
+) -> tuple[str, list[ScoredDocument]]:
+    """Agentic RAG: let the model call a retrieval tool (per LangChain RAG docs).
 
-    return _stream_agent_messages(
-        agent=agent, messages=messages, callbacks=[ToolCallLoggingCallbackHandler()]
+    Returns the assistant text and every scored document retrieved by the
+    `retrieve_context` tool during this turn. The agent is built for this one
+    answer; callers answering many hold a `RagAgentSession` instead.
+    """
+    session = RagAgentSession(
+        llm=llm,
+        vector_store=vector_store,
+        k=k,
+        context_builder=context_builder,
+        prefetch=prefetch,
     )
+    return session.stream(prompt=prompt, history=history, show_header=show_header)
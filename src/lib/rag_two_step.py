@@ -1,11 +1,18 @@
 import logging
 import sys
-from typing import Any
+from collections.abc import Awaitable, Callable
+from typing import TYPE_CHECKING, Any
 
 from langchain_core.documents import Document
 from langchain_core.messages import HumanMessage, SystemMessage
 from langchain_core.vectorstores import VectorStoreRetriever
 
+from lib.context_builder import ContextBuilder
+from lib.metrics import StreamTimer, span
+
+if TYPE_CHECKING:
+    from lib.vector_db import VectorDB
+
 log = logging.getLogger(__name__)
 
 
@@ -18,8 +25,32 @@ RAG_SYSTEM_PROMPT_TEMPLATE = (
 )
 
 
-def _format_docs(docs: list[Document]) -> str:
-    return "\n\n".join(d.page_content for d in docs)
+ScoredDocument = tuple[Document, float]
+
+# Async consumer of streamed answer text (one call per delta).
+TokenSink = Callable[[str], Awaitable[None]]
+
+# Merge + dedup only; the CLI/server pass a builder with a token budget.
+_DEFAULT_CONTEXT_BUILDER = ContextBuilder()
+
+
+def sources_payload(
+    results: list[ScoredDocument], *, content: bool = False
+) -> list[dict[str, Any]]:
+    """JSON form of scored sources (server responses, batch output)."""
+    payload = []
+    for doc, score in results:
+        meta = doc.metadata or {}
+        item = {
+            "source": meta.get("source"),
+            "page": meta.get("page"),
+            "page_end": meta.get("page_end", meta.get("page")),
+            "score": float(score),
+        }
+        if content:
+            item["content"] = doc.page_content
+        payload.append(item)
+    return payload
 
 
 def _get_message_text(message: Any) -> str:
@@ -30,41 +61,110 @@ def _get_message_text(message: Any) -> str:
     return content if isinstance(content, str) else str(content)
 
 
-def build_system_prompt(*, retriever: VectorStoreRetriever, query: str) -> str:
-    """Build the system prompt by retrieving context right before model invocation."""
-    log.info("Retrieving context for query: `%s`", query)
-    context_docs = retriever.invoke(query)
-    docs_content = _format_docs(context_docs)
+def retrieve_with_scores(
+    *, retriever: VectorStoreRetriever, query: str
+) -> list[ScoredDocument]:
+    """Run the retriever's search once, keeping the similarity scores.
+
+    `retriever.invoke` drops scores, which forced callers to search a second time
+    just to print sources. Going through the underlying vector store with the
+    retriever's own `search_kwargs` returns the same documents plus scores.
+    """
+    return retriever.vectorstore.similarity_search_with_score(
+        query, **retriever.search_kwargs
+    )
+
+
+def _assemble_system_prompt(
+    results: list[ScoredDocument], context_builder: ContextBuilder | None
+) -> tuple[str, list[ScoredDocument]]:
+    """Format the system prompt; returns it with the chunks that made it in."""
+    builder = context_builder or _DEFAULT_CONTEXT_BUILDER
+    with span("prompt_assembly") as current:
+        context = builder.build(results)
+        docs_content = context.text
+        current.set(
+            context_chars=len(docs_content),
+            context_tokens=context.tokens,
+            merged=context.merged,
+            duplicates=context.duplicates,
+            passages=len(context.passages),
+        )
+        system_prompt = RAG_SYSTEM_PROMPT_TEMPLATE.format(context=docs_content)
     log.info(
-        "Retrieved %s documents. nr of characters: %d",
-        len(context_docs),
+        "Retrieved %s documents. context: %d passages, %d tokens, %d characters "
+        "(merged=%d, duplicates=%d, truncated=%s)",
+        len(results),
+        len(context.passages),
+        context.tokens,
         len(docs_content),
+        context.merged,
+        context.duplicates,
+        context.truncated,
     )
-    return RAG_SYSTEM_PROMPT_TEMPLATE.format(context=docs_content)
+    return system_prompt, context.sources
+
+
+def build_system_prompt(
+    *,
+    retriever: VectorStoreRetriever,
+    query: str,
+    context_builder: ContextBuilder | None = None,
+) -> tuple[str, list[ScoredDocument]]:
+    """Build the system prompt by retrieving context right before model invocation.
+
+    Returns the prompt together with the scored documents it was built from
+    (see `ContextBuilder` for merging, dedup and the token budget).
+    """
+    log.info("Retrieving context for query: `%s`", query)
+    with span("retrieve", k=retriever.search_kwargs.get("k", 4)) as current:
+        results = retrieve_with_scores(retriever=retriever, query=query)
+        current.set(results=len(results))
+    return _assemble_system_prompt(results, context_builder)
+
+
+async def abuild_system_prompt(
+    *,
+    vector_db: "VectorDB",
+    query: str,
+    k: int,
+    context_builder: ContextBuilder | None = None,
+) -> tuple[str, list[ScoredDocument]]:
+    """Async `build_system_prompt`: retrieves through the async Qdrant client."""
+    log.info("Retrieving context for query: `%s`", query)
+    with span("retrieve", k=k) as current:
+        results = await vector_db.asimilarity_search_with_score(query, k=k)
+        current.set(results=len(results))
+    return _assemble_system_prompt(results, context_builder)
 
 
 def stream_llm_messages(*, llm: Any, messages: list[Any]) -> str:
     """Stream model output to stdout; return the full assistant text."""
     wrote_any = False
     printed_full = ""
+    timer = StreamTimer(mode="two_step")
 
-    for chunk in llm.stream(messages):
-        text = _get_message_text(chunk)
-        if not text:
-            continue
-        wrote_any = True
+    with span("llm_stream") as current:
+        for chunk in llm.stream(messages):
+            timer.on_chunk(chunk)
+            text = _get_message_text(chunk)
+            if not text:
+                continue
+            wrote_any = True
 
-        # Some backends yield cumulative text; others yield deltas.
-        if text.startswith(printed_full):
-            delta = text[len(printed_full) :]
-            printed_full = text
-        else:
-            delta = text
-            printed_full += text
+            # Some backends yield cumulative text; others yield deltas.
+            if text.startswith(printed_full):
+                delta = text[len(printed_full) :]
+                printed_full = text
+            else:
+                delta = text
+                printed_full += text
 
-        if delta:
-            sys.stdout.write(delta)
-            sys.stdout.flush()
+            if delta:
+                timer.on_delta()
+                sys.stdout.write(delta)
+                sys.stdout.flush()
+        timer.finish(current)
 
     if wrote_any and not printed_full.endswith("\n"):
         print()
@@ -79,14 +179,129 @@ def stream_rag_answer(
     prompt: str,
     history: list[Any] | None = None,
     show_header: bool = True,
+    context_builder: ContextBuilder | None = None,
+    retrieval_query: str | None = None,
+) -> tuple[str, list[ScoredDocument]]:
+    """Two-step RAG: retrieve once, then stream the answer.
+
+    `retrieval_query` (default: `prompt`) is what gets searched, e.g. a
+    follow-up rewritten into a standalone question.
+
+    Returns the assistant text and the scored documents used as context.
+    """
+    with span("rag.query", mode="two_step"):
+        system_prompt, sources = build_system_prompt(
+            retriever=retriever,
+            query=retrieval_query or prompt,
+            context_builder=context_builder,
+        )
+        messages: list[Any] = [SystemMessage(content=system_prompt)]
+        if history:
+            messages.extend(history)
+        messages.append(HumanMessage(content=prompt))
+
+        if show_header:
+            print("Answer:")
+
+        return stream_llm_messages(llm=llm, messages=messages), sources
+
+
+async def astream_llm_messages(
+    *, llm: Any, messages: list[Any], sink: TokenSink
+) -> str:
+    """Stream model output to `sink`; return the full assistant text."""
+    printed_full = ""
+    timer = StreamTimer(mode="two_step")
+
+    with span("llm_stream") as current:
+        async for chunk in llm.astream(messages):
+            timer.on_chunk(chunk)
+            text = _get_message_text(chunk)
+            if not text:
+                continue
+
+            # Some backends yield cumulative text; others yield deltas.
+            if text.startswith(printed_full):
+                delta = text[len(printed_full) :]
+                printed_full = text
+            else:
+                delta = text
+                printed_full += text
+
+            if delta:
+                timer.on_delta()
+                await sink(delta)
+        timer.finish(current)
+
+    return printed_full
+
+
+async def astream_rag_answer(
+    *,
+    llm: Any,
+    vector_db: "VectorDB",
+    prompt: str,
+    k: int,
+    sink: TokenSink,
+    history: list[Any] | None = None,
+    context_builder: ContextBuilder | None = None,
+    retrieval_query: str | None = None,
+) -> tuple[str, list[ScoredDocument]]:
+    """Async two-step RAG: tokens go to `sink` instead of stdout.
+
+    Returns the assistant text and the scored documents used as context.
+    """
+    with span("rag.query", mode="two_step"):
+        system_prompt, sources = await abuild_system_prompt(
+            vector_db=vector_db,
+            query=retrieval_query or prompt,
+            k=k,
+            context_builder=context_builder,
+        )
+        text = await _astream_with_system_prompt(
+            llm=llm,
+            system_prompt=system_prompt,
+            prompt=prompt,
+            history=history,
+            sink=sink,
+        )
+        return text, sources
+
+
+async def astream_answer_from_results(
+    *,
+    llm: Any,
+    prompt: str,
+    results: list[ScoredDocument],
+    sink: TokenSink,
+    history: list[Any] | None = None,
+    context_builder: ContextBuilder | None = None,
+) -> tuple[str, list[ScoredDocument]]:
+    """Generation step of two-step RAG for already retrieved `results`.
+
+    Used when retrieval happened elsewhere, e.g. batched for many questions.
+    """
+    system_prompt, sources = _assemble_system_prompt(results, context_builder)
+    text = await _astream_with_system_prompt(
+        llm=llm,
+        system_prompt=system_prompt,
+        prompt=prompt,
+        history=history,
+        sink=sink,
+    )
+    return text, sources
+
+
+async def _astream_with_system_prompt(
+    *,
+    llm: Any,
+    system_prompt: str,
+    prompt: str,
+    history: list[Any] | None,
+    sink: TokenSink,
 ) -> str:
-    system_prompt = build_system_prompt(retriever=retriever, query=prompt)
     messages: list[Any] = [SystemMessage(content=system_prompt)]
     if history:
         messages.extend(history)
     messages.append(HumanMessage(content=prompt))
-
-    if show_header:
-        print("Answer:")
-
-    return stream_llm_messages(llm=llm, messages=messages)
+    return await astream_llm_messages(llm=llm, messages=messages, sink=sink)
@@ -0,0 +1,181 @@
+import hashlib
+import importlib.util
+import logging
+import math
+import os
+import threading
+from collections import OrderedDict
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Protocol
+
+from .metrics import METRICS, span
+from .normalize import normalize_query
+
+if TYPE_CHECKING:
+    from lib.rag_two_step import ScoredDocument
+
+log = logging.getLogger(__name__)
+
+DEFAULT_RERANK_MODEL = "Xenova/ms-marco-MiniLM-L-6-v2"
+
+_CACHE_REQUESTS = "rag_rerank_cache_requests_total"
+_MISSING_DEPENDENCY = (
+    "Reranking needs the optional 'rerank' dependencies (uv sync --extra rerank)"
+)
+
+
+class CrossEncoderModel(Protocol):
+    """Scores `(query, document)` pairs; `fastembed.TextCrossEncoder` fits."""
+
+    def rerank(
+        self, query: str, documents: Iterable[str], batch_size: int = ...
+    ) -> Iterable[float]: ...
+
+
+def _load_fastembed(model_name: str, threads: int) -> CrossEncoderModel:
+    try:
+        from fastembed.rerank.cross_encoder import TextCrossEncoder
+    except ImportError as e:
+        raise RuntimeError(_MISSING_DEPENDENCY) from e
+    log.info("Loading cross-encoder %s (ONNX, threads=%d)", model_name, threads)
+    return TextCrossEncoder(model_name=model_name, threads=threads)
+
+
+def _chunk_id(doc: Any) -> str:
+    point_id = (doc.metadata or {}).get("_id")
+    if point_id is not None:
+        return str(point_id)
+    return hashlib.sha256(doc.page_content.encode("utf-8")).hexdigest()
+
+
+class CrossEncoderReranker:
+    """Second retrieval stage: re-score dense hits with a local cross-encoder.
+
+    Searches fetch `candidates` chunks (at least `k`); the cross-encoder scores
+    each `(query, chunk)` pair and only the best `k` are passed on. Scores are
+    the model's relevance logits mapped to (0, 1) with a sigmoid; the original
+    similarity is kept in `metadata["retrieval_score"]`.
+
+    Pairs are scored on the CPU in batches of `batch_size`, spread over
+    `max_workers` threads (ONNX Runtime releases the GIL). Scores are cached
+    per `(normalized query, chunk id)` in an in-process LRU, so repeated and
+    overlapping searches (agent tool calls, prefetch) only score new chunks.
+
+    `model` defaults to `DEFAULT_RERANK_MODEL` loaded with `fastembed` on
+    first use (optional dependency; `RuntimeError` if it is not installed).
+    """
+
+    def __init__(
+        self,
+        *,
+        candidates: int = 20,
+        model_name: str = DEFAULT_RERANK_MODEL,
+        model: CrossEncoderModel | None = None,
+        batch_size: int = 16,
+        max_workers: int | None = None,
+        max_cache_entries: int = 10_000,
+    ) -> None:
+        if candidates < 1:
+            raise ValueError("candidates must be >= 1")
+        if model is None and importlib.util.find_spec("fastembed") is None:
+            raise RuntimeError(_MISSING_DEPENDENCY)
+        self.candidates = candidates
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.max_cache_entries = max_cache_entries
+
+        self._model = model
+        self._model_lock = threading.Lock()
+        self._cache: OrderedDict[tuple[str, str], float] = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="rerank"
+        )
+
+    def fetch_k(self, k: int) -> int:
+        """How many candidates to retrieve for a final `k`."""
+        return max(k, self.candidates)
+
+    def rerank(
+        self, query: str, results: list["ScoredDocument"], *, k: int
+    ) -> list["ScoredDocument"]:
+        if not results:
+            return results
+        with span("rerank", candidates=len(results), k=k) as current:
+            normalized = normalize_query(query)
+            keys = [(normalized, _chunk_id(doc)) for doc, _ in results]
+            scores = self._lookup(keys)
+            missing = [i for i, score in enumerate(scores) if score is None]
+            current.set(cached=len(results) - len(missing))
+            if missing:
+                computed = self._score(query, [results[i][0] for i in missing])
+                with self._cache_lock:
+                    for i, score in zip(missing, computed):
+                        scores[i] = score
+                        self._remember(keys[i], score)
+
+        reranked = []
+        for (doc, retrieval_score), score in zip(results, scores):
+            doc.metadata = {**(doc.metadata or {}), "retrieval_score": retrieval_score}
+            reranked.append((doc, score))
+        reranked.sort(key=lambda item: item[1], reverse=True)
+        return reranked[:k]
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _load(self) -> CrossEncoderModel:
+        with self._model_lock:
+            if self._model is None:
+                threads = max(1, (os.cpu_count() or 1) // self.max_workers)
+                self._model = _load_fastembed(self.model_name, threads)
+            return self._model
+
+    def _score(self, query: str, docs: list[Any]) -> list[float]:
+        model = self._load()
+        texts = [doc.page_content for doc in docs]
+        batches = [
+            texts[start : start + self.batch_size]
+            for start in range(0, len(texts), self.batch_size)
+        ]
+        scored = self._executor.map(
+            lambda batch: list(model.rerank(query, batch, batch_size=len(batch))),
+            batches,
+        )
+        return [_sigmoid(float(logit)) for batch in scored for logit in batch]
+
+    def _lookup(self, keys: list[tuple[str, str]]) -> list[float | None]:
+        scores: list[float | None] = []
+        with self._cache_lock:
+            for key in keys:
+                score = self._cache.get(key)
+                if score is not None:
+                    self._cache.move_to_end(key)
+                scores.append(score)
+        hits = sum(score is not None for score in scores)
+        if hits:
+            METRICS.increment(_CACHE_REQUESTS, hits, labels={"result": "hit"})
+        if hits < len(keys):
+            METRICS.increment(
+                _CACHE_REQUESTS, len(keys) - hits, labels={"result": "miss"}
+            )
+        return scores
+
+    def _remember(self, key: tuple[str, str], score: float) -> None:
+        self._cache[key] = score
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_cache_entries:
+            self._cache.popitem(last=False)
+
+
+def _sigmoid(x: float) -> float:
+    if x >= 0:
+        return 1.0 / (1.0 + math.exp(-x))
+    z = math.exp(x)
+    return z / (1.0 + z)
@@ -0,0 +1,224 @@
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+# The CLI builds a SearchFilter before it knows whether Qdrant is needed.
+if TYPE_CHECKING:
+    from qdrant_client.http import models as qdrant_models
+
+SOURCE_FIELD = "metadata.source"
+PAGE_FIELD = "metadata.page"
+PAGE_END_FIELD = "metadata.page_end"
+DOCUMENT_ID_FIELD = "metadata.document_id"
+TENANT_FIELD = "metadata.tenant"
+INGESTED_AT_FIELD = "metadata.ingested_at"
+
+
+def payload_indexes() -> dict[str, Any]:
+    """Payload index schema of every field a `SearchFilter` can match on.
+
+    The tenant index is marked `is_tenant`, so Qdrant co-locates each tenant's
+    points and filtered searches in a large shared collection stay fast.
+    """
+    from qdrant_client.http import models as qdrant_models
+
+    return {
+        SOURCE_FIELD: qdrant_models.PayloadSchemaType.KEYWORD,
+        PAGE_FIELD: qdrant_models.PayloadSchemaType.INTEGER,
+        PAGE_END_FIELD: qdrant_models.PayloadSchemaType.INTEGER,
+        DOCUMENT_ID_FIELD: qdrant_models.PayloadSchemaType.KEYWORD,
+        TENANT_FIELD: qdrant_models.KeywordIndexParams(
+            type=qdrant_models.KeywordIndexType.KEYWORD, is_tenant=True
+        ),
+        INGESTED_AT_FIELD: qdrant_models.PayloadSchemaType.DATETIME,
+    }
+
+
+def normalize_source(source: str) -> str:
+    """Canonical `metadata.source` of a document path: absolute and resolved.
+
+    `./docs/a.pdf`, `docs/a.pdf` and the same file named from another working
+    directory are all one source; `display_source` shortens it for output.
+    """
+    if not source:
+        return source
+    return Path(source).resolve().as_posix()
+
+
+def display_source(source: str) -> str:
+    """`source` relative to the working directory when it is under it."""
+    if not source:
+        return source
+    try:
+        return Path(source).relative_to(Path.cwd().resolve()).as_posix()
+    except ValueError:
+        return source
+
+
+def document_filter(source: str, tenant: str | None) -> "qdrant_models.Filter":
+    """Chunks of one document: `source` within `tenant` (None: untenanted)."""
+    from qdrant_client.http import models as qdrant_models
+
+    tenant_condition: Any = (
+        qdrant_models.IsEmptyCondition(
+            is_empty=qdrant_models.PayloadField(key=TENANT_FIELD)
+        )
+        if tenant is None
+        else qdrant_models.FieldCondition(
+            key=TENANT_FIELD, match=qdrant_models.MatchValue(value=tenant)
+        )
+    )
+    return qdrant_models.Filter(
+        must=[
+            qdrant_models.FieldCondition(
+                key=SOURCE_FIELD, match=qdrant_models.MatchValue(value=source)
+            ),
+            tenant_condition,
+        ]
+    )
+
+
+def parse_page_range(value: str) -> tuple[int | None, int | None]:
+    """`"5"`, `"3-7"`, `"3-"` or `"-7"` as an inclusive `(min, max)` page range."""
+    low, sep, high = value.partition("-")
+    try:
+        page_min = int(low) if low.strip() else None
+        page_max = int(high) if high.strip() else None
+    except ValueError:
+        raise ValueError(f"Invalid page range: {value!r}") from None
+    if not sep:
+        page_max = page_min
+    if page_min is None and page_max is None:
+        raise ValueError(f"Invalid page range: {value!r}")
+    if page_min is not None and page_max is not None and page_min > page_max:
+        raise ValueError(f"Empty page range: {value!r}")
+    return page_min, page_max
+
+
+def parse_timestamp(value: str) -> datetime:
+    """ISO 8601 date or timestamp; naive values are taken as UTC."""
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid date: {value!r} (expected ISO 8601)") from None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=UTC)
+
+
+@dataclass(frozen=True)
+class SearchFilter:
+    """Restricts retrieval to matching chunks (all given conditions must hold).
+
+    - `sources`: any of these `metadata.source` values
+    - `page_min` / `page_max`: inclusive page range; a chunk matches if its
+      pages (`metadata.page` to `metadata.page_end`) overlap it
+    - `document_ids`: any of these `metadata.document_id` values
+    - `tenant`: `metadata.tenant` as recorded by `--store --tenant`
+    - `ingested_after` / `ingested_before`: `metadata.ingested_at` range
+
+    Every field is covered by a payload index (`payload_indexes`), so Qdrant
+    applies the filter inside the HNSW search instead of over-fetching.
+    """
+
+    sources: tuple[str, ...] = ()
+    page_min: int | None = None
+    page_max: int | None = None
+    document_ids: tuple[str, ...] = ()
+    tenant: str | None = None
+    ingested_after: datetime | None = None
+    ingested_before: datetime | None = None
+
+    def __bool__(self) -> bool:
+        return bool(self.describe())
+
+    def describe(self) -> str:
+        """Stable, human-readable form (logs and answer cache scopes)."""
+        parts = []
+        if self.sources:
+            parts.append(f"source={','.join(sorted(self.sources))}")
+        if self.page_min is not None or self.page_max is not None:
+            low = "" if self.page_min is None else self.page_min
+            high = "" if self.page_max is None else self.page_max
+            parts.append(f"pages={low}-{high}")
+        if self.document_ids:
+            parts.append(f"document_id={','.join(sorted(self.document_ids))}")
+        if self.tenant is not None:
+            parts.append(f"tenant={self.tenant}")
+        if self.ingested_after is not None:
+            parts.append(f"ingested_after={self.ingested_after.isoformat()}")
+        if self.ingested_before is not None:
+            parts.append(f"ingested_before={self.ingested_before.isoformat()}")
+        return " ".join(parts)
+
+    def to_qdrant(self) -> "qdrant_models.Filter | None":
+        from qdrant_client.http import models as qdrant_models
+
+        must: list[Any] = []
+        if self.sources:
+            must.append(_match_any(SOURCE_FIELD, self.sources))
+        if self.page_max is not None:
+            must.append(
+                qdrant_models.FieldCondition(
+                    key=PAGE_FIELD, range=qdrant_models.Range(lte=self.page_max)
+                )
+            )
+        if self.page_min is not None:
+            # Chunks split page by page have no `page_end`; `page` >= min
+            # implies `page_end` >= min for the others.
+            must.append(
+                qdrant_models.Filter(
+                    should=[
+                        qdrant_models.FieldCondition(
+                            key=PAGE_END_FIELD,
+                            range=qdrant_models.Range(gte=self.page_min),
+                        ),
+                        qdrant_models.FieldCondition(
+                            key=PAGE_FIELD,
+                            range=qdrant_models.Range(gte=self.page_min),
+                        ),
+                    ]
+                )
+            )
+        if self.document_ids:
+            must.append(_match_any(DOCUMENT_ID_FIELD, self.document_ids))
+        if self.tenant is not None:
+            must.append(
+                qdrant_models.FieldCondition(
+                    key=TENANT_FIELD,
+                    match=qdrant_models.MatchValue(value=self.tenant),
+                )
+            )
+        if self.ingested_after is not None or self.ingested_before is not None:
+            must.append(
+                qdrant_models.FieldCondition(
+                    key=INGESTED_AT_FIELD,
+                    range=qdrant_models.DatetimeRange(
+                        gte=self.ingested_after, lt=self.ingested_before
+                    ),
+                )
+            )
+        return qdrant_models.Filter(must=must) if must else None
+
+
+def combine_filters(
+    *filters: "qdrant_models.Filter | None",
+) -> "qdrant_models.Filter | None":
+    """All of `filters` (`None` entries ignored)."""
+    from qdrant_client.http import models as qdrant_models
+
+    present = [f for f in filters if f is not None]
+    if len(present) <= 1:
+        return present[0] if present else None
+    return qdrant_models.Filter(must=present)
+
+
+def _match_any(key: str, values: tuple[str, ...]) -> Any:
+    from qdrant_client.http import models as qdrant_models
+
+    if len(values) == 1:
+        return qdrant_models.FieldCondition(
+            key=key, match=qdrant_models.MatchValue(value=values[0])
+        )
+    return qdrant_models.FieldCondition(
+        key=key, match=qdrant_models.MatchAny(any=list(values))
+    )
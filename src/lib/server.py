@@ -0,0 +1,428 @@
+import asyncio
+import json
+import logging
+import os
+from collections.abc import AsyncIterator, Callable
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any
+
+import uvicorn
+from langchain_core.messages import AIMessage, HumanMessage
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import (
+    JSONResponse,
+    PlainTextResponse,
+    Response,
+    StreamingResponse,
+)
+from starlette.routing import Route
+from starlette.types import Receive, Scope, Send
+
+from lib.answer_cache import AnswerCache, aanswer_with_cache, answer_scope
+from lib.context_builder import ContextBuilder
+from lib.ingestion_parallel import expand_document_paths
+from lib.ingestion_pipeline import IngestionPipeline
+from lib.ingestion_registry import IngestionRegistry
+from lib.metrics import METRICS
+from lib.rag_agent import AgentSessions
+from lib.rag_two_step import astream_rag_answer, sources_payload
+from lib.vector_db import VectorDB
+
+log = logging.getLogger(__name__)
+
+# Upper bound on the `k` a request may ask for.
+MAX_TOP_K = 100
+
+
+class EndpointLimiter:
+    """Caps concurrent requests of one endpoint and the queue in front of it.
+
+    Up to `max_concurrency` requests run at once; up to `max_waiting` more wait
+    for a slot. Anything beyond that is rejected immediately (HTTP 429) rather
+    than growing an unbounded backlog.
+    """
+
+    def __init__(self, *, max_concurrency: int, max_waiting: int) -> None:
+        self.max_concurrency = max_concurrency
+        self.max_waiting = max_waiting
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._admitted = 0
+
+    def try_admit(self) -> bool:
+        """Admit a request (running or waiting); pair with `leave`."""
+        if self._admitted >= self.max_concurrency + self.max_waiting:
+            return False
+        self._admitted += 1
+        return True
+
+    def leave(self) -> None:
+        """Drop a request admitted by `try_admit`, whether or not it ran."""
+        self._admitted -= 1
+
+    async def acquire(self) -> None:
+        await self._semaphore.acquire()
+
+    def release(self) -> None:
+        """Give back the running slot taken by `acquire`."""
+        self._semaphore.release()
+
+
+class _ClosingStreamingResponse(StreamingResponse):
+    """`StreamingResponse` that calls `on_close` when it is done.
+
+    Runs even if the body was never iterated (client gone before streaming
+    started), unlike cleanup inside the body generator.
+    """
+
+    def __init__(self, content: Any, *, on_close: Callable[[], None], **kwargs: Any):
+        super().__init__(content, **kwargs)
+        self._on_close = on_close
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self._on_close()
+
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _history_messages(history: Any) -> list[Any]:
+    """Convert `[{"role": "user"|"assistant", "content": ...}]` to messages.
+
+    Raises `ValueError` unless `history` is a list of objects.
+    """
+    if history is None:
+        return []
+    if not isinstance(history, list) or not all(
+        isinstance(item, dict) for item in history
+    ):
+        raise ValueError("'history' must be a list of {role, content} objects")
+    messages: list[Any] = []
+    for item in history:
+        role = item.get("role")
+        content = str(item.get("content", ""))
+        if role == "user":
+            messages.append(HumanMessage(content=content))
+        elif role == "assistant":
+            messages.append(AIMessage(content=content))
+    return messages
+
+
+def _top_k(body: dict[str, Any], default: int) -> int:
+    """`k` of a request body; `ValueError` unless it is an int in 1..MAX_TOP_K."""
+    value = body.get("k")
+    if value is None:
+        return default
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError("'k' must be an integer")
+    if not 1 <= value <= MAX_TOP_K:
+        raise ValueError(f"'k' must be between 1 and {MAX_TOP_K}")
+    return value
+
+
+def _tenant(body: dict[str, Any]) -> str | None:
+    """`tenant` of a request body; `ValueError` unless absent or a non-empty string."""
+    value = body.get("tenant")
+    if value is None:
+        return None
+    if not isinstance(value, str) or not value.strip():
+        raise ValueError("'tenant' must be a non-empty string")
+    return value
+
+
+def _ingest_paths(
+    patterns: Any, *, root: Path, suffixes: tuple[str, ...]
+) -> list[Path]:
+    """Expand `/ingest` paths relative to `root`.
+
+    Raises `ValueError` for a path or glob that leaves `root`, directly, via
+    `..` or through a symlink.
+    """
+    if isinstance(patterns, str):
+        patterns = [patterns]
+    if not isinstance(patterns, list) or not all(isinstance(p, str) for p in patterns):
+        raise ValueError("'paths' must be a list of strings")
+    anchored = []
+    for pattern in patterns:
+        path = Path(os.path.normpath(root / pattern))
+        if not path.is_relative_to(root):
+            raise ValueError(f"Path outside the ingest root: {pattern}")
+        anchored.append(path)
+    paths = expand_document_paths(anchored, suffixes=suffixes)
+    for path in paths:
+        if not path.resolve().is_relative_to(root):
+            raise ValueError(f"Path outside the ingest root: {path}")
+    return paths
+
+
+async def _read_json(request: Request) -> dict[str, Any]:
+    try:
+        body = await request.json()
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return {}
+    return body if isinstance(body, dict) else {}
+
+
+def create_app(
+    *,
+    vector_db: VectorDB,
+    llm: Any,
+    k: int = 5,
+    query_concurrency: int = 32,
+    search_concurrency: int = 64,
+    ingest_concurrency: int = 1,
+    max_waiting: int = 128,
+    context_builder: ContextBuilder | None = None,
+    answer_cache: AnswerCache | None = None,
+    agent_prefetch: bool = True,
+    ingest_root: str | Path | None = None,
+) -> Starlette:
+    """HTTP API around one set of long-lived clients.
+
+    `vector_db` (sync + async Qdrant clients, embeddings) and `llm` are built
+    once by the caller and shared by every request, so requests reuse pooled
+    connections instead of paying client construction and collection checks.
+    `context_builder` (token budget, merge and dedup) is shared the same way.
+    With an `answer_cache`, `/query` requests without history may be answered
+    from it (same events; the answer arrives as a single `token` event).
+
+    Endpoints:
+    - `POST /query` `{"prompt", "k"?, "agent"?, "history"?}` -> server-sent
+      events: `token` (`{"text"}`), then `sources`, then `done` (or `error`)
+    - `POST /search` `{"query", "k"?}` -> JSON list of scored chunks
+    - `POST /ingest` `{"paths": [...]}` -> JSON ingestion stats; paths are
+      relative to `ingest_root` and may not leave it (without an
+      `ingest_root`, the endpoint is disabled)
+    - `GET /health`
+    - `GET /metrics` -> Prometheus text format (see `lib.metrics`)
+    """
+    limiters = {
+        "query": EndpointLimiter(
+            max_concurrency=query_concurrency, max_waiting=max_waiting
+        ),
+        "search": EndpointLimiter(
+            max_concurrency=search_concurrency, max_waiting=max_waiting
+        ),
+        "ingest": EndpointLimiter(
+            max_concurrency=ingest_concurrency, max_waiting=max_waiting
+        ),
+    }
+
+    # One agent session per `k`, for the lifetime of the app.
+    agent_sessions = AgentSessions(
+        llm=llm,
+        vector_store=vector_db.vector_store,
+        vector_db=vector_db,
+        context_builder=context_builder,
+        prefetch=agent_prefetch,
+    )
+
+    root = Path(ingest_root).resolve() if ingest_root is not None else None
+
+    def _busy(name: str) -> Response:
+        return JSONResponse({"error": f"{name} endpoint is busy"}, status_code=429)
+
+    def _bad_request(error: Exception) -> Response:
+        return JSONResponse({"error": str(error)}, status_code=400)
+
+    async def query(request: Request) -> Response:
+        body = await _read_json(request)
+        prompt = str(body.get("prompt") or "").strip()
+        if not prompt:
+            return JSONResponse({"error": "missing 'prompt'"}, status_code=400)
+        try:
+            top_k = _top_k(body, k)
+            history = _history_messages(body.get("history"))
+        except ValueError as e:
+            return _bad_request(e)
+        agent_mode = bool(body.get("agent"))
+
+        limiter = limiters["query"]
+        if not limiter.try_admit():
+            return _busy("query")
+
+        async def events() -> AsyncIterator[str]:
+            queue: asyncio.Queue[str | None] = asyncio.Queue()
+
+            async def sink(text: str) -> None:
+                await queue.put(_sse("token", {"text": text}))
+
+            async def produce() -> None:
+                acquired = False
+                try:
+                    await limiter.acquire()
+                    acquired = True
+                    if agent_mode:
+                        answer = lambda: agent_sessions.get(top_k).astream(
+                            prompt=prompt, sink=sink, history=history
+                        )
+                    else:
+                        answer = lambda: astream_rag_answer(
+                            llm=llm,
+                            vector_db=vector_db,
+                            prompt=prompt,
+                            k=top_k,
+                            sink=sink,
+                            history=history,
+                            context_builder=context_builder,
+                        )
+                    _, sources = await aanswer_with_cache(
+                        cache=answer_cache,
+                        query=prompt,
+                        scope=answer_scope(
+                            mode="agent" if agent_mode else "two_step",
+                            k=top_k,
+                            context_tokens=(
+                                context_builder.max_tokens if context_builder else None
+                            ),
+                        ),
+                        answer=answer,
+                        sink=sink,
+                        history=history,
+                    )
+                    await queue.put(
+                        _sse("sources", sources_payload(sources, content=True))
+                    )
+                    await queue.put(_sse("done", {}))
+                except Exception as e:
+                    log.exception("Query failed")
+                    await queue.put(_sse("error", {"error": str(e)}))
+                finally:
+                    if acquired:
+                        limiter.release()
+                    await queue.put(None)
+
+            task = asyncio.create_task(produce())
+            try:
+                while (item := await queue.get()) is not None:
+                    yield item
+            finally:
+                # Client went away: stop generating.
+                if not task.done():
+                    task.cancel()
+
+        return _ClosingStreamingResponse(
+            events(),
+            on_close=limiter.leave,
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    async def search(request: Request) -> Response:
+        body = await _read_json(request)
+        query_text = str(body.get("query") or "").strip()
+        if not query_text:
+            return JSONResponse({"error": "missing 'query'"}, status_code=400)
+        try:
+            top_k = _top_k(body, k)
+        except ValueError as e:
+            return _bad_request(e)
+
+        limiter = limiters["search"]
+        if not limiter.try_admit():
+            return _busy("search")
+        acquired = False
+        try:
+            await limiter.acquire()
+            acquired = True
+            results = await vector_db.asimilarity_search_with_score(query_text, k=top_k)
+        finally:
+            if acquired:
+                limiter.release()
+            limiter.leave()
+        return JSONResponse({"results": sources_payload(results, content=True)})
+
+    async def ingest(request: Request) -> Response:
+        if root is None:
+            return JSONResponse(
+                {"error": "ingest is disabled (no ingest root configured)"},
+                status_code=403,
+            )
+        body = await _read_json(request)
+        ingestion = IngestionRegistry()
+        try:
+            tenant = _tenant(body)
+            # Globs and directory walks touch the filesystem: off the loop.
+            paths = await asyncio.to_thread(
+                _ingest_paths,
+                body.get("paths") or [],
+                root=root,
+                suffixes=ingestion.suffixes,
+            )
+        except ValueError as e:
+            return _bad_request(e)
+        if not paths:
+            return JSONResponse(
+                {"error": "no supported documents matched"}, status_code=400
+            )
+
+        limiter = limiters["ingest"]
+        if not limiter.try_admit():
+            return _busy("ingest")
+
+        def _run() -> Any:
+            pipeline = IngestionPipeline(
+                vector_store=vector_db.vector_store,
+                catalog=vector_db.catalog,
+                tenant=tenant,
+            )
+            return pipeline.run(ingestion.iter_load_many(paths))
+
+        acquired = False
+        try:
+            await limiter.acquire()
+            acquired = True
+            stats = await asyncio.to_thread(_run)
+            if answer_cache is not None:
+                answer_cache.invalidate()
+        except (FileNotFoundError, ValueError) as e:
+            return _bad_request(e)
+        finally:
+            if acquired:
+                limiter.release()
+            limiter.leave()
+        return JSONResponse(
+            {
+                "files": len(paths),
+                "chunks": stats.chunks,
+                "unchanged": stats.skipped,
+                "deleted": stats.deleted,
+                "elapsed_s": round(stats.elapsed_s, 3),
+            }
+        )
+
+    async def health(request: Request) -> Response:
+        return JSONResponse({"status": "ok", "collection": vector_db.collection_name})
+
+    async def metrics(request: Request) -> Response:
+        return PlainTextResponse(
+            METRICS.render_prometheus(),
+            media_type="text/plain; version=0.0.4; charset=utf-8",
+        )
+
+    @asynccontextmanager
+    async def lifespan(app: Starlette) -> AsyncIterator[None]:
+        # Build the agent graph before the first request arrives.
+        agent_sessions.get(k)
+        yield
+        await vector_db.aclose()
+
+    return Starlette(
+        routes=[
+            Route("/query", query, methods=["POST"]),
+            Route("/search", search, methods=["POST"]),
+            Route("/ingest", ingest, methods=["POST"]),
+            Route("/health", health, methods=["GET"]),
+            Route("/metrics", metrics, methods=["GET"]),
+        ],
+        lifespan=lifespan,
+    )
+
+
+def serve(app: Starlette, *, host: str = "127.0.0.1", port: int = 8000) -> None:
+    uvicorn.run(app, host=host, port=port, log_level="info")
@@ -0,0 +1,237 @@
+import logging
+import uuid
+from datetime import UTC, datetime
+from typing import Any
+
+from qdrant_client import QdrantClient
+from qdrant_client.http import models as qdrant_models
+
+from .search_filter import SOURCE_FIELD, TENANT_FIELD, document_filter
+
+log = logging.getLogger(__name__)
+
+# Fixed namespace so each source maps to a single catalog point.
+SOURCE_ID_NAMESPACE = uuid.UUID("0f6b1c2e-3a49-4f7e-9d2b-6c1e8a5f4d37")
+# Catalog point holding the collection version (not a source entry).
+VERSION_POINT_ID = str(uuid.uuid5(SOURCE_ID_NAMESPACE, "__collection_version__"))
+
+
+def document_id(source: str, tenant: str | None = None) -> str:
+    """Catalog point ID and `metadata.document_id` of `source` within `tenant`."""
+    key = source if tenant is None else f"{tenant}\0{source}"
+    return str(uuid.uuid5(SOURCE_ID_NAMESPACE, key))
+
+
+class SourceCatalog:
+    """Per-source summary kept in a small Qdrant side collection.
+
+    The catalog lives next to the document collection (`<collection>__sources`)
+    and holds one vectorless point per document (source and tenant) with its
+    chunk count, page range and last ingest timestamp. It is updated by the
+    ingestion pipeline, so listing sources costs O(number of sources) instead
+    of a full scroll.
+
+    One extra point holds the collection version, a token the pipeline
+    replaces whenever an ingestion run adds or deletes chunks (used to
+    invalidate cached answers).
+    """
+
+    def __init__(self, *, client: QdrantClient, collection_name: str) -> None:
+        self.client = client
+        self.collection_name = collection_name
+        self.catalog_name = f"{collection_name}__sources"
+
+    def ensure_exists(self) -> None:
+        """Create the catalog, seeding it from documents stored before it existed."""
+        if self.client.collection_exists(collection_name=self.catalog_name):
+            return
+        self.client.create_collection(
+            collection_name=self.catalog_name, vectors_config={}
+        )
+        log.info("Created source catalog '%s'", self.catalog_name)
+        self.rebuild()
+
+    def count_chunks(self, source: str, tenant: str | None = None) -> int:
+        """Exact chunk count of `source` within `tenant`, served by the indexes."""
+        result = self.client.count(
+            collection_name=self.collection_name,
+            count_filter=document_filter(source, tenant),
+            exact=True,
+        )
+        return result.count
+
+    def record(
+        self,
+        *,
+        source: str,
+        tenant: str | None = None,
+        page_min: int | None = None,
+        page_max: int | None = None,
+    ) -> None:
+        """Refresh the catalog entry for `source` of `tenant` after it was ingested."""
+        self.ensure_exists()
+        point_id = document_id(source, tenant)
+        chunks = self.count_chunks(source, tenant)
+        if chunks == 0:
+            self.client.delete(
+                collection_name=self.catalog_name,
+                points_selector=qdrant_models.PointIdsList(points=[point_id]),
+            )
+            return
+
+        self.client.upsert(
+            collection_name=self.catalog_name,
+            points=[
+                qdrant_models.PointStruct(
+                    id=point_id,
+                    vector={},
+                    payload={
+                        "source": source,
+                        "tenant": tenant,
+                        "chunks": chunks,
+                        "page_min": page_min,
+                        "page_max": page_max,
+                        "ingested_at": datetime.now(UTC).isoformat(timespec="seconds"),
+                    },
+                )
+            ],
+        )
+
+    def entries(self) -> list[dict[str, Any]]:
+        """All catalog entries."""
+        self.ensure_exists()
+
+        entries: list[dict[str, Any]] = []
+        offset = None
+        while True:
+            points, offset = self.client.scroll(
+                collection_name=self.catalog_name,
+                limit=256,
+                offset=offset,
+                with_payload=True,
+                with_vectors=False,
+            )
+            entries.extend(
+                point.payload
+                for point in points
+                if point.payload and "source" in point.payload
+            )
+            if offset is None:
+                break
+        return entries
+
+    def version(self) -> str | None:
+        """Current collection version (None until the first recorded change)."""
+        if not self.client.collection_exists(collection_name=self.catalog_name):
+            return None
+        points = self.client.retrieve(
+            collection_name=self.catalog_name,
+            ids=[VERSION_POINT_ID],
+            with_payload=True,
+            with_vectors=False,
+        )
+        if not points or not points[0].payload:
+            return None
+        return points[0].payload.get("collection_version")
+
+    def bump_version(self) -> str:
+        """Record that the collection's documents changed; returns the new version."""
+        self.ensure_exists()
+        version = uuid.uuid4().hex
+        self.client.upsert(
+            collection_name=self.catalog_name,
+            points=[
+                qdrant_models.PointStruct(
+                    id=VERSION_POINT_ID,
+                    vector={},
+                    payload={
+                        "collection_version": version,
+                        "updated_at": datetime.now(UTC).isoformat(timespec="seconds"),
+                    },
+                )
+            ],
+        )
+        return version
+
+    def rebuild(self, *, max_sources: int = 10_000) -> list[dict[str, Any]]:
+        """Rebuild the catalog from exact facet counts on `metadata.source`.
+
+        Used to seed the catalog of collections ingested before it existed.
+        Page ranges and ingest times are unknown for such sources and left empty.
+        The facet call returns at most `max_sources` values; if it is full, or
+        the collection has tenants (facets cannot count source/tenant pairs),
+        the counts are taken from a scroll over every point instead, so no
+        document is left out.
+        """
+        tenants = self.client.facet(
+            collection_name=self.collection_name, key=TENANT_FIELD, limit=1
+        )
+        counts: dict[tuple[str, str | None], int] = {}
+        if not tenants.hits:
+            facets = self.client.facet(
+                collection_name=self.collection_name,
+                key=SOURCE_FIELD,
+                limit=max_sources,
+                exact=True,
+            )
+            counts = {(str(hit.value), None): hit.count for hit in facets.hits}
+        if len(counts) >= max_sources:
+            log.warning(
+                "More than %d sources in '%s'; counting them with a full scroll",
+                max_sources,
+                self.collection_name,
+            )
+        if tenants.hits or len(counts) >= max_sources:
+            counts = self._scroll_document_counts()
+        if not counts:
+            return []
+
+        entries = [
+            {
+                "source": source,
+                "tenant": tenant,
+                "chunks": chunks,
+                "page_min": None,
+                "page_max": None,
+                "ingested_at": None,
+            }
+            for (source, tenant), chunks in counts.items()
+        ]
+        for start in range(0, len(entries), 1024):
+            self.client.upsert(
+                collection_name=self.catalog_name,
+                points=[
+                    qdrant_models.PointStruct(
+                        id=document_id(entry["source"], entry["tenant"]),
+                        vector={},
+                        payload=entry,
+                    )
+                    for entry in entries[start : start + 1024]
+                ],
+            )
+        log.info(
+            "Rebuilt source catalog '%s' (%d sources)", self.catalog_name, len(entries)
+        )
+        return entries
+
+    def _scroll_document_counts(self) -> dict[tuple[str, str | None], int]:
+        """Chunks per (source, tenant), counted over every point of the collection."""
+        counts: dict[tuple[str, str | None], int] = {}
+        offset = None
+        while True:
+            points, offset = self.client.scroll(
+                collection_name=self.collection_name,
+                limit=1024,
+                offset=offset,
+                with_payload=[SOURCE_FIELD, TENANT_FIELD],
+                with_vectors=False,
+            )
+            for point in points:
+                metadata = (point.payload or {}).get("metadata", {})
+                if metadata.get("source") is None:
+                    continue
+                key = (str(metadata["source"]), metadata.get("tenant"))
+                counts[key] = counts.get(key, 0) + 1
+            if offset is None:
+                break
+        return counts
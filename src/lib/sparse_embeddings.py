@@ -0,0 +1,72 @@
+import hashlib
+import re
+from collections import Counter
+
+from langchain_qdrant import SparseEmbeddings, SparseVector
+
+# Words and codes; inner `-`, `_`, `.`, `/` keep part numbers, error codes and
+# versions ("PN-004-0012", "E_1042", "v2.3.1") together as one token.
+_TOKEN_RE = re.compile(r"[^\W_]+(?:[-_./][^\W_]+)*")
+_SPLIT_RE = re.compile(r"[-_./]")
+
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the "
+    "this to was were will with".split()
+)
+
+
+def sparse_tokens(text: str) -> list[str]:
+    """Lower-cased terms of `text`; compound codes also yield their parts."""
+    tokens: list[str] = []
+    for match in _TOKEN_RE.finditer(text.casefold()):
+        token = match.group()
+        if token in _STOPWORDS:
+            continue
+        tokens.append(token)
+        if _SPLIT_RE.search(token):
+            tokens.extend(part for part in _SPLIT_RE.split(token) if part)
+    return tokens
+
+
+def _term_index(token: str) -> int:
+    # Stable across processes (unlike `hash()`), fits Qdrant's u32 indices.
+    return int.from_bytes(
+        hashlib.blake2b(token.encode("utf-8"), digest_size=4).digest(), "little"
+    )
+
+
+class BM25SparseEmbeddings(SparseEmbeddings):
+    """Local BM25-style sparse vectors over hashed terms (no model download).
+
+    Documents get the BM25 term-frequency component with length normalization
+    against `avg_doc_tokens`; queries get weight 1 per distinct term. The IDF
+    part is applied by Qdrant at query time (`Modifier.IDF` on the sparse
+    vector), so it always reflects the current collection.
+    """
+
+    def __init__(
+        self, *, k1: float = 1.2, b: float = 0.75, avg_doc_tokens: float = 150.0
+    ) -> None:
+        self.k1 = k1
+        self.b = b
+        self.avg_doc_tokens = avg_doc_tokens
+
+    def _vector(self, weights: dict[int, float]) -> SparseVector:
+        indices = sorted(weights)
+        return SparseVector(indices=indices, values=[weights[i] for i in indices])
+
+    def _embed_document(self, text: str) -> SparseVector:
+        tokens = sparse_tokens(text)
+        norm = self.k1 * (1 - self.b + self.b * len(tokens) / self.avg_doc_tokens)
+        weights: dict[int, float] = {}
+        for token, tf in Counter(tokens).items():
+            index = _term_index(token)
+            # Hash collisions just add up, like a repeated term would.
+            weights[index] = weights.get(index, 0.0) + tf * (self.k1 + 1) / (tf + norm)
+        return self._vector(weights)
+
+    def embed_documents(self, texts: list[str]) -> list[SparseVector]:
+        return [self._embed_document(text) for text in texts]
+
+    def embed_query(self, text: str) -> SparseVector:
+        return self._vector({_term_index(t): 1.0 for t in set(sparse_tokens(text))})
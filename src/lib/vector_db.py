@@ -1,14 +1,71 @@
+import asyncio
 import logging
 from typing import Any
 
+from langchain_core.documents import Document
 from langchain_core.embeddings import Embeddings
-from langchain_qdrant import QdrantVectorStore
-from qdrant_client import QdrantClient
+from langchain_qdrant import QdrantVectorStore, RetrievalMode, SparseEmbeddings
+from qdrant_client import AsyncQdrantClient, QdrantClient
 from qdrant_client.http import models as qdrant_models
-from qdrant_client.http.exceptions import UnexpectedResponse
+
+from .collection_config import CollectionConfig
+from .metrics import span
+from .reranker import CrossEncoderReranker
+from .search_filter import (
+    SearchFilter,
+    combine_filters,
+    display_source,
+    payload_indexes,
+)
+from .source_catalog import SourceCatalog
+from .sparse_embeddings import BM25SparseEmbeddings
 
 log = logging.getLogger(__name__)
 
+SPARSE_VECTOR_NAME = "sparse"
+DIMENSION_PROBE = "qdrant-collection-dimension-probe"
+
+
+class TunedQdrantVectorStore(QdrantVectorStore):
+    """`QdrantVectorStore` that applies default `search_params` to searches.
+
+    Retrievers and the agent tools call `similarity_search_with_score` without
+    search params; this fills in HNSW `ef` and quantization rescoring, adds
+    `search_filter` to the caller's `filter`, and reranks over-fetched
+    candidates when a `reranker` is set.
+    """
+
+    def __init__(
+        self,
+        *args: Any,
+        search_params: qdrant_models.SearchParams | None = None,
+        search_filter: qdrant_models.Filter | None = None,
+        reranker: CrossEncoderReranker | None = None,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self.search_params = search_params
+        self.search_filter = search_filter
+        self.reranker = reranker
+
+    def similarity_search_with_score(  # type: ignore[override]
+        self,
+        query: str,
+        k: int = 4,
+        filter: qdrant_models.Filter | None = None,
+        search_params: qdrant_models.SearchParams | None = None,
+        **kwargs: Any,
+    ) -> list[tuple[Document, float]]:
+        kwargs["filter"] = combine_filters(self.search_filter, filter)
+        kwargs["search_params"] = search_params or self.search_params
+        if self.reranker is None:
+            return super().similarity_search_with_score(query, k=k, **kwargs)
+        with span("vector_search", k=self.reranker.fetch_k(k)):
+            candidates = super().similarity_search_with_score(
+                query, k=self.reranker.fetch_k(k), **kwargs
+            )
+        return self.reranker.rerank(query, candidates, k=k)
+
 
 class VectorDB:
     """Qdrant-backed vector DB wrapper.
@@ -16,6 +73,32 @@ class VectorDB:
     Holds all initialization logic (client + collection creation) and
     exposes a LangChain `QdrantVectorStore` for usage. Embeddings are provided
     by the caller.
+
+    Async callers use `asimilarity_search_with_score`, backed by an
+    `AsyncQdrantClient` for the same host (or `async_client`, if given).
+
+    With `retrieval_mode=RetrievalMode.HYBRID`, new collections also get a
+    sparse vector (`BM25SparseEmbeddings` unless `sparse_embeddings` is given,
+    IDF applied by Qdrant) and searches fuse dense and sparse hits with RRF.
+    Collections that have the sparse vector always get it on ingestion, so
+    they can be queried in either mode.
+
+    `collection_config` sets quantization, on-disk storage and HNSW parameters
+    for new collections, and search-time `ef`/rescoring for every query.
+
+    With a `reranker`, every search (vector store, async and batch) fetches
+    `reranker.candidates` chunks and returns the `k` the cross-encoder ranks
+    highest.
+
+    `search_filter` restricts every search to matching chunks (source, pages,
+    document ID, tenant, ingest date); per-call filters are added to it. The
+    fields it matches on get payload indexes when the collection is verified.
+
+    On startup the collection is created if missing and checked against the
+    embedding dimension (a cached query embedding, so no API call after the
+    first run). `verify=False` skips all of that for a collection known to
+    exist: no Qdrant round trip happens until the first search. The sparse
+    vector is then assumed to exist exactly in hybrid mode.
     """
 
     def __init__(
@@ -27,44 +110,223 @@ class VectorDB:
         port: int = 6333,
         distance: qdrant_models.Distance = qdrant_models.Distance.COSINE,
         client: QdrantClient | None = None,
+        async_client: AsyncQdrantClient | None = None,
+        pool_size: int | None = None,
+        retrieval_mode: RetrievalMode = RetrievalMode.DENSE,
+        sparse_embeddings: SparseEmbeddings | None = None,
+        collection_config: CollectionConfig | None = None,
+        reranker: CrossEncoderReranker | None = None,
+        search_filter: SearchFilter | None = None,
+        verify: bool = True,
     ) -> None:
+        if retrieval_mode not in (RetrievalMode.DENSE, RetrievalMode.HYBRID):
+            raise ValueError(f"Unsupported retrieval mode: {retrieval_mode}")
         self.collection_name = collection_name
+        self.retrieval_mode = retrieval_mode
+        self.collection_config = collection_config or CollectionConfig()
+        self.reranker = reranker
+        self.search_filter = search_filter or SearchFilter()
         self.distance = distance
+        self.host = host
+        self.port = port
+        self.pool_size = pool_size
+        self._async_client = async_client
+        # A caller-provided sync client (e.g. local/in-memory mode) cannot be
+        # mirrored by a new async client, so async searches fall back to threads.
+        self._owns_client = client is None
 
         self.client = client or self._create_client(
-            host=host,
-            port=port,
+            host=host, port=port, check_compatibility=verify
         )
         self.embeddings = embeddings
 
-        self._ensure_collection_exists()
+        if verify:
+            info = self._ensure_collection_exists()
+            self._ensure_payload_indexes(info)
+            self._check_dense_vector(info)
+            has_sparse = SPARSE_VECTOR_NAME in (info.config.params.sparse_vectors or {})
+        else:
+            has_sparse = retrieval_mode == RetrievalMode.HYBRID
+        if retrieval_mode == RetrievalMode.HYBRID and not has_sparse:
+            raise ValueError(
+                f"Collection '{collection_name}' has no sparse vectors; hybrid "
+                "retrieval needs a collection created in hybrid mode (e.g. store "
+                "into a new QDRANT_COLLECTION with --retrieval hybrid)."
+            )
+        self.sparse_embeddings = (
+            (sparse_embeddings or BM25SparseEmbeddings()) if has_sparse else None
+        )
+        self.catalog = SourceCatalog(
+            client=self.client, collection_name=self.collection_name
+        )
 
         log.info(
             "Initializing vector store collection=%s",
             self.collection_name,
         )
-        self.vector_store = QdrantVectorStore(
+        self.search_params = self.collection_config.search_params()
+        self.vector_store = TunedQdrantVectorStore(
             client=self.client,
             collection_name=self.collection_name,
             embedding=self.embeddings,
+            retrieval_mode=retrieval_mode,
+            sparse_embedding=self.sparse_embeddings,
+            sparse_vector_name=SPARSE_VECTOR_NAME,
+            search_params=self.search_params,
+            search_filter=self.search_filter.to_qdrant(),
+            reranker=reranker,
+            # Checked above without the uncached `embed_documents` probe.
+            validate_collection_config=False,
         )
 
-    def as_retriever(self, *, k: int = 5):
-        return self.vector_store.as_retriever(search_kwargs={"k": k})
+    def as_retriever(self, *, k: int = 5, search_filter: SearchFilter | None = None):
+        search_kwargs: dict[str, Any] = {"k": k}
+        if search_filter:
+            search_kwargs["filter"] = search_filter.to_qdrant()
+        return self.vector_store.as_retriever(search_kwargs=search_kwargs)
+
+    @property
+    def async_client(self) -> AsyncQdrantClient | None:
+        if self._async_client is None and self._owns_client and self.host:
+            log.info(
+                "Connecting async Qdrant client via host=%s port=%s",
+                self.host,
+                self.port,
+            )
+            self._async_client = AsyncQdrantClient(
+                host=self.host, port=self.port, pool_size=self.pool_size
+            )
+        return self._async_client
+
+    async def asimilarity_search_with_score(
+        self,
+        query: str,
+        *,
+        k: int = 5,
+        filter: qdrant_models.Filter | None = None,
+        **kwargs: Any,
+    ) -> list[tuple[Document, float]]:
+        """Async equivalent of `vector_store.similarity_search_with_score`."""
+        client = self.async_client
+        if client is None:
+            return await asyncio.to_thread(
+                self.vector_store.similarity_search_with_score,
+                query,
+                k=k,
+                filter=filter,
+                **kwargs,
+            )
+
+        final_k = k
+        if self.reranker is not None:
+            k = self.reranker.fetch_k(k)
+        query_filter = combine_filters(self.vector_store.search_filter, filter)
+        vector = await self.embeddings.aembed_query(query)
+        query_kwargs: dict[str, Any] = {
+            "query": vector,
+            "using": self.vector_store.vector_name or None,
+            "search_params": self.search_params,
+        }
+        if self.retrieval_mode == RetrievalMode.HYBRID:
+            query_kwargs = self._hybrid_query(query, vector, k=k, filter=query_filter)
+        with span("vector_search", k=k, mode=self.retrieval_mode.value):
+            response = await client.query_points(
+                collection_name=self.collection_name,
+                limit=k,
+                with_payload=True,
+                with_vectors=False,
+                query_filter=query_filter,
+                **query_kwargs,
+                **kwargs,
+            )
+        results = [
+            (self._document_from_point(point), point.score) for point in response.points
+        ]
+        if self.reranker is not None:
+            results = await asyncio.to_thread(
+                self.reranker.rerank, query, results, k=final_k
+            )
+        return results
+
+    def similarity_search_batch(
+        self,
+        queries: list[str],
+        *,
+        k: int = 5,
+        batch_size: int = 64,
+        filter: qdrant_models.Filter | None = None,
+    ) -> list[list[tuple[Document, float]]]:
+        """Search many queries: batched embeddings plus `query_batch_points`.
+
+        Returns one result list per query, in order. Each group of
+        `batch_size` queries costs one embeddings call and one Qdrant request.
+        """
+        final_k = k
+        if self.reranker is not None:
+            k = self.reranker.fetch_k(k)
+        query_filter = combine_filters(self.vector_store.search_filter, filter)
+        results: list[list[tuple[Document, float]]] = []
+        for start in range(0, len(queries), batch_size):
+            batch = queries[start : start + batch_size]
+            embed_many = getattr(self.embeddings, "embed_queries", None)
+            vectors = (
+                embed_many(batch)
+                if embed_many is not None
+                else self.embeddings.embed_documents(batch)
+            )
+            requests = []
+            for query, vector in zip(batch, vectors):
+                query_kwargs: dict[str, Any] = {
+                    "query": vector,
+                    "using": self.vector_store.vector_name or None,
+                    "params": self.search_params,
+                }
+                if self.retrieval_mode == RetrievalMode.HYBRID:
+                    query_kwargs = self._hybrid_query(
+                        query, vector, k=k, filter=query_filter
+                    )
+                requests.append(
+                    qdrant_models.QueryRequest(
+                        limit=k,
+                        with_payload=True,
+                        with_vector=False,
+                        filter=query_filter,
+                        **query_kwargs,
+                    )
+                )
+            with span("vector_search", k=k, queries=len(batch)):
+                responses = self.client.query_batch_points(
+                    collection_name=self.collection_name, requests=requests
+                )
+            results.extend(
+                [(self._document_from_point(p), p.score) for p in response.points]
+                for response in responses
+            )
+        if self.reranker is not None:
+            results = [
+                self.reranker.rerank(query, found, k=final_k)
+                for query, found in zip(queries, results)
+            ]
+        return results
+
+    async def aclose(self) -> None:
+        if self._async_client is not None:
+            await self._async_client.close()
+            self._async_client = None
 
     @staticmethod
     def list_sources(
         *,
         vector_store: QdrantVectorStore,
-        max_points: int = 5000,
-        batch_size: int = 256,
         max_sources: int = 500,
     ) -> list[str]:
-        """List unique document sources stored in the vector DB.
+        """List document sources stored in the vector DB.
 
-        Works best with `langchain_qdrant.QdrantVectorStore` (expects `client` and
+        Reads the source catalog maintained at ingestion time (seeded from exact
+        `metadata.source` facet counts when it is first created). Works with
+        `langchain_qdrant.QdrantVectorStore` (expects `client` and
         `collection_name` attrs). Returns a list of lines like:
-        `source (chunks=N)`.
+        `source (chunks=N, pages=A-B, ingested=TIMESTAMP)`.
         """
 
         client = getattr(vector_store, "client", None)
@@ -75,87 +337,182 @@ class VectorDB:
                 "Try retrieval instead (retrieve_context)."
             ]
 
-        counts: dict[str, int] = {}
-        scanned = 0
-        offset = None
-
-        while scanned < max_points and len(counts) < max_sources:
-            limit = min(batch_size, max_points - scanned)
-            points, offset = client.scroll(
-                collection_name=collection_name,
-                limit=limit,
-                offset=offset,
-                with_payload=True,
-                with_vectors=False,
-            )
-            if not points:
-                break
-
-            for point in points:
-                scanned += 1
-                payload = getattr(point, "payload", None) or {}
-
-                meta = payload.get("metadata") or payload.get("meta") or {}
-                source = meta.get("source") or payload.get("source")
-                if not source:
-                    continue
-                source_str = str(source)
-                counts[source_str] = counts.get(source_str, 0) + 1
-
-                if scanned >= max_points or len(counts) >= max_sources:
-                    break
-
-            if offset is None:
-                break
-
-        if not counts:
+        catalog = SourceCatalog(client=client, collection_name=collection_name)
+        entries = catalog.entries()
+        if not entries:
             return ["No sources found (or unable to read source metadata)."]
 
-        lines = [
-            f"{src} (chunks={cnt})"
-            for src, cnt in sorted(counts.items(), key=lambda kv: (-kv[1], kv[0]))
-        ]
-        if scanned >= max_points:
-            lines.append(f"(stopped after scanning {scanned} points)")
-        if len(counts) >= max_sources:
-            lines.append(f"(stopped after collecting {len(counts)} sources)")
+        entries.sort(key=lambda e: (-int(e.get("chunks") or 0), str(e.get("source"))))
+        lines = []
+        for entry in entries[:max_sources]:
+            details = [f"chunks={entry.get('chunks')}"]
+            if entry.get("tenant") is not None:
+                details.append(f"tenant={entry['tenant']}")
+            if entry.get("page_min") is not None:
+                details.append(f"pages={entry['page_min']}-{entry['page_max']}")
+            if entry.get("ingested_at"):
+                details.append(f"ingested={entry['ingested_at']}")
+            source = display_source(str(entry.get("source", "")))
+            lines.append(f"{source} ({', '.join(details)})")
+        if len(entries) > max_sources:
+            lines.append(f"(showing {max_sources} of {len(entries)} sources)")
         return lines
 
     # ------------------------------------------------------------------
     # Internals
     # ------------------------------------------------------------------
 
-    def _create_client(self, *, host: str, port: int) -> QdrantClient:
+    def _create_client(
+        self, *, host: str, port: int, check_compatibility: bool = True
+    ) -> QdrantClient:
         if host:
             log.info("Connecting to Qdrant via host=%s port=%s", host, port)
-            return QdrantClient(host=host, port=port)
+            return QdrantClient(
+                host=host,
+                port=port,
+                pool_size=self.pool_size,
+                check_compatibility=check_compatibility,
+            )
 
-    def _ensure_collection_exists(self) -> None:
-        """Create the collection if it doesn't exist.
+    def _hybrid_query(
+        self,
+        query: str,
+        vector: list[float],
+        *,
+        k: int,
+        filter: qdrant_models.Filter | None = None,
+    ) -> dict[str, Any]:
+        """Dense + sparse prefetch fused with RRF (as `QdrantVectorStore` does)."""
+        assert self.sparse_embeddings is not None
+        sparse = self.sparse_embeddings.embed_query(query)
+        return {
+            "prefetch": [
+                qdrant_models.Prefetch(
+                    using=self.vector_store.vector_name,
+                    query=vector,
+                    limit=k,
+                    params=self.search_params,
+                    filter=filter,
+                ),
+                qdrant_models.Prefetch(
+                    using=SPARSE_VECTOR_NAME,
+                    query=qdrant_models.SparseVector(
+                        indices=sparse.indices, values=sparse.values
+                    ),
+                    limit=k,
+                    filter=filter,
+                ),
+            ],
+            "query": qdrant_models.FusionQuery(fusion=qdrant_models.Fusion.RRF),
+        }
 
-        Qdrant needs vector size at collection creation time; infer it from the
-        embedding model by embedding a short probe string.
+    def _document_from_point(self, point: Any) -> Document:
+        # Same Document shape as the sync `QdrantVectorStore` search results.
+        return QdrantVectorStore._document_from_point(
+            point,
+            self.collection_name,
+            self.vector_store.content_payload_key,
+            self.vector_store.metadata_payload_key,
+        )
+
+    def _ensure_payload_indexes(self, info: qdrant_models.CollectionInfo) -> None:
+        """Index every field `SearchFilter` matches on (also on older collections).
+
+        Keeps per-source counts cheap and lets Qdrant filter inside HNSW search.
         """
-        try:
-            self.client.get_collection(collection_name=self.collection_name)
-            return
-        except UnexpectedResponse as e:
-            if getattr(e, "status_code", None) != 404:
-                raise
-            log.info("Collection '%s' missing; creating.", self.collection_name)
-
-        probe = self.embeddings.embed_query("qdrant-collection-dimension-probe")
-        dim = len(probe)
+        existing = info.payload_schema or {}
+        for field_name, field_schema in payload_indexes().items():
+            if field_name in existing:
+                continue
+            self.client.create_payload_index(
+                collection_name=self.collection_name,
+                field_name=field_name,
+                field_schema=field_schema,
+            )
+            log.info("Created payload index on '%s'", field_name)
+
+    def _warn_storage_differences(self, info: qdrant_models.CollectionInfo) -> None:
+        differences = self.collection_config.storage_differences(info.config.params)
+        if differences:
+            log.warning(
+                "Collection '%s' already exists with %s; quantization, on-disk and "
+                "HNSW settings only apply when a collection is created.",
+                self.collection_name,
+                ", ".join(differences),
+            )
+
+    def _embedding_dimension(self) -> int:
+        # Local models know their size; otherwise probe with a query embedding,
+        # so `CachedEmbeddings` serves it after the first run.
+        dim = getattr(self.embeddings, "dimension", None) or len(
+            self.embeddings.embed_query(DIMENSION_PROBE)
+        )
         if dim <= 0:
             raise ValueError("Embedding dimension probe returned empty vector")
+        return dim
+
+    def _check_dense_vector(self, info: qdrant_models.CollectionInfo) -> None:
+        """Fail early if the collection does not fit the embedding model."""
+        vectors = info.config.params.vectors
+        if isinstance(vectors, dict):
+            vectors = vectors.get("")
+        if vectors is None:
+            raise ValueError(
+                f"Collection '{self.collection_name}' has no unnamed dense vector."
+            )
+        dim = self._embedding_dimension()
+        if vectors.size != dim:
+            raise ValueError(
+                f"Collection '{self.collection_name}' stores {vectors.size}-dim "
+                f"vectors but the embedding model returns {dim} dimensions; use "
+                "another QDRANT_COLLECTION or the model it was created with."
+            )
+        if vectors.distance != self.distance:
+            raise ValueError(
+                f"Collection '{self.collection_name}' uses {vectors.distance} "
+                f"distance, not {self.distance}."
+            )
+
+    def _ensure_collection_exists(self) -> qdrant_models.CollectionInfo:
+        """Create the collection if it doesn't exist; returns its info.
+
+        Qdrant needs vector size at collection creation time; infer it from the
+        embedding model by embedding a short probe string.
+        """
+        # `collection_exists` also works for local (":memory:"/path) clients,
+        # which raise ValueError instead of a 404 from `get_collection`.
+        if self.client.collection_exists(collection_name=self.collection_name):
+            info = self.client.get_collection(collection_name=self.collection_name)
+            if self.collection_config.has_storage_settings():
+                self._warn_storage_differences(info)
+            return info
+        log.info("Collection '%s' missing; creating.", self.collection_name)
+
+        dim = self._embedding_dimension()
+
+        sparse_vectors_config = None
+        if self.retrieval_mode == RetrievalMode.HYBRID:
+            # Documents store BM25 term weights; Qdrant applies IDF at query time.
+            sparse_vectors_config = {
+                SPARSE_VECTOR_NAME: qdrant_models.SparseVectorParams(
+                    modifier=qdrant_models.Modifier.IDF
+                )
+            }
 
         self.client.create_collection(
             collection_name=self.collection_name,
-            vectors_config=qdrant_models.VectorParams(size=dim, distance=self.distance),
+            vectors_config=self.collection_config.vector_params(
+                size=dim, distance=self.distance
+            ),
+            sparse_vectors_config=sparse_vectors_config,
+            on_disk_payload=self.collection_config.on_disk_payload or None,
         )
         log.info(
-            "Created collection '%s' with dim=%s distance=%s",
+            "Created collection '%s' with dim=%s distance=%s sparse=%s %s",
             self.collection_name,
             dim,
             self.distance,
+            sparse_vectors_config is not None,
+            self.collection_config,
         )
+        return self.client.get_collection(collection_name=self.collection_name)
@@ -1,20 +1,44 @@
 import argparse
+import atexit
 import logging
 import os
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
 
 from dotenv import load_dotenv
 
-from langchain_openai import ChatOpenAI
-from langchain_openai import OpenAIEmbeddings
-
-from lib.chat import (
-    interactive_chat,
-    print_sources,
-    stream_rag_agent_answer,
-    stream_rag_answer,
+from lib.collection_config import QUANTIZATION_MODES, CollectionConfig
+from lib.context_builder import ContextBuilder, Tokenizer
+from lib.metrics import configure_trace_file, start_metrics_server
+from lib.reranker import DEFAULT_RERANK_MODEL
+from lib.search_filter import (
+    SearchFilter,
+    normalize_source,
+    parse_page_range,
+    parse_timestamp,
 )
-from lib.ingestion_pdf import PDFIngestion
-from lib.vector_db import VectorDB
+
+# Qdrant, OpenAI and LangChain modules are imported where a mode needs them,
+# so `--help`, argument errors and short searches skip the agent/server stack.
+
+
+def _chat_model(model: str, **kwargs: Any) -> Any:
+    from langchain_openai import ChatOpenAI
+
+    return ChatOpenAI(model=model, streaming=True, **kwargs)
+
+
+def _arg_type(parse: Callable[[str], Any]) -> Callable[[str], Any]:
+    """Argparse `type` that reports the parser's `ValueError` message."""
+
+    def convert(value: str) -> Any:
+        try:
+            return parse(value)
+        except ValueError as e:
+            raise argparse.ArgumentTypeError(str(e)) from None
+
+    return convert
 
 
 def main(argv: list[str] | None = None) -> int:
@@ -25,14 +49,16 @@ def main(argv: list[str] | None = None) -> int:
 
     parser = argparse.ArgumentParser(
         prog="learning-rag",
-        description="Minimal RAG playground (store PDFs, query via retrieval).",
+        description="Minimal RAG playground (store documents, query via retrieval).",
     )
 
     action = parser.add_mutually_exclusive_group(required=True)
     action.add_argument(
         "--store",
-        metavar="PDF_PATH",
-        help="Store a PDF into the local vector DB.",
+        nargs="+",
+        metavar="PATH",
+        help="Store documents (PDF, DOCX, HTML, Markdown, text; files, directories "
+        "or glob patterns) into the vector DB.",
     )
     action.add_argument(
         "--prompt",
@@ -51,6 +77,17 @@ def main(argv: list[str] | None = None) -> int:
         metavar="QUERY",
         help="Search the vector DB directly (similarity search only; no LLM).",
     )
+    action.add_argument(
+        "--serve",
+        action="store_true",
+        help="Run an HTTP server with query (SSE), search-only and ingest endpoints.",
+    )
+    action.add_argument(
+        "--batch",
+        metavar="PATH",
+        help="Answer every question in a JSONL file (two-step RAG), writing "
+        "answers and sources to --batch-output.",
+    )
 
     parser.add_argument(
         "--top-k",
@@ -58,78 +95,624 @@ def main(argv: list[str] | None = None) -> int:
         default=5,
         help="How many chunks to retrieve for a prompt.",
     )
+    parser.add_argument(
+        "--context-tokens",
+        type=int,
+        default=None,
+        metavar="N",
+        help="Token budget for retrieved context in the prompt (default: no limit; "
+        "overlapping chunks are merged and near-duplicates dropped either way).",
+    )
+    parser.add_argument(
+        "--retrieval",
+        choices=["dense", "hybrid"],
+        default="dense",
+        help="Dense-only search, or dense + local BM25 sparse vectors fused with "
+        "RRF (hybrid needs a collection created with --retrieval hybrid).",
+    )
+    parser.add_argument(
+        "--embedding-provider",
+        choices=["openai", "local"],
+        default=None,
+        help="Embeddings API, or a local CPU model via ONNX Runtime (needs the "
+        "optional 'local' dependencies; default: $EMBEDDING_PROVIDER or openai). "
+        "A collection must be queried with the provider that stored it.",
+    )
+    parser.add_argument(
+        "--embed-batch-size",
+        type=int,
+        default=64,
+        help="Chunks per embedding/upsert batch when storing.",
+    )
+    parser.add_argument(
+        "--ingest-concurrency",
+        type=int,
+        default=4,
+        help="Concurrent embedding/upsert batches when storing.",
+    )
+    parser.add_argument(
+        "--ingest-workers",
+        type=int,
+        default=None,
+        help="Processes used for PDF text extraction (default: CPU count).",
+    )
+    parser.add_argument(
+        "--chunking",
+        choices=("structured", "recursive"),
+        default="structured",
+        help="How --store chunks documents: along headings, paragraphs and "
+        "sentences across page breaks, or 900-character pieces per page with "
+        "150 characters of overlap (default: structured).",
+    )
+    parser.add_argument(
+        "--chunk-tokens",
+        type=int,
+        default=256,
+        help="Maximum tokens per chunk with --chunking structured.",
+    )
     parser.add_argument(
         "--agent",
         action="store_true",
         help="Use agentic RAG (tool-based retrieval) instead of two-step RAG.",
     )
 
+    memory = parser.add_argument_group(
+        "conversation memory (--interactive)",
+        "Recent turns are kept verbatim; older turns are summarized in the "
+        "background so per-turn prompt size stays bounded.",
+    )
+    memory.add_argument(
+        "--history-turns",
+        type=int,
+        default=4,
+        metavar="N",
+        help="Most recent turns sent verbatim (default: 4).",
+    )
+    memory.add_argument(
+        "--history-tokens",
+        type=int,
+        default=2000,
+        metavar="N",
+        help="Token budget for verbatim turns plus the summary (default: 2000).",
+    )
+    memory.add_argument(
+        "--no-history-summary",
+        dest="history_summary",
+        action="store_false",
+        help="Drop turns that fall out of the window instead of summarizing them.",
+    )
+    memory.add_argument(
+        "--rewrite-queries",
+        action="store_true",
+        help="Rewrite follow-ups into standalone retrieval queries (two-step RAG; "
+        "one extra model call per turn).",
+    )
+
+    rerank = parser.add_argument_group(
+        "reranking",
+        "Over-fetch candidates and keep the top-k by a local CPU cross-encoder "
+        "(needs the optional 'rerank' dependencies).",
+    )
+    rerank.add_argument(
+        "--rerank",
+        action="store_true",
+        help="Rerank retrieved chunks with a cross-encoder before prompting.",
+    )
+    rerank.add_argument(
+        "--rerank-candidates",
+        type=int,
+        default=20,
+        metavar="N",
+        help="Chunks retrieved per search for the reranker (default: 20).",
+    )
+    rerank.add_argument(
+        "--rerank-model",
+        default=DEFAULT_RERANK_MODEL,
+        metavar="NAME",
+        help=f"fastembed cross-encoder model (default: {DEFAULT_RERANK_MODEL}).",
+    )
+
+    filters = parser.add_argument_group(
+        "retrieval filters",
+        "Restrict every search (two-step, agent, --search-only, --batch, --serve) "
+        "to matching chunks; the agent can narrow further per tool call. "
+        "--tenant also labels the chunks written by --store.",
+    )
+    filters.add_argument(
+        "--source",
+        action="append",
+        dest="sources",
+        default=[],
+        metavar="PATH",
+        help="Only chunks of this source, as stored (repeatable).",
+    )
+    filters.add_argument(
+        "--pages",
+        type=_arg_type(parse_page_range),
+        metavar="A-B",
+        help="Only pages in this inclusive range (e.g. 3-7, 5, 10-).",
+    )
+    filters.add_argument(
+        "--document-id",
+        action="append",
+        dest="document_ids",
+        default=[],
+        metavar="ID",
+        help="Only chunks of this document ID (repeatable).",
+    )
+    filters.add_argument(
+        "--tenant",
+        metavar="NAME",
+        help="Only chunks of this tenant; with --store, the tenant to record.",
+    )
+    filters.add_argument(
+        "--ingested-after",
+        type=_arg_type(parse_timestamp),
+        metavar="DATE",
+        help="Only chunks stored at or after this ISO 8601 date/time (UTC).",
+    )
+    filters.add_argument(
+        "--ingested-before",
+        type=_arg_type(parse_timestamp),
+        metavar="DATE",
+        help="Only chunks stored before this ISO 8601 date/time (UTC).",
+    )
+
+    cache = parser.add_argument_group(
+        "answer cache",
+        "Serve answers to near-identical questions from a semantic cache; "
+        "entries are invalidated when --store changes the documents.",
+    )
+    cache.add_argument(
+        "--answer-cache",
+        action="store_true",
+        help="Cache answers in the Qdrant collection '<QDRANT_COLLECTION>__answers'.",
+    )
+    cache.add_argument(
+        "--answer-cache-path",
+        metavar="PATH",
+        default=None,
+        help="Keep the answer cache in a local on-disk store at PATH instead "
+        "(implies --answer-cache; env: ANSWER_CACHE_PATH).",
+    )
+    cache.add_argument(
+        "--answer-cache-threshold",
+        type=float,
+        default=0.95,
+        metavar="SIM",
+        help="Minimum cosine similarity of a cached question (default: 0.95).",
+    )
+
+    parser.add_argument(
+        "--no-agent-prefetch",
+        dest="agent_prefetch",
+        action="store_false",
+        help="Agent mode: do not search for the prompt while the model plans its "
+        "first tool call.",
+    )
+
+    batch = parser.add_argument_group(
+        "batch mode (--batch)",
+        'Input lines are {"id": ..., "question": ...} (id defaults to the '
+        "line number). Answers are appended in completion order; rerunning "
+        "skips questions already answered in the output.",
+    )
+    batch.add_argument(
+        "--batch-output",
+        metavar="PATH",
+        default=None,
+        help="Output JSONL (default: <input stem>.answers.jsonl next to the input).",
+    )
+    batch.add_argument(
+        "--batch-concurrency",
+        type=int,
+        default=8,
+        metavar="N",
+        help="Answers generated concurrently (default: 8).",
+    )
+
+    parser.add_argument(
+        "--listen",
+        default="127.0.0.1:8000",
+        metavar="HOST:PORT",
+        help="Address the --serve HTTP server binds to.",
+    )
+    parser.add_argument(
+        "--ingest-root",
+        metavar="DIR",
+        help="Directory POST /ingest may read from; paths are relative to it "
+        "(--serve; default: /ingest disabled).",
+    )
+    parser.add_argument(
+        "--pool-size",
+        type=int,
+        default=64,
+        help="HTTP connections pooled to Qdrant and the model backend (--serve).",
+    )
+    parser.add_argument(
+        "--max-concurrent-queries",
+        type=int,
+        default=32,
+        help="Concurrent /query requests before requests queue (--serve).",
+    )
+    storage = parser.add_argument_group(
+        "collection storage",
+        "Quantization, on-disk and HNSW settings apply when a collection is "
+        "created; --search-ef/--oversampling/--no-rescore apply to every query.",
+    )
+    storage.add_argument(
+        "--quantization",
+        choices=QUANTIZATION_MODES,
+        default=None,
+        help="Quantize dense vectors: scalar (int8), product (16x) or binary (32x).",
+    )
+    storage.add_argument(
+        "--on-disk-vectors",
+        action="store_true",
+        help="Keep original vectors on disk (memory-mapped).",
+    )
+    storage.add_argument(
+        "--on-disk-payload",
+        action="store_true",
+        help="Keep payloads (chunk text, metadata) on disk.",
+    )
+    storage.add_argument("--hnsw-m", type=int, default=None, help="HNSW graph degree.")
+    storage.add_argument(
+        "--hnsw-ef-construct",
+        type=int,
+        default=None,
+        help="HNSW build-time beam width.",
+    )
+    storage.add_argument(
+        "--search-ef", type=int, default=None, help="HNSW search-time beam width."
+    )
+    storage.add_argument(
+        "--oversampling",
+        type=float,
+        default=None,
+        help="Fetch N*k quantized candidates before rescoring (e.g. 2.0).",
+    )
+    storage.add_argument(
+        "--no-rescore",
+        dest="rescore",
+        action="store_false",
+        help="Rank by quantized vectors only (faster, lower recall).",
+    )
+
+    parser.add_argument(
+        "--skip-verify",
+        action="store_true",
+        help="Skip the startup collection checks (existence, vector size, "
+        "indexes) for a collection known to be set up; ignored by --store.",
+    )
+    parser.add_argument(
+        "--trace-file",
+        metavar="PATH",
+        default=None,
+        help="Append per-request traces as OTLP/JSON lines (env: RAG_TRACE_FILE).",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=None,
+        help="Serve Prometheus metrics on this port (--serve exposes /metrics).",
+    )
+
     logging.getLogger("httpx").setLevel(logging.WARNING)
 
     load_dotenv()
 
     args = parser.parse_args(argv)
+    if args.context_tokens is not None and args.context_tokens <= 0:
+        parser.error("--context-tokens must be positive")
+    if args.history_turns < 1:
+        parser.error("--history-turns must be >= 1")
+    if not 0.0 < args.answer_cache_threshold <= 1.0:
+        parser.error("--answer-cache-threshold must be in (0, 1]")
+    if args.rerank_candidates < 1:
+        parser.error("--rerank-candidates must be >= 1")
+    if args.batch and args.agent:
+        parser.error("--batch supports two-step RAG only (drop --agent)")
+    if args.batch_concurrency < 1:
+        parser.error("--batch-concurrency must be >= 1")
+    if args.chunk_tokens < 1:
+        parser.error("--chunk-tokens must be >= 1")
+    page_min, page_max = args.pages or (None, None)
+    search_filter = SearchFilter(
+        sources=tuple(normalize_source(source) for source in args.sources),
+        page_min=page_min,
+        page_max=page_max,
+        document_ids=tuple(args.document_ids),
+        tenant=None if args.store else args.tenant,
+        ingested_after=args.ingested_after,
+        ingested_before=args.ingested_before,
+    )
+    if args.store and search_filter:
+        parser.error("--store takes no retrieval filters (only --tenant)")
+
+    from langchain_qdrant import RetrievalMode
+
+    from lib.embedding_cache import CachedEmbeddings
+    from lib.vector_db import VectorDB
 
     collection_name = os.getenv("QDRANT_COLLECTION", "documents")
+    embedding_provider = (
+        args.embedding_provider or os.getenv("EMBEDDING_PROVIDER") or "openai"
+    )
+    if embedding_provider not in ("openai", "local"):
+        parser.error(
+            f"EMBEDDING_PROVIDER must be openai or local: {embedding_provider}"
+        )
     embedding_model = os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-3-small")
     llm_model = os.getenv("OPENAI_CHAT_MODEL", "gpt-5-nano")
-    embeddings = OpenAIEmbeddings(model=embedding_model)
+    embedding_cache_path = os.getenv("EMBEDDING_CACHE_PATH", ".cache/embeddings.sqlite")
 
-    vector_db = VectorDB(
-        collection_name=collection_name,
-        embeddings=embeddings,
-    )
+    configure_trace_file(args.trace_file or os.getenv("RAG_TRACE_FILE") or None)
+    if args.metrics_port is not None:
+        start_metrics_server(port=args.metrics_port)
+
+    # Server and batch mode: share pooled keep-alive connections across requests.
+    openai_http: dict[str, Any] = {}
+    if args.serve or args.batch:
+        import httpx
+
+        pool_size = args.pool_size if args.serve else args.batch_concurrency
+        limits = httpx.Limits(
+            max_connections=pool_size, max_keepalive_connections=pool_size
+        )
+        openai_http = {
+            "http_client": httpx.Client(limits=limits),
+            "http_async_client": httpx.AsyncClient(limits=limits),
+        }
+
+    def openai_embeddings() -> Any:
+        from langchain_openai import OpenAIEmbeddings
+
+        return OpenAIEmbeddings(model=embedding_model, **openai_http)
+
+    if embedding_provider == "local":
+        from lib.local_embeddings import DEFAULT_LOCAL_EMBEDDING_MODEL, LocalEmbeddings
+
+        embedding_model = os.getenv(
+            "LOCAL_EMBEDDING_MODEL", DEFAULT_LOCAL_EMBEDDING_MODEL
+        )
+        try:
+            # Cheap to build: the model itself is loaded on the first embedding.
+            local_embeddings = LocalEmbeddings(model_name=embedding_model)
+        except RuntimeError as e:
+            parser.error(f"--embedding-provider local: {e}")
+        atexit.register(local_embeddings.close)
+        embeddings = CachedEmbeddings(
+            local_embeddings,
+            model=f"local:{embedding_model}",
+            path=embedding_cache_path or None,
+        )
+    else:
+        # Built on the first cache miss: cached searches never touch the OpenAI
+        # client.
+        embeddings = CachedEmbeddings(
+            openai_embeddings,
+            model=embedding_model,
+            path=embedding_cache_path or None,
+        )
+    atexit.register(embeddings.close)
+
+    reranker = None
+    if args.rerank and not args.store:
+        from lib.reranker import CrossEncoderReranker
+
+        try:
+            reranker = CrossEncoderReranker(
+                candidates=args.rerank_candidates, model_name=args.rerank_model
+            )
+        except RuntimeError as e:
+            parser.error(f"--rerank: {e}")
+        atexit.register(reranker.close)
+
+    try:
+        vector_db = VectorDB(
+            collection_name=collection_name,
+            embeddings=embeddings,
+            pool_size=args.pool_size if args.serve else None,
+            retrieval_mode=RetrievalMode(args.retrieval),
+            collection_config=CollectionConfig(
+                quantization=args.quantization,
+                on_disk_vectors=args.on_disk_vectors,
+                on_disk_payload=args.on_disk_payload,
+                hnsw_m=args.hnsw_m,
+                hnsw_ef_construct=args.hnsw_ef_construct,
+                search_ef=args.search_ef,
+                rescore=args.rescore,
+                oversampling=args.oversampling,
+            ),
+            reranker=reranker,
+            search_filter=search_filter,
+            # --store may create the collection and its indexes.
+            verify=not args.skip_verify or bool(args.store),
+        )
+    except ValueError as e:
+        parser.error(str(e))
     vector_store = vector_db.vector_store
+    tokenizer = Tokenizer(model=llm_model)
+    answer_cache_path = args.answer_cache_path or os.getenv("ANSWER_CACHE_PATH")
+    answer_cache = None
+    if args.answer_cache or answer_cache_path:
+        from qdrant_client import QdrantClient
+
+        from lib.answer_cache import AnswerCache
+
+        # Answers depend on what retrieval can see; scope cache entries by it.
+        retrieval_scope = [f"retrieval={args.retrieval}"]
+        if search_settings := vector_db.collection_config.describe_search():
+            retrieval_scope.append(search_settings)
+        if reranker:
+            retrieval_scope.append(
+                f"rerank={args.rerank_model}@{args.rerank_candidates}"
+            )
+        if search_filter:
+            retrieval_scope.append(search_filter.describe())
+        answer_cache = AnswerCache(
+            client=(
+                QdrantClient(path=answer_cache_path)
+                if answer_cache_path
+                else vector_db.client
+            ),
+            collection_name=collection_name,
+            embeddings=embeddings,
+            catalog=vector_db.catalog,
+            threshold=args.answer_cache_threshold,
+            retrieval_scope=" ".join(retrieval_scope),
+        )
+    context_builder = ContextBuilder(
+        max_tokens=args.context_tokens, tokenizer=tokenizer
+    )
+
+    if args.serve:
+        from lib.server import create_app, serve
+
+        host, _, port = args.listen.rpartition(":")
+        llm = _chat_model(llm_model, **openai_http)
+        app = create_app(
+            vector_db=vector_db,
+            llm=llm,
+            k=args.top_k,
+            query_concurrency=args.max_concurrent_queries,
+            context_builder=context_builder,
+            answer_cache=answer_cache,
+            agent_prefetch=args.agent_prefetch,
+            ingest_root=args.ingest_root,
+        )
+        serve(app, host=host or "127.0.0.1", port=int(port))
+        return 0
+
+    if args.batch:
+        from lib.batch import read_questions, run_batch
+
+        try:
+            questions = read_questions(args.batch)
+        except (OSError, ValueError) as e:
+            parser.error(f"--batch: {e}")
+        output_path = args.batch_output or str(
+            Path(args.batch).with_suffix(".answers.jsonl")
+        )
+        stats = run_batch(
+            vector_db=vector_db,
+            llm=_chat_model(llm_model, **openai_http),
+            questions=questions,
+            output_path=output_path,
+            k=args.top_k,
+            concurrency=args.batch_concurrency,
+            context_builder=context_builder,
+        )
+        print(
+            f"Answered {stats.answered} questions into '{output_path}' "
+            f"(failed={stats.failed}, skipped={stats.skipped}, "
+            f"{stats.questions_per_s:.2f} questions/s)."
+        )
+        return 1 if stats.failed else 0
 
     if args.store:
-        ingestion = PDFIngestion()
-        lc_docs = ingestion.load(args.store)
+        from lib.chunking import StructuredChunker
+        from lib.ingestion_parallel import expand_document_paths
+        from lib.ingestion_pipeline import IngestionPipeline
+        from lib.ingestion_registry import IngestionRegistry, default_engines
 
-        vector_store.add_documents(lc_docs)
-        print(f"Stored {len(lc_docs)} chunks into collection '{collection_name}'.")
+        chunker = (
+            StructuredChunker(max_tokens=args.chunk_tokens)
+            if args.chunking == "structured"
+            else None
+        )
+        ingestion = IngestionRegistry(
+            engines=default_engines(chunker=chunker, max_workers=args.ingest_workers)
+        )
+        paths = expand_document_paths(args.store, suffixes=ingestion.suffixes)
+        if not paths:
+            parser.error(f"--store: no supported documents matched {args.store}")
+        pipeline = IngestionPipeline(
+            vector_store=vector_store,
+            catalog=vector_db.catalog,
+            batch_size=args.embed_batch_size,
+            max_concurrency=args.ingest_concurrency,
+            tenant=args.tenant,
+        )
+        stats = pipeline.run(ingestion.iter_load_many(paths))
+        print(
+            f"Stored {stats.chunks} chunks into collection '{collection_name}' "
+            f"(unchanged={stats.skipped}, deleted={stats.deleted})."
+        )
         return 0
 
     if args.interactive:
+        from lib.chat import interactive_chat
+        from lib.memory import ConversationMemory
+
         retriever = vector_db.as_retriever(k=args.top_k)
-        llm = ChatOpenAI(model=llm_model, streaming=True)
+        llm = _chat_model(llm_model)
         interactive_chat(
             llm=llm,
             retriever=retriever,
             vector_store=vector_store,
             k=args.top_k,
             agent_mode=args.agent,
+            context_builder=context_builder,
+            memory=ConversationMemory(
+                llm=llm,
+                max_turns=args.history_turns,
+                max_tokens=args.history_tokens,
+                summarize=args.history_summary,
+                rewrite_queries=args.rewrite_queries,
+                tokenizer=tokenizer,
+            ),
+            answer_cache=answer_cache,
+            agent_prefetch=args.agent_prefetch,
         )
         return 0
 
+    from lib.chat import print_results, print_sources
+
     if getattr(args, "search_only", None):
         query = args.search_only
         results = vector_store.similarity_search_with_score(query, k=args.top_k)
-        if results:
-            print("Results:")
-            for i, (doc, score) in enumerate(results, start=1):
-                meta = doc.metadata or {}
-                src = meta.get("source", "?")
-                page = meta.get("page", "?")
-                content = (doc.page_content or "").strip().replace("\n", " ")
-                preview = content[:300] + ("..." if len(content) > 300 else "")
-                print(f"[{i}] score={float(score):.4f} source={src} page={page}")
-                if preview:
-                    print(f"    {preview}")
-        else:
-            print("Results:\n(no matches)")
+        print_results(results, title="Results:", preview_chars=300)
         return 0
 
+    from lib.answer_cache import answer_scope, answer_with_cache
+
     prompt = args.prompt
     retriever = vector_db.as_retriever(k=args.top_k)
-    llm = ChatOpenAI(model=llm_model, streaming=True)
+    llm = _chat_model(llm_model)
 
     if args.agent:
-        stream_rag_agent_answer(
-            llm=llm, vector_store=vector_store, prompt=prompt, k=args.top_k
+        from lib.rag_agent import stream_rag_agent_answer
+
+        answer = lambda: stream_rag_agent_answer(
+            llm=llm,
+            vector_store=vector_store,
+            prompt=prompt,
+            k=args.top_k,
+            context_builder=context_builder,
+            prefetch=args.agent_prefetch,
         )
     else:
-        stream_rag_answer(llm=llm, retriever=retriever, prompt=prompt)
-    print_sources(vector_store=vector_store, query=prompt, k=args.top_k)
+        from lib.rag_two_step import stream_rag_answer
+
+        answer = lambda: stream_rag_answer(
+            llm=llm,
+            retriever=retriever,
+            prompt=prompt,
+            context_builder=context_builder,
+        )
+    _, sources = answer_with_cache(
+        cache=answer_cache,
+        query=prompt,
+        scope=answer_scope(
+            mode="agent" if args.agent else "two_step",
+            k=args.top_k,
+            context_tokens=args.context_tokens,
+        ),
+        answer=answer,
+    )
+    print_sources(query=prompt, results=sources)
 
     return 0
 
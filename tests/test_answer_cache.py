@@ -0,0 +1,85 @@
+import pytest
+from langchain_core.documents import Document
+from qdrant_client import QdrantClient
+
+from bench.fakes import HashingEmbeddings
+from lib.answer_cache import AnswerCache, answer_with_cache
+from lib.source_catalog import SourceCatalog
+
+SOURCES = [(Document(page_content="Primed pumps start.", metadata={"page": 3}), 0.9)]
+
+
+@pytest.fixture
+def catalog() -> SourceCatalog:
+    client = QdrantClient(":memory:")
+    client.create_collection(collection_name="docs", vectors_config={})
+    return SourceCatalog(client=client, collection_name="docs")
+
+
+def _cache(catalog: SourceCatalog, **kwargs) -> AnswerCache:
+    return AnswerCache(
+        client=catalog.client,
+        collection_name="docs",
+        embeddings=HashingEmbeddings(),
+        catalog=catalog,
+        **kwargs,
+    )
+
+
+def _answer(cache: AnswerCache, query: str, text: str, scope: str = "two_step"):
+    return answer_with_cache(
+        cache=cache,
+        query=query,
+        scope=scope,
+        answer=lambda: (text, SOURCES),
+        show_header=False,
+    )
+
+
+def test_stored_answer_is_served_for_the_same_question(catalog) -> None:
+    cache = _cache(catalog)
+    _answer(cache, "how do I prime the pump", "Open the vent screw.")
+
+    hit = cache.lookup("how do I prime the pump", scope="two_step").answer
+    assert hit is not None
+    assert hit.text == "Open the vent screw."
+    assert hit.sources[0][0].metadata == {"page": 3}
+    assert cache.lookup("what is the torque", scope="two_step").answer is None
+
+
+def test_answers_are_kept_apart_by_scope(catalog) -> None:
+    cache = _cache(catalog)
+    _answer(cache, "how do I prime the pump", "Open the vent screw.", scope="k=5")
+    hybrid = _cache(catalog, retrieval_scope="retrieval=hybrid")
+
+    assert cache.lookup("how do I prime the pump", scope="k=8").answer is None
+    assert hybrid.lookup("how do I prime the pump", scope="k=5").answer is None
+
+
+def test_version_bump_invalidates_answers(catalog) -> None:
+    cache = _cache(catalog, version_ttl_s=60.0)
+    _answer(cache, "how do I prime the pump", "Open the vent screw.")
+    catalog.bump_version()
+
+    # The version is re-read after `version_ttl_s`, or right after `invalidate`.
+    assert cache.lookup("how do I prime the pump", scope="two_step").answer
+    cache.invalidate()
+    assert cache.lookup("how do I prime the pump", scope="two_step").answer is None
+
+
+def test_answer_generated_across_a_version_bump_is_not_served(catalog) -> None:
+    cache = _cache(catalog, version_ttl_s=0.0)
+
+    def answer():
+        catalog.bump_version()  # `--store` while the answer is generated
+        return "Outdated answer.", SOURCES
+
+    answer_with_cache(
+        cache=cache,
+        query="how do I prime the pump",
+        scope="two_step",
+        answer=answer,
+        show_header=False,
+    )
+
+    assert cache.lookup("how do I prime the pump", scope="two_step").answer is None
@@ -0,0 +1,92 @@
+import pytest
+
+from bench.fakes import synthetic_manual_pages, write_text_pdf
+from lib.chunking import StructuredChunker, is_heading
+from lib.ingestion_parallel import ParallelPDFIngestion
+from lib.ingestion_pdf import PDFIngestion
+
+
+@pytest.mark.parametrize(
+    ("line", "expected"),
+    [
+        ("# Installation", True),
+        ("### 4.2 Priming", True),
+        ("Safety Instructions", True),
+        ("4.2 Priming the pump", True),
+        ("Open the vent screw.", False),
+        ("the narrow column text", False),
+        ("#hashtag is not a heading", False),
+        ("A" + " word" * 12, False),
+        ("", False),
+    ],
+)
+def test_is_heading(line: str, expected: bool) -> None:
+    assert is_heading(line) is expected
+
+
+def test_headings_start_chunks_across_page_breaks() -> None:
+    chunker = StructuredChunker(max_tokens=40, min_tokens=5)
+    pages = [
+        (
+            1,
+            "Priming\n\nThe pump must be primed before the first start. Fill the "
+            "housing with water.\n\nOperation\n\nStart the motor with the valve "
+            "closed. Then open",
+        ),
+        (2, "the valve slowly. Check the pressure gauge."),
+    ]
+
+    chunks = list(chunker.split(pages))
+
+    assert [chunk.text.split("\n")[0] for chunk in chunks] == ["Priming", "Operation"]
+    assert [(chunk.page, chunk.page_end) for chunk in chunks] == [(1, 1), (1, 2)]
+    assert chunks[1].text.endswith(
+        "Then open the valve slowly. Check the pressure gauge."
+    )
+
+
+def test_short_line_inside_a_paragraph_is_not_a_heading() -> None:
+    chunker = StructuredChunker(max_tokens=40, min_tokens=5)
+    text = "The narrow column text\nSafety valve\ncontinues in the same sentence."
+
+    chunks = list(chunker.split([(1, text)]))
+
+    assert [chunk.text for chunk in chunks] == [
+        "The narrow column text Safety valve continues in the same sentence."
+    ]
+
+
+def test_heading_is_never_left_at_the_end_of_a_chunk() -> None:
+    chunker = StructuredChunker(max_tokens=20, min_tokens=2)
+    text = (
+        "# Intro\nFirst sentence is here. Second sentence is here too.\n\n"
+        "## Next\nMore text follows the second heading."
+    )
+
+    chunks = list(chunker.split([(1, text)]))
+
+    assert [chunk.text.split("\n")[0] for chunk in chunks] == ["# Intro", "## Next"]
+
+
+def test_chunks_respect_max_tokens_and_keep_every_word() -> None:
+    chunker = StructuredChunker(max_tokens=64)
+    pages = list(enumerate(synthetic_manual_pages(0, sections=6), start=1))
+
+    chunks = list(chunker.split(pages))
+
+    assert all(chunk.tokens <= 64 for chunk in chunks)
+    assert (
+        " ".join(c.text for c in chunks).split()
+        == " ".join(text for _, text in pages).split()
+    )
+
+
+def test_parallel_pdf_chunks_match_a_single_process(tmp_path) -> None:
+    path = tmp_path / "manual.pdf"
+    write_text_pdf(path, synthetic_manual_pages(0, sections=12))
+    chunker = StructuredChunker()
+
+    expected = list(PDFIngestion(chunker=chunker).iter_load(path))
+    parallel = ParallelPDFIngestion(chunker=chunker, max_workers=2, pages_per_task=1)
+
+    assert list(parallel.iter_load(path)) == expected
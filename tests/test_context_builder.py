@@ -0,0 +1,76 @@
+from typing import Any
+
+from langchain_core.documents import Document
+
+from lib.context_builder import ContextBuilder, Tokenizer
+
+PAGE = (
+    "The pump must be primed before the first start. Open the vent screw on "
+    "the casing and fill the housing with water until no air escapes. Close "
+    "the vent screw and start the motor with the discharge valve closed."
+)
+
+
+class EstimatingTokenizer(Tokenizer):
+    """~4 characters per token, without loading (or downloading) tiktoken."""
+
+    def _load(self) -> Any:
+        return None
+
+
+def _doc(text: str, source: str = "manual.pdf", page: int = 1) -> Document:
+    return Document(page_content=text, metadata={"source": source, "page": page})
+
+
+def test_overlapping_chunks_of_a_page_are_merged() -> None:
+    left, right = PAGE[:120], PAGE[80:]
+    context = ContextBuilder().build([(_doc(right), 0.7), (_doc(left), 0.9)])
+
+    assert context.merged == 1
+    assert [p.text for p in context.passages] == [PAGE]
+    assert context.passages[0].score == 0.9
+    assert [score for _, score in context.sources] == [0.9, 0.7]
+
+
+def test_chunks_of_different_pages_are_not_merged() -> None:
+    left, right = PAGE[:120], PAGE[80:]
+    context = ContextBuilder().build([(_doc(left), 0.9), (_doc(right, page=2), 0.7)])
+
+    assert context.merged == 0
+    assert [p.text for p in context.passages] == [left.strip(), right.strip()]
+
+
+def test_same_text_under_another_source_is_dropped() -> None:
+    context = ContextBuilder().build(
+        [
+            (_doc(PAGE, source="copy.pdf"), 0.8),
+            (_doc(PAGE.replace(" ", "  ")), 0.9),
+            (_doc(PAGE[:60], source="excerpt.pdf"), 0.5),
+        ]
+    )
+
+    assert context.duplicates == 2
+    assert [p.metadata["source"] for p in context.passages] == ["manual.pdf"]
+
+
+def test_passages_that_do_not_fit_are_skipped_for_smaller_ones() -> None:
+    long_text = "Torque values for every flange bolt size. " * 20
+    short_text = "Use a calibrated torque wrench."
+    builder = ContextBuilder(max_tokens=40, tokenizer=EstimatingTokenizer())
+    context = builder.build(
+        [(_doc(long_text, page=1), 0.9), (_doc(short_text, page=2), 0.8)]
+    )
+
+    assert [p.text for p in context.passages] == [short_text]
+    assert not context.truncated
+    assert context.tokens <= 40
+
+
+def test_best_passage_is_truncated_when_nothing_fits() -> None:
+    long_text = "Torque values for every flange bolt size. " * 20
+    builder = ContextBuilder(max_tokens=10, tokenizer=EstimatingTokenizer())
+    context = builder.build([(_doc(long_text), 0.9)])
+
+    assert context.truncated
+    assert context.tokens <= 10
+    assert long_text.startswith(context.text)
@@ -0,0 +1,86 @@
+import pytest
+from langchain_core.documents import Document
+
+from bench.fakes import HashingEmbeddings, memory_qdrant_client
+from lib.ingestion import empty_document
+from lib.ingestion_pipeline import IngestionPipeline
+from lib.search_filter import normalize_source
+from lib.vector_db import VectorDB
+
+
+@pytest.fixture
+def vector_db() -> VectorDB:
+    return VectorDB(
+        collection_name="test",
+        embeddings=HashingEmbeddings(),
+        client=memory_qdrant_client(),
+    )
+
+
+def _chunks(source: str, *texts: str) -> list[Document]:
+    return [
+        Document(page_content=text, metadata={"source": source, "page": page})
+        for page, text in enumerate(texts, start=1)
+    ]
+
+
+def _store(vector_db: VectorDB, chunks: list[Document], **kwargs):
+    pipeline = IngestionPipeline(
+        vector_store=vector_db.vector_store, catalog=vector_db.catalog, **kwargs
+    )
+    return pipeline.run(chunks)
+
+
+def _count(vector_db: VectorDB) -> int:
+    return vector_db.client.count(collection_name="test").count
+
+
+def test_unchanged_chunks_are_skipped(vector_db: VectorDB) -> None:
+    first = _store(vector_db, _chunks("a.txt", "alpha page", "beta page"))
+    again = _store(vector_db, _chunks("a.txt", "alpha page", "beta page"))
+
+    assert (first.chunks, first.skipped) == (2, 0)
+    assert (again.chunks, again.skipped, again.deleted) == (0, 2, 0)
+    assert _count(vector_db) == 2
+
+
+def test_same_file_under_another_path_is_one_source(vector_db, tmp_path) -> None:
+    path = tmp_path / "a.txt"
+    _store(vector_db, _chunks(str(path), "alpha page"))
+    again = _store(vector_db, _chunks(str(tmp_path / "." / "a.txt"), "alpha page"))
+
+    assert again.skipped == 1
+    assert _count(vector_db) == 1
+
+
+def test_edited_pages_replace_their_old_chunks(vector_db: VectorDB) -> None:
+    _store(vector_db, _chunks("a.txt", "alpha page", "beta page"))
+    edited = _store(vector_db, _chunks("a.txt", "alpha page", "gamma page"))
+
+    assert (edited.chunks, edited.skipped, edited.deleted) == (1, 1, 1)
+    points, _ = vector_db.client.scroll(collection_name="test", with_payload=True)
+    assert sorted(p.payload["page_content"] for p in points) == [
+        "alpha page",
+        "gamma page",
+    ]
+
+
+def test_empty_document_deletes_the_source(vector_db: VectorDB) -> None:
+    _store(vector_db, _chunks("a.txt", "alpha page", "beta page"))
+    _store(vector_db, _chunks("b.txt", "other page"))
+    emptied = _store(vector_db, [empty_document("a.txt")])
+
+    assert emptied.deleted == 2
+    assert _count(vector_db) == 1
+    sources = [entry["source"] for entry in vector_db.catalog.entries()]
+    assert sources == [normalize_source("b.txt")]
+
+
+def test_tenants_keep_independent_copies(vector_db: VectorDB) -> None:
+    _store(vector_db, _chunks("a.txt", "alpha page"), tenant="acme")
+    other = _store(vector_db, _chunks("a.txt", "alpha page"), tenant="globex")
+    emptied = _store(vector_db, [empty_document("a.txt")], tenant="acme")
+
+    assert (other.chunks, other.skipped) == (1, 0)
+    assert emptied.deleted == 1
+    assert _count(vector_db) == 1
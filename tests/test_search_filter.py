@@ -0,0 +1,113 @@
+from datetime import UTC, datetime
+
+import pytest
+from qdrant_client import QdrantClient
+from qdrant_client.http import models as qdrant_models
+
+from lib.search_filter import SearchFilter, parse_page_range, parse_timestamp
+
+CHUNKS = [
+    {"id": "a-1", "source": "a.pdf", "page": 1, "page_end": 3, "tenant": "acme"},
+    {"id": "a-4", "source": "a.pdf", "page": 4, "page_end": 5, "tenant": "acme"},
+    {"id": "a-5", "source": "a.pdf", "page": 5},
+    {"id": "a-7", "source": "a.pdf", "page": 7, "page_end": 9, "tenant": "globex"},
+    {"id": "b-2", "source": "b.pdf", "page": 2, "page_end": 6},
+]
+
+
+@pytest.fixture(scope="module")
+def client() -> QdrantClient:
+    client = QdrantClient(":memory:")
+    client.create_collection(
+        collection_name="test",
+        vectors_config=qdrant_models.VectorParams(
+            size=2, distance=qdrant_models.Distance.COSINE
+        ),
+    )
+    client.upsert(
+        collection_name="test",
+        points=[
+            qdrant_models.PointStruct(
+                id=i,
+                vector=[1.0, 0.0],
+                payload={
+                    "metadata": {
+                        **chunk,
+                        "ingested_at": f"2026-0{i + 1}-01T00:00:00+00:00",
+                    }
+                },
+            )
+            for i, chunk in enumerate(CHUNKS)
+        ],
+    )
+    return client
+
+
+def _matches(client: QdrantClient, search_filter: SearchFilter) -> list[str]:
+    points, _ = client.scroll(
+        collection_name="test",
+        scroll_filter=search_filter.to_qdrant(),
+        with_payload=True,
+        limit=100,
+    )
+    return sorted(p.payload["metadata"]["id"] for p in points)
+
+
+def test_empty_filter_is_none() -> None:
+    assert SearchFilter().to_qdrant() is None
+    assert not SearchFilter()
+
+
+@pytest.mark.parametrize(
+    ("page_min", "page_max", "expected"),
+    [
+        (5, 6, ["a-4", "a-5", "b-2"]),
+        (5, None, ["a-4", "a-5", "a-7", "b-2"]),
+        (None, 3, ["a-1", "b-2"]),
+        (10, None, []),
+    ],
+)
+def test_page_range_matches_overlapping_chunks(
+    client, page_min, page_max, expected
+) -> None:
+    search_filter = SearchFilter(page_min=page_min, page_max=page_max)
+    assert _matches(client, search_filter) == expected
+
+
+def test_conditions_are_combined(client) -> None:
+    search_filter = SearchFilter(sources=("a.pdf",), tenant="acme", page_min=4)
+    assert _matches(client, search_filter) == ["a-4"]
+    assert _matches(client, SearchFilter(sources=("a.pdf", "b.pdf"))) == sorted(
+        chunk["id"] for chunk in CHUNKS
+    )
+
+
+def test_ingested_range_is_half_open(client) -> None:
+    search_filter = SearchFilter(
+        ingested_after=datetime(2026, 2, 1, tzinfo=UTC),
+        ingested_before=datetime(2026, 4, 1, tzinfo=UTC),
+    )
+    assert _matches(client, search_filter) == ["a-4", "a-5"]
+
+
+def test_describe_is_stable() -> None:
+    search_filter = SearchFilter(sources=("b.pdf", "a.pdf"), page_min=3, tenant="acme")
+    assert search_filter.describe() == "source=a.pdf,b.pdf pages=3- tenant=acme"
+
+
+@pytest.mark.parametrize(
+    ("value", "expected"),
+    [("5", (5, 5)), ("3-7", (3, 7)), ("3-", (3, None)), ("-7", (None, 7))],
+)
+def test_parse_page_range(value, expected) -> None:
+    assert parse_page_range(value) == expected
+
+
+@pytest.mark.parametrize("value", ["", "-", "x", "7-3"])
+def test_parse_page_range_rejects_invalid(value) -> None:
+    with pytest.raises(ValueError):
+        parse_page_range(value)
+
+
+def test_parse_timestamp_defaults_to_utc() -> None:
+    assert parse_timestamp("2026-03-01") == datetime(2026, 3, 1, tzinfo=UTC)
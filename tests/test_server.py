@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+
+from lib.server import EndpointLimiter, _history_messages, _tenant
+
+
+def test_limiter_rejects_beyond_running_and_waiting() -> None:
+    limiter = EndpointLimiter(max_concurrency=2, max_waiting=1)
+
+    assert [limiter.try_admit() for _ in range(4)] == [True, True, True, False]
+    limiter.leave()
+    assert limiter.try_admit()
+
+
+def test_limiter_queues_requests_until_a_slot_is_released() -> None:
+    async def scenario() -> None:
+        limiter = EndpointLimiter(max_concurrency=1, max_waiting=1)
+        events: list[str] = []
+
+        async def request(name: str, hold: asyncio.Event) -> None:
+            assert limiter.try_admit()
+            try:
+                await limiter.acquire()
+                try:
+                    events.append(f"start {name}")
+                    await hold.wait()
+                finally:
+                    limiter.release()
+            finally:
+                limiter.leave()
+
+        first_done, second_done = asyncio.Event(), asyncio.Event()
+        first = asyncio.create_task(request("first", first_done))
+        second = asyncio.create_task(request("second", second_done))
+        await asyncio.sleep(0)
+        assert events == ["start first"]
+        assert not limiter.try_admit()
+
+        first_done.set()
+        await first
+        await asyncio.sleep(0)
+        assert events == ["start first", "start second"]
+        second_done.set()
+        await second
+        assert limiter.try_admit()
+
+    asyncio.run(scenario())
+
+
+def test_history_must_be_a_list_of_objects() -> None:
+    messages = _history_messages(
+        [{"role": "user", "content": "hi"}, {"role": "assistant", "content": "hey"}]
+    )
+
+    assert [m.content for m in messages] == ["hi", "hey"]
+    with pytest.raises(ValueError):
+        _history_messages({"role": "user", "content": "hi"})
+    with pytest.raises(ValueError):
+        _history_messages(["hi"])
+
+
+@pytest.mark.parametrize("tenant", ["", "  ", 42, ["acme"]])
+def test_tenant_must_be_a_non_empty_string(tenant) -> None:
+    with pytest.raises(ValueError):
+        _tenant({"tenant": tenant})
+
+
+def test_tenant_is_optional() -> None:
+    assert _tenant({}) is None
+    assert _tenant({"tenant": "acme"}) == "acme"